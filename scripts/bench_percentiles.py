@@ -0,0 +1,87 @@
+from __future__ import annotations
+import time
+import typer
+import numpy as np
+import pandas as pd
+
+from rsfbref.features.percentiles import add_percentiles_wide, build_percentiles_cube, build_percentiles_long
+from rsfbref.features.scopes import SCOPE_GROUPS, get_scope_spec
+
+app = typer.Typer()
+
+
+def _synthetic(n: int, n_metrics: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "league": rng.choice([f"L{i}" for i in range(10)], n),
+        "season": rng.choice(["2223", "2324", "2425"], n),
+        "position_bucket": rng.choice(["CB", "FB", "DMCM", "WIDE", "CF", "OTHER"], n),
+    })
+    for j in range(n_metrics):
+        x = np.round(rng.gamma(2.0, 1.0, n), 2)  # realistic ties
+        x[rng.random(n) < 0.02] = np.nan
+        df[f"m{j}"] = x
+    return df
+
+
+def _groupby_transform(df: pd.DataFrame, metric_cols: list[str], group_cols: list[str]) -> pd.DataFrame:
+    # previous implementation: one groupby + Python lambda per metric
+    out = df.copy()
+    for col in metric_cols:
+        out[f"pct_{col}"] = out.groupby(group_cols, dropna=False)[col].transform(
+            lambda s: s.rank(pct=True, method="average") * 100
+        )
+    return out
+
+
+def _time(fn) -> tuple[float, pd.DataFrame]:
+    t0 = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - t0, res
+
+
+def _bench_cube(sizes: list[int], metric_cols: list[str]) -> None:
+    # per-scope build_percentiles_long loop vs one shared-sort cube
+    scopes = list(SCOPE_GROUPS)
+    id_cols = ["league", "season", "position_bucket"]
+    print(f"scopes={scopes} metrics={len(metric_cols)}")
+    print(f"{'rows':>10} {'per-scope':>10} {'cube':>10} {'speedup':>8} identical")
+    for n in sizes:
+        df = _synthetic(n, len(metric_cols))
+        t_old, old = _time(lambda: pd.concat(
+            [build_percentiles_long(df, metric_cols, get_scope_spec(s).group_cols, s, id_cols) for s in scopes],
+            ignore_index=True,
+        ))
+        t_new, new = _time(lambda: build_percentiles_cube(df, metric_cols, scopes, id_cols))
+        same = old.equals(new)
+        print(f"{n:>10,} {t_old:>9.3f}s {t_new:>9.3f}s {t_old / t_new:>7.1f}x {same}")
+
+
+@app.command()
+def main(
+    sizes: str = "10000,100000,1000000",
+    n_metrics: int = 20,
+    scope: str = "league_season",
+    cube: bool = typer.Option(False, help="Benchmark all scopes: per-scope loop vs shared-sort cube."),
+):
+    if cube:
+        _bench_cube([int(x) for x in sizes.split(",")], [f"m{j}" for j in range(n_metrics)])
+        return
+
+    group_cols = get_scope_spec(scope).group_cols
+    metric_cols = [f"m{j}" for j in range(n_metrics)]
+
+    print(f"scope={scope} group_cols={group_cols} metrics={n_metrics}")
+    print(f"{'rows':>10} {'groupby+lambda':>15} {'engine':>10} {'speedup':>8} identical")
+    for n in [int(x) for x in sizes.split(",")]:
+        df = _synthetic(n, n_metrics)
+        t_old, old = _time(lambda: _groupby_transform(df, metric_cols, group_cols))
+        t_new, new = _time(lambda: add_percentiles_wide(df, metric_cols, group_cols))
+        same = all(
+            np.array_equal(old[f"pct_{c}"].to_numpy(dtype=float), new[f"pct_{c}"].to_numpy(), equal_nan=True)
+            for c in metric_cols
+        )
+        print(f"{n:>10,} {t_old:>14.3f}s {t_new:>9.3f}s {t_old / t_new:>7.1f}x {same}")
+
+if __name__ == "__main__":
+    app()
@@ -1,67 +1,53 @@
 from __future__ import annotations
 from pathlib import Path
 import typer
-import pandas as pd
 
 from rsfbref.config import load_config
-from rsfbref.analytics.comparables import build_fact_comparables
+from rsfbref.analytics.roles import load_roles, read_role_pool
+from rsfbref.features.percentiles import attach_pct_scope
+from rsfbref.analytics.comparables import build_comparables_parallel, dim_reason_feature, render_reason_codes
 from rsfbref.export.tableau import export_csv
 
 app = typer.Typer()
 
-def _attach_pct_scope(df_fact: pd.DataFrame, pct_scope: str) -> pd.DataFrame:
-    """
-    Ensure df has pct_* columns for the chosen pct_scope.
-    If pct_scope == df_fact['pct_scope_default'], we already have them.
-    Otherwise, pull from fact_percentiles long and pivot.
-    """
-    default_scope = df_fact["pct_scope_default"].iloc[0] if "pct_scope_default" in df_fact.columns and len(df_fact) else None
-    if pct_scope == default_scope:
-        return df_fact
-
-    pct = pd.read_parquet("data/marts/fact_percentiles.parquet")
-    pct = pct[pct["pct_scope"] == pct_scope].copy()
-
-    # pivot to wide pct_* columns
-    wide = pct.pivot_table(
-        index="player_team_season_id",
-        columns="kpi_name",
-        values="kpi_pct",
-        aggfunc="first",
-    ).reset_index()
-
-    wide.columns = ["player_team_season_id"] + [f"pct_{c}" for c in wide.columns[1:]]
-    out = df_fact.drop(columns=[c for c in df_fact.columns if c.startswith("pct_")], errors="ignore").merge(
-        wide, on="player_team_season_id", how="left", validate="1:1"
-    )
-    return out
-
 @app.command()
-def main(config: str = "configs/v2.yaml", top_n: int = 10, pct_scope: str | None = None):
+def main(
+    config: str = "configs/v2.yaml",
+    top_n: int = 10,
+    pct_scope: list[str] = typer.Option([], help="Pct scope(s) to publish (default: comparison_scope)."),
+    role: list[str] = typer.Option([], help="Role id(s) to build (default: BPCB, DLP, WCR)."),
+    workers: int | None = typer.Option(None, help="Processes for role x scope jobs (default: comparables.workers)."),
+):
     cfg = load_config(config).raw
 
-    df = pd.read_parquet("data/marts/fact_player_season.parquet")
-
-    use_scope = pct_scope or cfg["scopes"]["comparison_scope"]
-    df = _attach_pct_scope(df, pct_scope=use_scope)
-
-    parts = []
-    for r in ["BPCB", "DLP", "WCR"]:
-        parts.append(build_fact_comparables(
-            df,
-            role_id=r,
-            top_n=top_n,
-            comparison_scope=cfg["scopes"]["comparison_scope"],
-            pct_scope=use_scope,
-        ))
-
-    out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    roles = {r["role_id"]: r for r in load_roles(cfg["roles"]["role_defs_path"])}
+    knn_cfg = cfg.get("comparables", {})
+
+    jobs = []
+    for r in role or ["BPCB", "DLP", "WCR"]:
+        # only the role's eligible rows are read from the fact table
+        fact = read_role_pool("data/marts/fact_player_season.parquet", roles[r])
+        for s in pct_scope or [cfg["scopes"]["comparison_scope"]]:
+            jobs.append((r, s, attach_pct_scope(fact, pct_scope=s)))
+
+    out = build_comparables_parallel(
+        jobs,
+        top_n=top_n,
+        comparison_scope=cfg["scopes"]["comparison_scope"],
+        workers=workers if workers is not None else int(knn_cfg.get("workers", 1)),
+        block_size=knn_cfg.get("block_size"),
+        memory_budget_mb=float(knn_cfg.get("memory_budget_mb", 256)),
+    )
 
     Path("data/marts").mkdir(parents=True, exist_ok=True)
     out.to_parquet("data/marts/fact_comparables.parquet", index=False)
+    dim = dim_reason_feature()
+    dim.to_parquet("data/marts/dim_reason_feature.parquet", index=False)
 
+    # export keeps the reason ids (join to dim_reason_feature) next to the rendered labels
     out_csv = Path(cfg["exports"]["out_dir"]) / "fact_comparables.csv"
-    export_csv(out, out_csv)
+    export_csv(render_reason_codes(out) if len(out) else out, out_csv)
+    export_csv(dim, Path(cfg["exports"]["out_dir"]) / "dim_reason_feature.csv")
 
     print(f"Wrote {len(out):,} rows -> {out_csv}")
 
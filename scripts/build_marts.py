@@ -4,9 +4,11 @@ import typer
 import pandas as pd
 
 from rsfbref.config import load_config
-from rsfbref.marts.build_dims import build_dim_player, build_dim_team
+from rsfbref.marts.build_dims import build_dim_player, build_dim_player_from_registry, build_dim_team
+from rsfbref.marts.identity import PlayerRegistry
 from rsfbref.marts.build_facts import build_fact_player_season, build_fact_role_profile_card_v2
 from rsfbref.export.tableau import export_csv, export_tableau_v1  # keep your existing exporter
+from rsfbref.transform.metrics import load_metric_specs, metric_names
 
 app = typer.Typer()
 
@@ -18,11 +20,16 @@ def main(config: str = "configs/v2.yaml"):
     df = pd.read_parquet(scored_path)
 
     # dims
-    dim_player = build_dim_player(df)
+    registry_dir = cfg.get("ids", {}).get("registry_dir")
+    if registry_dir and (Path(registry_dir) / "players.parquet").exists():
+        dim_player = build_dim_player_from_registry(PlayerRegistry(registry_dir), player_ids=df["player_id"].unique())
+    else:
+        dim_player = build_dim_player(df)
     dim_team = build_dim_team(df)
 
     # core fact (wide)
-    fact_player_season = build_fact_player_season(df)
+    metric_cols = metric_names(load_metric_specs(cfg.get("metrics", {}).get("metric_defs_path", "configs/metrics_v1.yaml")))
+    fact_player_season = build_fact_player_season(df, metric_cols=metric_cols)
 
     # scope-aware profile card (long) requires fact_percentiles
     pct_path = Path("data/marts/fact_percentiles.parquet")
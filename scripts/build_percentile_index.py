@@ -0,0 +1,45 @@
+from __future__ import annotations
+from pathlib import Path
+import typer
+import pandas as pd
+
+from rsfbref.config import load_config
+from rsfbref.features.percentile_index import PercentileIndex, score_profiles
+from rsfbref.transform.metrics import load_metric_specs, metric_names
+
+app = typer.Typer()
+
+@app.command()
+def main(
+    config: str = "configs/v2.yaml",
+    profiles: str | None = typer.Option(None, help="Optional CSV/Parquet of raw metric profiles to score."),
+    scope: str | None = typer.Option(None, help="Scope used to score --profiles (default: default_percentile_scope)."),
+):
+    cfg = load_config(config).raw
+    scopes: list[str] = cfg["scopes"]["percentile_scopes"]
+    index_dir = Path(cfg["scopes"].get("percentile_index_dir", "data/index/percentiles"))
+
+    scored_path = Path("data/intermediate/player_season_scored.parquet")
+    if not scored_path.exists():
+        raise FileNotFoundError("Run scripts/run_pipeline.py first (it writes player_season_scored.parquet).")
+    df = pd.read_parquet(scored_path)
+
+    metric_cols = metric_names(load_metric_specs(cfg.get("metrics", {}).get("metric_defs_path", "configs/metrics_v1.yaml")))
+    metric_cols = [c for c in metric_cols if c in df.columns]
+
+    for s in scopes:
+        index = PercentileIndex.build(df, metric_cols=metric_cols, scope=s)
+        index.save(index_dir / s)
+        print(f"[index] {s}: {index.n_groups} groups, {len(index.values):,} values -> {index_dir / s}")
+
+    if profiles:
+        use_scope = scope or cfg["scopes"]["default_percentile_scope"]
+        path = Path(profiles)
+        prof = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+        out = score_profiles(PercentileIndex.load(index_dir / use_scope), prof, roles_yaml_path=cfg["roles"]["role_defs_path"])
+        out_path = path.with_name(f"{path.stem}_scored.csv")
+        out.to_csv(out_path, index=False)
+        print(f"Scored {len(out):,} profiles ({use_scope}) -> {out_path}")
+
+if __name__ == "__main__":
+    app()
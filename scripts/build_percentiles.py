@@ -4,16 +4,21 @@ import typer
 import pandas as pd
 
 from rsfbref.config import load_config
+from rsfbref.features.percentiles import percentile_accuracy_report, write_percentiles_cube
 from rsfbref.features.scopes import get_scope_spec
-from rsfbref.features.percentiles import build_percentiles_long
-from rsfbref.export.tableau import export_csv
+from rsfbref.transform.metrics import load_metric_specs, metric_names
 
 app = typer.Typer()
 
 @app.command()
-def main(config: str = "configs/v2.yaml"):
+def main(
+    config: str = "configs/v2.yaml",
+    accuracy_report: bool = typer.Option(False, help="Approx mode: print per-scope error against exact ranks."),
+):
     cfg = load_config(config).raw
     scopes: list[str] = cfg["scopes"]["percentile_scopes"]
+    mode = cfg["scopes"].get("percentile_mode", "exact")
+    eps = float(cfg["scopes"].get("approx_eps", 0.01))
 
     clean_path = Path("data/intermediate/player_season_clean.parquet")
     if not clean_path.exists():
@@ -30,36 +35,31 @@ def main(config: str = "configs/v2.yaml"):
     id_cols = ["player_team_season_id", "player_id", "team_id", "league", "season", "position_bucket", "minutes"]
     id_cols = [c for c in id_cols if c in df.columns]
 
-    metric_cols = [
-        "pass_cmp_pct", "passes_att_p90", "prog_passes_p90", "passes_final_third_p90",
-        "long_pass_cmp_pct", "key_passes_p90", "xa_p90", "crosses_pa_p90",
-        "tkl_int_p90", "clr_p90", "errors_p90", "aerial_win_pct",
-        "prog_carries_p90", "carries_pa_p90", "succ_takeons_p90", "takeon_succ_pct",
-        "sca_p90", "mis_dis_p90", "fouls_p90", "Per_90_Minutes_npxG"
-    ]
+    metric_cols = metric_names(load_metric_specs(cfg.get("metrics", {}).get("metric_defs_path", "configs/metrics_v1.yaml")))
     metric_cols = [c for c in metric_cols if c in df.columns]
 
-    parts = []
-    for s in scopes:
-        spec = get_scope_spec(s)
-        long = build_percentiles_long(
-            df=df,
-            metric_cols=metric_cols,
-            group_cols=spec.group_cols,
-            pct_scope=s,
-            id_cols=id_cols,
-        )
-        parts.append(long)
-
-    out = pd.concat(parts, ignore_index=True)
-
-    Path("data/marts").mkdir(parents=True, exist_ok=True)
-    out.to_parquet("data/marts/fact_percentiles.parquet", index=False)
-
+    # all scopes in one pass -> one row group per scope; the CSV export is
+    # appended per scope in the same stream (never the whole cube in memory)
+    out_parquet = Path("data/marts/fact_percentiles.parquet")
     out_csv = Path(cfg["exports"]["out_dir"]) / "fact_percentiles.csv"
-    export_csv(out, out_csv)
+    rows = write_percentiles_cube(
+        df=df,
+        metric_cols=metric_cols,
+        scopes=scopes,
+        id_cols=id_cols,
+        path=out_parquet,
+        mode=mode,
+        eps=eps,
+        csv_path=out_csv,
+    )
+
+    print(f"Wrote {rows:,} rows ({mode}) -> {out_csv}")
 
-    print(f"Wrote {len(out):,} rows -> {out_csv}")
+    if accuracy_report and mode == "approx":
+        for s in scopes:
+            report = percentile_accuracy_report(df, metric_cols, get_scope_spec(s).group_cols, eps=eps)
+            print(f"[approx] {s}: max_abs_err={report['max_abs_err'].max():.3f} bound={eps * 100:.2f}")
+            print(report.to_string(index=False))
 
 if __name__ == "__main__":
     app()
@@ -4,51 +4,38 @@ import typer
 import pandas as pd
 
 from rsfbref.config import load_config
-from rsfbref.analytics.shortlist import build_shortlist
+from rsfbref.analytics.roles import load_roles, read_role_pool
+from rsfbref.features.percentiles import attach_pct_scope
+from rsfbref.analytics.shortlist import add_age_band, build_shortlist, load_shortlist_rules
 from rsfbref.export.tableau import export_csv
 
 app = typer.Typer()
 
-def _attach_pct_scope(df_fact: pd.DataFrame, pct_scope: str) -> pd.DataFrame:
-    default_scope = df_fact["pct_scope_default"].iloc[0] if "pct_scope_default" in df_fact.columns and len(df_fact) else None
-    if pct_scope == default_scope:
-        return df_fact
-
-    pct = pd.read_parquet("data/marts/fact_percentiles.parquet")
-    pct = pct[pct["pct_scope"] == pct_scope].copy()
-
-    wide = pct.pivot_table(
-        index="player_team_season_id",
-        columns="kpi_name",
-        values="kpi_pct",
-        aggfunc="first",
-    ).reset_index()
-    wide.columns = ["player_team_season_id"] + [f"pct_{c}" for c in wide.columns[1:]]
-
-    out = df_fact.drop(columns=[c for c in df_fact.columns if c.startswith("pct_")], errors="ignore").merge(
-        wide, on="player_team_season_id", how="left", validate="1:1"
-    )
-    return out
-
 @app.command()
 def main(
     config: str = "configs/v2.yaml",
     top_n: int = 50,
     pct_scope: str | None = None,
+    role: list[str] = typer.Option([], help="Role id(s) to build (default: BPCB, DLP, WCR)."),
+    group_by: list[str] = typer.Option([], help="Top-N per group instead of overall, e.g. league, season, age_band."),
 ):
     cfg = load_config(config).raw
 
-    fact = pd.read_parquet("data/marts/fact_player_season.parquet")
+    roles = {r["role_id"]: r for r in load_roles(cfg["roles"]["role_defs_path"])}
+    rules = load_shortlist_rules(cfg["roles"]["role_defs_path"])
     dim_player = pd.read_parquet("data/marts/dim_player.parquet")[["player_id", "age"]]
-
-    df = fact.merge(dim_player, on="player_id", how="left", validate="m:1")
-
     use_scope = pct_scope or cfg["scopes"]["comparison_scope"]
-    df = _attach_pct_scope(df, pct_scope=use_scope)
 
     parts = []
-    for role_id in ["BPCB", "DLP", "WCR"]:
-        tmp = build_shortlist(df, role_id=role_id, top_n=top_n)
+    for role_id in role or ["BPCB", "DLP", "WCR"]:
+        # only the role's eligible rows are read from the fact table
+        fact = read_role_pool("data/marts/fact_player_season.parquet", roles[role_id])
+        df = fact.merge(dim_player, on="player_id", how="left", validate="m:1")
+        df = attach_pct_scope(df, pct_scope=use_scope)
+        if "age_band" in group_by:
+            df = add_age_band(df)
+
+        tmp = build_shortlist(df, role_id=role_id, top_n=top_n, rules=rules, group_cols=group_by or None)
         if tmp is None or len(tmp) == 0:
             continue
         tmp["pct_scope"] = use_scope
@@ -0,0 +1,34 @@
+from __future__ import annotations
+from pathlib import Path
+import typer
+import pandas as pd
+
+from rsfbref.config import load_config
+from rsfbref.analytics.roles import load_roles, read_role_pool
+from rsfbref.features.percentiles import attach_pct_scope
+from rsfbref.analytics.similarity_index import SimilarityIndex
+
+app = typer.Typer()
+
+@app.command()
+def main(
+    config: str = "configs/v2.yaml",
+    role: list[str] = typer.Option([], help="Role id(s) to index (default: BPCB, DLP, WCR)."),
+    scope: list[str] = typer.Option([], help="Pct scope(s) to index (default: all percentile_scopes)."),
+):
+    cfg = load_config(config).raw
+
+    roles = {r["role_id"]: r for r in load_roles(cfg["roles"]["role_defs_path"])}
+    index_dir = Path(cfg.get("comparables", {}).get("index_dir", "data/index/similarity"))
+    dim_player = pd.read_parquet("data/marts/dim_player.parquet")[["player_id", "age"]]
+
+    for r in role or ["BPCB", "DLP", "WCR"]:
+        fact = read_role_pool("data/marts/fact_player_season.parquet", roles[r])
+        fact = fact.merge(dim_player, on="player_id", how="left", validate="m:1")
+        for s in scope or cfg["scopes"]["percentile_scopes"]:
+            index = SimilarityIndex.build(attach_pct_scope(fact, pct_scope=s), role_id=r, scope=s)
+            index.save(index_dir / r / s)
+            print(f"[similarity] {r}/{s}: {len(index):,} players, {len(index.feats)} features -> {index_dir / r / s}")
+
+if __name__ == "__main__":
+    app()
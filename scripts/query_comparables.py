@@ -0,0 +1,55 @@
+from __future__ import annotations
+from pathlib import Path
+import typer
+import pandas as pd
+
+from rsfbref.config import load_config
+from rsfbref.analytics.comparables import render_reason_codes
+from rsfbref.analytics.similarity_index import SimilarityIndex
+
+app = typer.Typer()
+
+@app.command()
+def main(
+    role: str = typer.Option(..., help="Role id, e.g. DLP."),
+    player: str | None = typer.Option(None, help="Anchor player_team_season_id."),
+    template: str | None = typer.Option(None, help="CSV/Parquet with one row of pct_* values (ideal profile)."),
+    config: str = "configs/v2.yaml",
+    scope: str | None = typer.Option(None, help="Pct scope (default: comparison_scope)."),
+    k: int = 10,
+    different_league: bool = False,
+    different_season: bool = False,
+    max_age: float | None = None,
+    league: list[str] = typer.Option([], help="Only comparables from these league(s)."),
+    out: str | None = typer.Option(None, help="Optional CSV path for the result."),
+):
+    cfg = load_config(config).raw
+    use_scope = scope or cfg["scopes"]["comparison_scope"]
+    index_dir = Path(cfg.get("comparables", {}).get("index_dir", "data/index/similarity"))
+    if not (index_dir / role / use_scope).exists():
+        raise FileNotFoundError(f"No index for {role}/{use_scope}; run scripts/build_similarity_index.py first.")
+    index = SimilarityIndex.load(index_dir / role / use_scope)
+
+    profile = None
+    if template:
+        path = Path(template)
+        profile = (pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)).iloc[0]
+
+    res = index.query(
+        anchor_pts_id=player,
+        profile=profile,
+        k=k,
+        different_league=different_league,
+        different_season=different_season,
+        max_age=max_age,
+        leagues=league or None,
+    )
+    res = render_reason_codes(res)
+    if out:
+        res.to_csv(out, index=False)
+        print(f"Wrote {len(res):,} rows -> {out}")
+    else:
+        print(res.to_string(index=False))
+
+if __name__ == "__main__":
+    app()
@@ -5,51 +5,87 @@ import pandas as pd
 
 from rsfbref.config import load_config
 from rsfbref.io.fbref_reader import make_fbref
+from rsfbref.io.snapshot import config_snapshot_reader, write_snapshot
+from rsfbref.io.ingest import run_ingestion
 from rsfbref.transform.player_season import read_player_season_bundle, build_player_season_base
-from rsfbref.transform.clean_player_season import build_player_season_clean
+from rsfbref.transform.clean_player_season import build_player_season_clean, read_player_season_base
+from rsfbref.transform.metrics import load_metric_specs, metric_names
 from rsfbref.marts.build_dims import add_ids
+from rsfbref.marts.identity import PlayerRegistry
 from rsfbref.features.scopes import get_scope_spec
 from rsfbref.features.percentiles import add_percentiles_wide
 from rsfbref.analytics.roles import score_roles
+from rsfbref.analytics.role_uncertainty import bootstrap_role_scores
 
 app = typer.Typer()
 
 @app.command()
-def main(config: str = "configs/v2.yaml"):
+def main(config: str = "configs/v2.yaml", replay: bool = False, scheduled: bool = False):
     cfg = load_config(config).raw
+    snapshot_dir = cfg["fbref"].get("snapshot_dir", "data/snapshots/fbref")
 
-    fbref = make_fbref(
-        leagues=cfg["fbref"]["leagues"],
-        seasons=cfg["fbref"]["seasons"],
-        data_dir=cfg["fbref"]["data_dir"],
-        no_cache=cfg["fbref"]["no_cache"],
-        no_store=cfg["fbref"]["no_store"],
-    )
+    if scheduled:
+        # resumable per league x season x stat_type ingestion into the snapshot store
+        ingest_cfg = cfg["fbref"].get("ingest", {})
+        report = run_ingestion(
+            lambda league, season: make_fbref(
+                leagues=[league],
+                seasons=[season],
+                data_dir=cfg["fbref"]["data_dir"],
+                no_cache=cfg["fbref"]["no_cache"],
+                no_store=cfg["fbref"]["no_store"],
+            ),
+            leagues=cfg["fbref"]["leagues"],
+            seasons=cfg["fbref"]["seasons"],
+            snapshot_dir=snapshot_dir,
+            max_workers=cfg["fbref"].get("max_workers", 1),
+            max_retries=ingest_cfg.get("max_retries", 3),
+            backoff_s=ingest_cfg.get("backoff_s", 2.0),
+        )
+        if report.failed:
+            raise RuntimeError(f"Ingestion incomplete, rerun to resume. Failed tasks: {list(report.failed)}")
+        fbref = config_snapshot_reader(cfg["fbref"])
+    elif replay:
+        # serve this config's leagues x seasons from the last snapshot; soccerdata is never touched
+        fbref = config_snapshot_reader(cfg["fbref"])
+    else:
+        fbref = make_fbref(
+            leagues=cfg["fbref"]["leagues"],
+            seasons=cfg["fbref"]["seasons"],
+            data_dir=cfg["fbref"]["data_dir"],
+            no_cache=cfg["fbref"]["no_cache"],
+            no_store=cfg["fbref"]["no_store"],
+        )
 
-    bundle = read_player_season_bundle(fbref)
+    bundle = read_player_season_bundle(fbref, max_workers=cfg["fbref"].get("max_workers", 1))
+    if not (replay or scheduled):
+        write_snapshot(bundle, snapshot_dir)
     base = build_player_season_base(bundle)
 
     Path("data/intermediate").mkdir(parents=True, exist_ok=True)
     base.to_parquet("data/intermediate/player_season_base.parquet", index=False)
 
+    # re-read with column projection: only metric sources + identity fields stay in memory
+    metrics_path = cfg.get("metrics", {}).get("metric_defs_path", "configs/metrics_v1.yaml")
+    base = read_player_season_base("data/intermediate/player_season_base.parquet", metrics_path=metrics_path)
+
     clean = build_player_season_clean(
         base,
         min_minutes=cfg["filters"]["min_minutes"],
         position_map_path=cfg["roles"]["position_map_path"],
         exclude_goalkeepers=cfg["filters"].get("exclude_goalkeepers", True),
+        metrics_path=metrics_path,
     )
     clean.to_parquet("data/intermediate/player_season_clean.parquet", index=False)
 
     # ids + strict grain key
-    clean = add_ids(clean)
-
-    metric_cols = [
-        "pass_cmp_pct", "passes_att_p90", "prog_passes_p90", "passes_final_third_p90",
-        "long_pass_cmp_pct", "key_passes_p90", "xa_p90", "crosses_pa_p90",
-        "tkl_int_p90", "clr_p90", "errors_p90", "aerial_win_pct",
-        "prog_carries_p90", "carries_pa_p90", "succ_takeons_p90", "takeon_succ_pct",
-        "sca_p90", "mis_dis_p90", "fouls_p90", "Per_90_Minutes_npxG"
-    ]
+    ids_cfg = cfg.get("ids", {})
+    registry = PlayerRegistry(ids_cfg["registry_dir"]) if ids_cfg.get("registry_dir") else None
+    clean = add_ids(clean, id_cache_path=ids_cfg.get("cache_path"), registry=registry)
+    if registry is not None:
+        registry.save()
+
+    metric_cols = metric_names(load_metric_specs(metrics_path))
     metric_cols = [c for c in metric_cols if c in clean.columns]
 
     default_scope = cfg["scopes"]["default_percentile_scope"]
@@ -65,6 +101,21 @@ def main(config: str = "configs/v2.yaml"):
 
     scored = score_roles(scored, roles_yaml_path=cfg["roles"]["role_defs_path"])
 
+    unc = cfg.get("uncertainty", {})
+    if unc.get("enabled", False):
+        specs = load_metric_specs(metrics_path)
+        scored = bootstrap_role_scores(
+            scored,
+            roles_yaml_path=cfg["roles"]["role_defs_path"],
+            scope=default_scope,
+            n_replicates=unc.get("n_replicates", 1000),
+            ci=unc.get("ci", 0.9),
+            seed=unc.get("seed", 0),
+            batch_size=unc.get("batch_size", 100),
+            poisson_metrics=[m.name for m in specs if m.transform in {"per90", "sum_per90"}],
+            attempts_p90=unc.get("attempts_p90", {}),
+        )
+
     scored.to_parquet("data/intermediate/player_season_scored.parquet", index=False)
     print(f"Wrote data/intermediate/player_season_scored.parquet ({len(scored):,} rows)")
 
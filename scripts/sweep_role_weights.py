@@ -0,0 +1,60 @@
+from __future__ import annotations
+from pathlib import Path
+import typer
+import pandas as pd
+
+from rsfbref.config import load_config
+from rsfbref.analytics.roles import load_roles
+from rsfbref.analytics.sweep import dirichlet_weights, grid_weights, role_feature_block, sweep_role_weights
+from rsfbref.export.tableau import export_csv
+
+app = typer.Typer()
+
+@app.command()
+def main(
+    config: str = "configs/v2.yaml",
+    role: list[str] = typer.Option([], help="Role id(s) to sweep (default: all roles)."),
+    mode: str = typer.Option("dirichlet", help="dirichlet | grid"),
+    n_samples: int = 2000,
+    concentration: float = 50.0,
+    deltas: str = "-0.5,-0.25,0.25,0.5",
+    top_n: int = 50,
+    seed: int = 0,
+):
+    cfg = load_config(config).raw
+
+    df = pd.read_parquet("data/intermediate/player_season_scored.parquet")
+    roles = load_roles(cfg["roles"]["role_defs_path"])
+    if role:
+        roles = [r for r in roles if r["role_id"] in set(role)]
+
+    parts = []
+    for r in roles:
+        _, base, keys = role_feature_block(df.iloc[:0], r)
+        if len(base) == 0:
+            continue
+        if mode == "grid":
+            W = grid_weights(base, tuple(float(x) for x in deltas.split(",")))
+        elif mode == "dirichlet":
+            W = dirichlet_weights(base, n_samples=n_samples, concentration=concentration, seed=seed)
+        else:
+            raise ValueError(f"Unknown mode={mode}. Supported: ['dirichlet', 'grid']")
+
+        res = sweep_role_weights(df, r, W, top_n=top_n)
+        stable = float((res["topn_freq"] >= 0.9).sum()) if len(res) else 0
+        print(f"[sweep] {r['role_id']}: {len(W):,} weight vectors over {len(keys)} features, "
+              f"{len(res):,} players, {stable:.0f} in top-{top_n} >=90% of the time")
+        parts.append(res)
+
+    out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    Path("data/marts").mkdir(parents=True, exist_ok=True)
+    out.to_parquet("data/marts/fact_role_weight_sweep.parquet", index=False)
+
+    out_csv = Path(cfg["exports"]["out_dir"]) / "fact_role_weight_sweep.csv"
+    export_csv(out, out_csv)
+
+    print(f"Wrote {len(out):,} rows -> {out_csv}")
+
+if __name__ == "__main__":
+    app()
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import RobustScaler
-from sklearn.metrics.pairwise import cosine_distances
+from sklearn.preprocessing import normalize
 
 # Percentile-feature sets per role (input df must contain these columns).
 ROLE_FEATURES: dict[str, list[str]] = {
@@ -52,25 +56,162 @@ INVERT_PCT_FEATURES: set[str] = {
 }
 
 
-def _top_reason_codes(
-    anchor_vec: np.ndarray,
-    comp_vec: np.ndarray,
-    feat_names: list[str],
-    k: int = 3,
-) -> list[str]:
+# Global reason-feature ids (dim_reason_feature): fact_comparables stores
+# reason_feature_1..3 as ids into this list; append only, never reorder.
+REASON_FEATURES: list[str] = list(dict.fromkeys(f for feats in ROLE_FEATURES.values() for f in feats))
+N_REASONS = 3
+
+COMPARABLES_COLUMNS = [
+    "comparison_scope", "pct_scope", "role_id",
+    "anchor_pts_id", "anchor_player_id", "anchor_team_id", "anchor_league", "anchor_season",
+    "comp_pts_id", "comp_player_id", "comp_team_id", "comp_league", "comp_season",
+    "different_league", "different_season",
+    "distance", "rank", "reason_feature_1", "reason_feature_2", "reason_feature_3", "reason_higher_mask",
+]
+
+# id columns copied for anchor_* / comp_*
+_SIDE_COLS = {
+    "pts_id": "player_team_season_id",
+    "player_id": "player_id",
+    "team_id": "team_id",
+    "league": "league",
+    "season": "season",
+}
+
+
+def reason_codes(diffs: np.ndarray, feat_names: list[str], k: int = N_REASONS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    "Why similar/different" indicators for a (pairs x features) block of
+    comp - anchor standardized deltas, in one batched pass.
+
+    argpartition finds each pair's k-th largest |delta|; the k picks are then
+    ordered by |delta| desc with ties toward the later feature.
+    Returns (pairs x k) int16 REASON_FEATURES ids (-1 = no feature) and a
+    uint8 mask with bit r set when the comparable is higher on reason r.
+    """
+    n, f = diffs.shape
+    ids = np.full((n, k), -1, dtype=np.int16)
+    higher = np.zeros(n, dtype=np.uint8)
+    kk = min(k, f)
+    if n == 0 or kk == 0:
+        return ids, higher
+
+    A = np.abs(diffs)
+    thr = np.take_along_axis(A, np.argpartition(-A, kk - 1, axis=1)[:, kk - 1:kk], axis=1)
+    # exactly kk picks per row: everything above the threshold, then the
+    # latest features tied with it
+    gt = A > thr
+    eq = A == thr
+    need = kk - gt.sum(axis=1, keepdims=True)
+    sel = gt | (eq & (np.cumsum(eq[:, ::-1], axis=1)[:, ::-1] <= need))
+    cols = np.nonzero(sel)[1].reshape(n, kk)
+    cols = np.take_along_axis(cols, np.lexsort((-cols, -np.take_along_axis(A, cols, axis=1)), axis=1), axis=1)
+
+    gid = np.array([REASON_FEATURES.index(x) for x in feat_names], dtype=np.int16)
+    ids[:, :kk] = gid[cols]
+    up = np.take_along_axis(diffs, cols, axis=1) > 0
+    higher[:] = (up.astype(np.uint8) << np.arange(kk, dtype=np.uint8)).sum(axis=1)
+    return ids, higher
+
+
+def render_reason_codes(df: pd.DataFrame, k: int = N_REASONS) -> pd.DataFrame:
+    """
+    Export view: adds reason_1..k strings ("xa_p90:higher") from
+    reason_feature_* ids + reason_higher_mask, via one label-table lookup
+    per slot. The id and mask columns are kept, so exports still filter and
+    join to dim_reason_feature on the id.
     """
-    Return human-readable "why similar/different" indicators.
-    Uses absolute standardized deltas to pick top contributors.
+    labels = np.array(
+        [[f"{f.replace('pct_', '')}:lower", f"{f.replace('pct_', '')}:higher"] for f in REASON_FEATURES] + [[None, None]],
+        dtype=object,
+    )
+    mask = df["reason_higher_mask"].to_numpy(dtype=np.int64)
+    out = df.copy()
+    for r in range(k):
+        fid = df[f"reason_feature_{r + 1}"].to_numpy(dtype=np.int64)  # -1 -> the None row
+        out[f"reason_{r + 1}"] = labels[fid, (mask >> r) & 1]
+    return out
+
+
+def dim_reason_feature() -> pd.DataFrame:
+    """Lookup for reason_feature_* ids (Tableau filters/joins on the id)."""
+    return pd.DataFrame({
+        "reason_feature_id": np.arange(len(REASON_FEATURES), dtype=np.int16),
+        "feature": REASON_FEATURES,
+        "kpi_name": [f.replace("pct_", "") for f in REASON_FEATURES],
+    })
+
+
+def role_feature_matrix(pool: pd.DataFrame, feats: list[str], medians: pd.Series | None = None) -> tuple[pd.DataFrame, pd.Series]:
     """
-    diffs = comp_vec - anchor_vec
-    idx = np.argsort(np.abs(diffs))[::-1][:k]
+    Similarity features for a pool: percentiles (0..100) with NaNs filled by
+    the pool median (or the given medians) and "bad is high" features
+    inverted. Returns (X, medians used).
+    """
+    # Build feature matrix (percentiles 0..100). Fill NaNs conservatively with median.
+    X = pool[feats].apply(pd.to_numeric, errors="coerce")
+    if medians is None:
+        medians = X.median(numeric_only=True)
+    X = X.fillna(medians)
+
+    # Invert "bad is high" features so similarity space aligns with role quality direction.
+    for f in feats:
+        if f in INVERT_PCT_FEATURES:
+            X[f] = 100.0 - X[f]
+    return X, medians
+
+
+def _block_rows(n: int, block_size: int | None, memory_budget_mb: float) -> int:
+    # anchors per block: distances (float64) + argpartition indices (int64) + mask per pool column
+    if block_size is not None:
+        return max(1, int(block_size))
+    return max(1, int(memory_budget_mb * 2**20 // (17 * max(n, 1))))
+
+
+def blocked_knn(
+    Xs: np.ndarray,
+    k: int,
+    block_size: int | None = None,
+    memory_budget_mb: float = 256.0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    k nearest rows of Xs for every row by cosine distance (self excluded),
+    ordered by (distance, row position).
+
+    Rows are L2-normalized once; anchors are processed in blocks of
+    block_size rows (derived from memory_budget_mb when not given) against
+    the whole matrix, so only a (block x N) distance slab is alive at a time
+    - peak memory O(N*k + block*N) instead of N x N. Within a block,
+    argpartition finds each anchor's k-th distance and only entries at or
+    below it (ties included) are sorted.
+
+    Returns (anchor, comp, distance) flattened anchor-major, k per anchor.
+    """
+    n = len(Xs)
+    Xn = normalize(Xs)
+    step = _block_rows(n, block_size, memory_budget_mb)
+
+    anchors, comps, dists = [], [], []
+    for lo in range(0, n, step):
+        hi = min(lo + step, n)
+        # same arithmetic as sklearn cosine_distances
+        D = Xn[lo:hi] @ Xn.T
+        D *= -1
+        D += 1
+        np.clip(D, 0, 2, out=D)
+        D[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
 
-    reasons: list[str] = []
-    for i in idx:
-        sign = "higher" if diffs[i] > 0 else "lower"
-        fname = feat_names[i].replace("pct_", "")
-        reasons.append(f"{fname}:{sign}")
-    return reasons
+        kth = np.take_along_axis(D, np.argpartition(D, k - 1, axis=1)[:, k - 1:k], axis=1)
+        rows, cols = np.nonzero(D <= kth)
+        order = np.lexsort((cols, D[rows, cols], rows))
+        rows, cols = rows[order], cols[order]
+        keep = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < k
+        rows, cols = rows[keep], cols[keep]
+
+        anchors.append(rows + lo)
+        comps.append(cols)
+        dists.append(D[rows, cols])
+    return np.concatenate(anchors), np.concatenate(comps), np.concatenate(dists)
 
 
 def build_fact_comparables(
@@ -79,6 +220,8 @@ def build_fact_comparables(
     top_n: int = 10,
     comparison_scope: str = "league_season",
     pct_scope: str = "league_season",
+    block_size: int | None = None,
+    memory_budget_mb: float = 256.0,
 ) -> pd.DataFrame:
     """
     Build comparables within the eligible pool for a given role.
@@ -94,92 +237,174 @@ def build_fact_comparables(
       anchor_pts_id, anchor_player_id, anchor_team_id, anchor_league, anchor_season,
       comp_pts_id, comp_player_id, comp_team_id, comp_league, comp_season,
       different_league, different_season,
-      distance, rank, reason_1..reason_3
+      distance, rank, reason_feature_1..3, reason_higher_mask
+      (render_reason_codes turns these into reason_1..3 strings at export)
+
+    Rows are grouped by anchor (pool order), neighbours by (distance, pool order).
+    Neighbours come from blocked_knn; block_size / memory_budget_mb bound the
+    distance slab held in memory and do not change the result.
     """
+    pool, feats = _eligible_pool(df, role_id)
+    if pool is None:
+        return pd.DataFrame(columns=COMPARABLES_COLUMNS)
+    k = min(int(top_n), len(pool) - 1)
+    if k < 1:
+        return pd.DataFrame(columns=COMPARABLES_COLUMNS)
+
+    arrays = _neighbour_arrays(_raw_block(pool, feats), feats, k, block_size, memory_budget_mb)
+    return _assemble(pool, role_id, k, arrays, comparison_scope, pct_scope)
+
+
+def _eligible_pool(df: pd.DataFrame, role_id: str) -> tuple[pd.DataFrame | None, list[str]]:
+    # eligible rows (score_{role_id} not NaN) and the role's available features; None = nothing to compare
     score_col = f"score_{role_id}"
     required = {"player_team_season_id", "player_id", "team_id", "league", "season"}
-
     if score_col not in df.columns or not required.issubset(df.columns):
-        return pd.DataFrame(columns=[
-            "comparison_scope", "pct_scope", "role_id",
-            "anchor_pts_id", "anchor_player_id", "anchor_team_id", "anchor_league", "anchor_season",
-            "comp_pts_id", "comp_player_id", "comp_team_id", "comp_league", "comp_season",
-            "different_league", "different_season",
-            "distance", "rank", "reason_1", "reason_2", "reason_3",
-        ])
+        return None, []
 
     feats = [f for f in ROLE_FEATURES.get(role_id, []) if f in df.columns]
     if not feats:
-        return pd.DataFrame(columns=[
-            "comparison_scope", "pct_scope", "role_id",
-            "anchor_pts_id", "anchor_player_id", "anchor_team_id", "anchor_league", "anchor_season",
-            "comp_pts_id", "comp_player_id", "comp_team_id", "comp_league", "comp_season",
-            "different_league", "different_season",
-            "distance", "rank", "reason_1", "reason_2", "reason_3",
-        ])
-
-    pool = df[df[score_col].notna()].copy()
+        return None, []
+
+    pool = df[df[score_col].notna()]
     if len(pool) < 2:
-        return pd.DataFrame(columns=[
-            "comparison_scope", "pct_scope", "role_id",
-            "anchor_pts_id", "anchor_player_id", "anchor_team_id", "anchor_league", "anchor_season",
-            "comp_pts_id", "comp_player_id", "comp_team_id", "comp_league", "comp_season",
-            "different_league", "different_season",
-            "distance", "rank", "reason_1", "reason_2", "reason_3",
-        ])
+        return None, feats
+    return pool, feats
 
-    eff_top_n = min(int(top_n), len(pool) - 1)
 
-    # Build feature matrix (percentiles 0..100). Fill NaNs conservatively with median.
-    X = pool[feats].apply(pd.to_numeric, errors="coerce")
-    X = X.fillna(X.median(numeric_only=True))
+def _raw_block(pool: pd.DataFrame, feats: list[str]) -> np.ndarray:
+    return pool[feats].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
 
-    # Invert "bad is high" features so similarity space aligns with role quality direction.
-    for f in feats:
-        if f in INVERT_PCT_FEATURES:
-            X[f] = 100.0 - X[f]
 
-    # Robust scale then compute cosine distances
+def _neighbour_arrays(
+    raw: np.ndarray,
+    feats: list[str],
+    k: int,
+    block_size: int | None,
+    memory_budget_mb: float,
+) -> tuple[np.ndarray, ...]:
+    """(anchor, comp, distance, reason ids, higher mask) for a raw (rows x feats) pct block."""
+    X, _ = role_feature_matrix(pd.DataFrame(raw, columns=feats), feats)
+
+    # Robust scale then cosine k-NN in memory-bounded anchor blocks
     scaler = RobustScaler()
     Xs = scaler.fit_transform(X)
-    D = cosine_distances(Xs, Xs)
-
-    rows: list[dict] = []
-    for i in range(len(pool)):
-        anchor = pool.iloc[i]
-        order = np.argsort(D[i])
-        order = order[order != i][:eff_top_n]
-
-        anchor_vec = Xs[i]
-        for rank, j in enumerate(order, start=1):
-            comp = pool.iloc[j]
-            reasons = _top_reason_codes(anchor_vec, Xs[j], feats, k=3)
-
-            rows.append({
-                "comparison_scope": comparison_scope,
-                "pct_scope": pct_scope,
-                "role_id": role_id,
-
-                "anchor_pts_id": anchor["player_team_season_id"],
-                "anchor_player_id": anchor["player_id"],
-                "anchor_team_id": anchor["team_id"],
-                "anchor_league": anchor["league"],
-                "anchor_season": anchor["season"],
-
-                "comp_pts_id": comp["player_team_season_id"],
-                "comp_player_id": comp["player_id"],
-                "comp_team_id": comp["team_id"],
-                "comp_league": comp["league"],
-                "comp_season": comp["season"],
-
-                "different_league": bool(anchor["league"] != comp["league"]),
-                "different_season": bool(anchor["season"] != comp["season"]),
-
-                "distance": float(D[i, j]),
-                "rank": int(rank),
-                "reason_1": reasons[0] if len(reasons) > 0 else None,
-                "reason_2": reasons[1] if len(reasons) > 1 else None,
-                "reason_3": reasons[2] if len(reasons) > 2 else None,
-            })
-
-    return pd.DataFrame(rows)
+    a, c, dist = blocked_knn(Xs, k, block_size=block_size, memory_budget_mb=memory_budget_mb)
+    reason_ids, higher = reason_codes(Xs[c] - Xs[a], feats)
+    return a, c, dist, reason_ids, higher
+
+
+def _assemble(
+    pool: pd.DataFrame,
+    role_id: str,
+    k: int,
+    arrays: tuple[np.ndarray, ...],
+    comparison_scope: str,
+    pct_scope: str,
+) -> pd.DataFrame:
+    a, c, dist, reason_ids, higher = arrays
+
+    # columnar assembly: fancy-index pool arrays once per output column
+    out = {
+        "comparison_scope": np.full(len(a), comparison_scope, dtype=object),
+        "pct_scope": np.full(len(a), pct_scope, dtype=object),
+        "role_id": np.full(len(a), role_id, dtype=object),
+    }
+    side = {key: pool[col].to_numpy() for key, col in _SIDE_COLS.items()}
+    for prefix, pos in (("anchor", a), ("comp", c)):
+        for key, v in side.items():
+            out[f"{prefix}_{key}"] = v[pos]
+    out["different_league"] = side["league"][a] != side["league"][c]
+    out["different_season"] = side["season"][a] != side["season"][c]
+    out["distance"] = dist.astype(float)
+    out["rank"] = np.tile(np.arange(1, k + 1, dtype=np.int64), len(pool))
+    for r in range(N_REASONS):
+        out[f"reason_feature_{r + 1}"] = reason_ids[:, r]
+    out["reason_higher_mask"] = higher
+    return pd.DataFrame(out, columns=COMPARABLES_COLUMNS)
+
+
+def _comparables_job(
+    path: str,
+    offset: int,
+    n_rows: int,
+    feats: list[str],
+    k: int,
+    block_size: int | None,
+    memory_budget_mb: float,
+) -> tuple[np.ndarray, ...]:
+    # read the job's slice of the shared .npy (no DataFrame pickling)
+    flat = np.load(path, mmap_mode="r")
+    raw = np.array(flat[offset:offset + n_rows * len(feats)]).reshape(n_rows, len(feats))
+    return _neighbour_arrays(raw, feats, k, block_size, memory_budget_mb)
+
+
+def _init_pool_worker() -> None:
+    # one BLAS thread per pool process (workers x BLAS threads would oversubscribe);
+    # the in-process path keeps the default thread count
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(limits=1)
+
+
+def build_comparables_parallel(
+    jobs: list[tuple[str, str, pd.DataFrame]],
+    top_n: int = 10,
+    comparison_scope: str = "league_season",
+    workers: int = 1,
+    block_size: int | None = None,
+    memory_budget_mb: float = 256.0,
+    tmp_dir: str | Path | None = None,
+) -> pd.DataFrame:
+    """
+    build_fact_comparables for many (role_id, pct_scope, df) jobs on a
+    process pool.
+
+    The parent writes every job's raw pct_* block once, one job at a time,
+    into one flat memory-mapped .npy; workers get (offset, shape, features)
+    only and return neighbour / reason arrays, which the parent turns into
+    output rows. Results are concatenated in job order whatever the completion
+    order, so the output equals running the jobs sequentially.
+    workers <= 1 runs the jobs in-process.
+    """
+    specs = []  # (role_id, pct_scope, pool, feats, k, offset)
+    offset = 0
+    for role_id, pct_scope, df in jobs:
+        pool, feats = _eligible_pool(df, role_id)
+        k = min(int(top_n), len(pool) - 1) if pool is not None else 0
+        if k < 1:
+            specs.append((role_id, pct_scope, None, feats, 0, 0))
+            continue
+        specs.append((role_id, pct_scope, pool, feats, k, offset))
+        offset += len(pool) * len(feats)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir, prefix="comparables_") as tmp:
+        path = str(Path(tmp) / "features.npy")
+        flat = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(offset,))
+        # one job's block in memory at a time, written straight to its slice
+        for _, _, pool, feats, _, off in specs:
+            if pool is not None:
+                raw = _raw_block(pool, feats)
+                flat[off:off + raw.size] = raw.ravel()
+        flat.flush()
+        del flat
+
+        args = [
+            (path, off, len(pool), feats, k, block_size, memory_budget_mb)
+            for _, _, pool, feats, k, off in specs if pool is not None
+        ]
+        if workers <= 1 or len(args) <= 1:
+            results = [_comparables_job(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(int(workers), len(args)), initializer=_init_pool_worker) as ex:
+                futures = [ex.submit(_comparables_job, *a) for a in args]
+                results = [f.result() for f in futures]
+
+    parts, it = [], iter(results)
+    for role_id, pct_scope, pool, _, k, _ in specs:
+        if pool is None:
+            parts.append(pd.DataFrame(columns=COMPARABLES_COLUMNS))
+            continue
+        parts.append(_assemble(pool, role_id, k, next(it), comparison_scope, pct_scope))
+    parts = [p for p in parts if len(p)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COMPARABLES_COLUMNS)
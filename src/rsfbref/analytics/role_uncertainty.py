@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.analytics.roles import RoleModel, compile_roles, load_roles
+from rsfbref.features.percentile_index import PercentileIndex
+
+# score_{role_id}{suffix} columns written by bootstrap_role_scores
+UNCERTAINTY_SUFFIXES = ("_lo", "_hi", "_rank", "_rank_lo", "_rank_hi")
+
+
+def uncertainty_columns(role_ids) -> list[str]:
+    """Exact names of the columns bootstrap_role_scores adds for role_ids."""
+    return [f"score_{r}{suffix}" for r in role_ids for suffix in UNCERTAINTY_SUFFIXES]
+
+
+def _resample(
+    rng: np.random.Generator,
+    kind: str,
+    value: np.ndarray,
+    nineties: np.ndarray,
+    attempts: np.ndarray | None,
+    size: int,
+) -> np.ndarray:
+    # (size x rows) replicate metric values under a parametric noise model
+    if kind == "poisson":
+        lam = np.clip(np.nan_to_num(value * nineties), 0, None)
+        return rng.poisson(lam, size=(size, len(value))) / nineties
+    # binomial: pct scale (0..100) over attempts
+    n = np.clip(np.nan_to_num(np.round(attempts)), 0, None).astype(np.int64)
+    p = np.clip(np.nan_to_num(value / 100), 0, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = rng.binomial(n, p, size=(size, len(value))) / n * 100
+    return np.where(n > 0, out, value)
+
+
+def _ranks_desc(S: np.ndarray) -> np.ndarray:
+    # per-column rank, highest score = 1, ties in row order
+    order = np.argsort(-S, axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, len(S) + 1)[:, None], axis=0)
+    return ranks
+
+
+def bootstrap_role_scores(
+    df: pd.DataFrame,
+    roles_yaml_path: str | None = None,
+    model: RoleModel | None = None,
+    scope: str = "league_season",
+    n_replicates: int = 1000,
+    ci: float = 0.9,
+    seed: int = 0,
+    batch_size: int = 100,
+    poisson_metrics: list[str] | None = None,
+    attempts_p90: dict[str, str] | None = None,
+    nineties_col: str = "nineties",
+) -> pd.DataFrame:
+    """
+    Parametric bootstrap of every score_{role_id} (df must come from score_roles).
+
+    Per replicate, counting metrics (poisson_metrics) are redrawn as
+    Poisson(value * nineties) / nineties and success-rate metrics
+    (attempts_p90: pct metric -> per-90 attempts column) as
+    Binomial(attempts, pct / 100); other features keep their observed pct.
+    Redrawn values replace the player's own value in their scope group's
+    pool (PercentileIndex lookup) and all roles are rescored with the
+    compiled weight matrices. Replicates run in batches of batch_size as
+    array operations, so short careers get visibly wider intervals.
+
+    Adds, for eligible rows (NaN elsewhere):
+      score_{role}_lo / _hi           central ci interval of the score
+      score_{role}_rank               observed rank in the role pool (1 = best)
+      score_{role}_rank_lo / _rank_hi central ci interval of the rank
+    """
+    if model is None:
+        model = compile_roles(load_roles(roles_yaml_path))
+    poisson_metrics = set(poisson_metrics or [])
+    attempts_p90 = dict(attempts_p90 or {})
+
+    out = df.copy()
+    score_cols = [f"score_{r}" for r in model.role_ids]
+    elig = np.column_stack([out[c].notna().to_numpy() for c in score_cols])  # rows x roles
+    rows = np.flatnonzero(elig.any(axis=1))
+    for c in uncertainty_columns(model.role_ids):
+        out[c] = np.nan
+    if len(rows) == 0 or n_replicates <= 0:
+        return out
+
+    features = [f for f in model.features if f"pct_{f}" in out.columns]
+    present = np.array([f in features for f in model.features])
+    w_pos, w_neg = model.w_pos[:, present], model.w_neg[:, present]
+    wsum = (w_pos + w_neg).sum(axis=1)
+
+    sub = out.iloc[rows]
+    nineties = pd.to_numeric(sub[nineties_col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    resampled = [f for f in features if f in poisson_metrics or f in attempts_p90]
+    index = PercentileIndex.build(out, metric_cols=resampled, scope=scope) if resampled else None
+    codes = index.group_codes(sub) if index is not None else None
+
+    P_obs = np.column_stack([
+        pd.to_numeric(sub[f"pct_{f}"], errors="coerce").to_numpy(dtype=float, na_value=np.nan) for f in features
+    ])
+    P_obs = np.where(np.isnan(P_obs), 0.0, P_obs)  # unused-by-role NaNs carry zero weight
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        S_obs = (P_obs @ w_pos.T + (100.0 - P_obs) @ w_neg.T) / wsum  # same arithmetic as replicates
+
+    rng = np.random.default_rng(seed)
+    scores = np.empty((len(rows), len(model.role_ids), n_replicates))
+    for lo in range(0, n_replicates, batch_size):
+        b = min(batch_size, n_replicates - lo)
+        P = np.broadcast_to(P_obs, (b,) + P_obs.shape).copy()  # replicates x rows x features
+        for j, f in enumerate(features):
+            if f not in resampled:
+                continue
+            value = pd.to_numeric(sub[f], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            if f in poisson_metrics:
+                x = _resample(rng, "poisson", value, nineties, None, b)
+            else:
+                att = pd.to_numeric(sub[attempts_p90[f]], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                x = _resample(rng, "binomial", value, nineties, att * nineties, b)
+            pct = index.pct_values(f, codes, x, observed=value)
+            P[:, :, j] = np.where(np.isnan(pct), P_obs[:, j], pct)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            S = (P @ w_pos.T + (100.0 - P) @ w_neg.T) / wsum  # replicates x rows x roles
+        scores[:, :, lo:lo + b] = np.moveaxis(S, 0, -1)
+
+    q_lo, q_hi = (1 - ci) / 2 * 100, (1 + ci) / 2 * 100
+    for r, c in enumerate(score_cols):
+        mask = elig[rows, r]
+        if not mask.any():
+            continue
+        at = rows[mask]
+        S = scores[mask, r, :]  # players x replicates
+
+        # rank within the role pool per replicate and observed (1 = best)
+        ranks = _ranks_desc(np.column_stack([S_obs[mask, r], S]))
+
+        cols = {
+            "_lo": np.percentile(S, q_lo, axis=1),
+            "_hi": np.percentile(S, q_hi, axis=1),
+            "_rank": ranks[:, 0],
+            "_rank_lo": np.percentile(ranks[:, 1:], q_lo, axis=1),
+            "_rank_hi": np.percentile(ranks[:, 1:], q_hi, axis=1),
+        }
+        for suffix, vals in cols.items():
+            full = np.full(len(out), np.nan)
+            full[at] = vals
+            out[f"{c}{suffix}"] = full
+    return out
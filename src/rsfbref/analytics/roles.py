@@ -1,91 +1,224 @@
 from __future__ import annotations
+from dataclasses import dataclass
 from pathlib import Path
 import yaml
+import numpy as np
 import pandas as pd
 
+# role weight keys -> canonical metric (percentile column is pct_{metric}).
+# "combined" keys from the role YAML resolve here; unlisted keys are used as-is.
+FEATURE_ALIASES: dict[str, str] = {
+    "long_pass_cmp_p90_or_pct": "long_pass_cmp_pct",
+    "aerial_win_pct_or_won_p90": "aerial_win_pct",
+    "errors_or_dispossessed_neg": "errors_p90",  # errors as the negative proxy for BPCB
+    "dispossessed_miscontrols_neg": "mis_dis_p90",
+    "fouls_committed_neg": "fouls_p90",
+    "tackles_interceptions_p90": "tkl_int_p90",
+    "clearances_p90": "clr_p90",
+    "npxg_p90": "Per_90_Minutes_npxG",
+}
+
 def load_roles(path: str) -> list[dict]:
     return yaml.safe_load(Path(path).read_text(encoding="utf-8"))["roles"]
 
-def apply_must_haves(df: pd.DataFrame, role: dict) -> pd.Series:
-    mh = role.get("must_have", {})
-    mask = pd.Series(True, index=df.index)
-
-    if "min_minutes" in mh:
-        mask &= df["minutes"] >= mh["min_minutes"]
-
-    # Map must-have fields to canonical columns
-    # (these names correspond to your roles_v1.yaml keys)
-    if "pass_cmp_pct_min" in mh:
-        mask &= df["pass_cmp_pct"] >= mh["pass_cmp_pct_min"]
-    if "prog_passes_p90_min" in mh:
-        mask &= df["prog_passes_p90"] >= mh["prog_passes_p90_min"]
-    if "aerial_win_pct_min" in mh and "aerial_win_pct" in df.columns:
-        mask &= df["aerial_win_pct"] >= mh["aerial_win_pct_min"]
-    if "passes_att_p90_min" in mh:
-        mask &= df["passes_att_p90"] >= mh["passes_att_p90_min"]
-    if "prog_carries_p90_min" in mh:
-        mask &= df["prog_carries_p90"] >= mh["prog_carries_p90_min"]
-    if "succ_takeons_p90_min" in mh:
-        mask &= df["succ_takeons_p90"] >= mh["succ_takeons_p90_min"]
-    if "xa_p90_min" in mh:
-        mask &= df["xa_p90"] >= mh["xa_p90_min"]
-
-    return mask
-
-def score_roles(df: pd.DataFrame, roles_yaml_path: str) -> pd.DataFrame:
-    out = df.copy()
-    roles = load_roles(roles_yaml_path)
+def resolve_feature(key: str) -> str:
+    return FEATURE_ALIASES.get(key, key)
+
+
+@dataclass(frozen=True)
+class RoleModel:
+    """
+    Roles compiled to roles x features weight matrices over pct_{feature}.
+    w_pos holds regular weights, w_neg weights of negative_metrics (scored
+    on 100 - pct), so score = (P @ w_pos.T + (100 - P) @ w_neg.T) / wsum.
+    uses marks every (role, feature) pair listed in the role, even at weight 0.
+    """
+    roles: list[dict]
+    role_ids: list[str]
+    features: list[str]
+    w_pos: np.ndarray
+    w_neg: np.ndarray
+    uses: np.ndarray
+
 
+def compile_roles(roles: list[dict]) -> RoleModel:
+    features: dict[str, int] = {}
     for role in roles:
-        role_id = role["role_id"]
-        bucket = role["position_bucket"]
-        weights = role["weights"]
+        for k in role["weights"]:
+            features.setdefault(resolve_feature(k), len(features))
+
+    w_pos = np.zeros((len(roles), len(features)))
+    w_neg = np.zeros((len(roles), len(features)))
+    uses = np.zeros((len(roles), len(features)), dtype=bool)
+    for r, role in enumerate(roles):
         negatives = set(role.get("negative_metrics", []))
+        for k, w in role["weights"].items():
+            target = w_neg if k in negatives else w_pos
+            target[r, features[resolve_feature(k)]] += w
+            uses[r, features[resolve_feature(k)]] = True
+
+    return RoleModel(
+        roles=roles,
+        role_ids=[r["role_id"] for r in roles],
+        features=list(features),
+        w_pos=w_pos,
+        w_neg=w_neg,
+        uses=uses,
+    )
+
+# must_have keys are "{column}_{op}"; legacy spellings map to (column, op)
+MUST_HAVE_OPS = ("between", "min", "max", "in")
+MUST_HAVE_ALIASES: dict[str, tuple[str, str]] = {
+    "min_minutes": ("minutes", "min"),
+}
+# columns whose must-haves in-memory scoring skips when the frame lacks them
+# (as before the rule language: e.g. what-if profiles without aerial data)
+OPTIONAL_MUST_HAVE_COLUMNS = frozenset({"aerial_win_pct"})
+
+
+@dataclass(frozen=True)
+class MustHave:
+    """One must-have rule: column >= / <= / in / between value (inclusive)."""
+    column: str
+    op: str
+    value: object
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        x = df[self.column]
+        if self.op == "min":
+            m = x >= self.value
+        elif self.op == "max":
+            m = x <= self.value
+        elif self.op == "in":
+            m = x.isin(list(self.value))
+        else:  # between
+            lo, hi = self.value
+            m = x.between(lo, hi)
+        return m.fillna(False).to_numpy(dtype=bool)
+
+    def expression(self):
+        import pyarrow.dataset as ds
+
+        f = ds.field(self.column)
+        if self.op == "min":
+            return f >= self.value
+        if self.op == "max":
+            return f <= self.value
+        if self.op == "in":
+            return f.isin(list(self.value))
+        lo, hi = self.value
+        return (f >= lo) & (f <= hi)
+
+
+def parse_must_have(key: str, value: object) -> MustHave:
+    if key in MUST_HAVE_ALIASES:
+        column, op = MUST_HAVE_ALIASES[key]
+        return MustHave(column, op, value)
+    for op in MUST_HAVE_OPS:
+        if key.endswith(f"_{op}"):
+            column = key[: -len(op) - 1]
+            if op == "between" and (not isinstance(value, (list, tuple)) or len(value) != 2):
+                raise ValueError(f"must_have {key}: between takes [low, high], got {value!r}")
+            if op == "in" and not isinstance(value, (list, tuple)):
+                raise ValueError(f"must_have {key}: in takes a list, got {value!r}")
+            return MustHave(column, op, tuple(value) if op in {"in", "between"} else value)
+    raise ValueError(f"must_have {key}: unknown operator. Use {{column}}_{{{'|'.join(MUST_HAVE_OPS)}}}")
+
+
+def compile_must_haves(
+    role: dict,
+    columns: list[str] | None = None,
+    optional: frozenset[str] = frozenset(),
+) -> list[MustHave]:
+    """
+    Parse a role's must_have block. If columns is given (frame columns or a
+    Parquet schema), rules on unknown columns raise instead of being skipped,
+    except rules on optional columns, which are dropped.
+    """
+    rules = [parse_must_have(k, v) for k, v in (role.get("must_have") or {}).items()]
+    if columns is not None:
+        known = set(columns)
+        rules = [r for r in rules if r.column in known or r.column not in optional]
+        unknown = sorted({r.column for r in rules if r.column not in known})
+        if unknown:
+            raise ValueError(f"Role {role.get('role_id')}: must_have on unknown columns {unknown}")
+    return rules
 
-        # eligibility by bucket
-        elig = out["position_bucket"].eq(bucket)
 
-        # must-haves
-        elig &= apply_must_haves(out, role)
+def apply_must_haves(df: pd.DataFrame, role: dict) -> pd.Series:
+    """
+    Eligibility mask of df for a role's must-haves. Rules on
+    OPTIONAL_MUST_HAVE_COLUMNS absent from df are skipped; any other unknown
+    column raises (role_filter / read_role_pool pushdown is always strict).
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for rule in compile_must_haves(role, columns=list(df.columns), optional=OPTIONAL_MUST_HAVE_COLUMNS):
+        mask &= rule.mask(df)
+    return pd.Series(mask, index=df.index)
+
+
+def role_filter(role: dict, columns: list[str] | None = None):
+    """
+    PyArrow dataset filter for a role's eligible pool: position bucket,
+    must-haves and (if present) a non-null score_{role_id}.
+    """
+    import pyarrow.dataset as ds
+
+    expr = ds.field("position_bucket") == role["position_bucket"]
+    for rule in compile_must_haves(role, columns=columns):
+        expr = expr & rule.expression()
+    score_col = f"score_{role['role_id']}"
+    if columns is not None and score_col in columns:
+        expr = expr & ds.field(score_col).is_valid() & ~ds.field(score_col).is_nan()
+    return expr
+
+
+def read_role_pool(path: str | Path, role: dict, columns: list[str] | None = None) -> pd.DataFrame:
+    """Read only the role's eligible rows from a Parquet file (predicate pushdown)."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(path), format="parquet")
+    expr = role_filter(role, columns=dataset.schema.names)
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def score_roles(df: pd.DataFrame, roles_yaml_path: str | None = None, model: RoleModel | None = None) -> pd.DataFrame:
+    """
+    Add score_{role_id} for every role: weighted mean of the role's pct_*
+    features (negative_metrics as 100 - pct), NA outside the role's bucket /
+    must-haves. Features without a pct_* column are skipped (and left out of
+    the weight sum); a NaN pct makes that role's score NaN.
+
+    All roles are scored with one NaN-aware matrix multiply over the pct block.
+    Pass a precompiled model to skip YAML loading.
+    """
+    if model is None:
+        model = compile_roles(load_roles(roles_yaml_path))
 
-        # build weighted score from percentiles
-        score = pd.Series(0.0, index=out.index)
-        wsum = 0.0
-
-        for k, w in weights.items():
-            # map config keys -> canonical percentile columns
-            # we encode “combined” keys in config; resolve them here.
-            if k == "long_pass_cmp_p90_or_pct":
-                feat = "long_pass_cmp_pct"
-            elif k == "aerial_win_pct_or_won_p90":
-                feat = "aerial_win_pct"
-            elif k == "errors_or_dispossessed_neg":
-                feat = "errors_p90"  # we treat errors as the negative proxy for BPCB
-            elif k == "dispossessed_miscontrols_neg":
-                feat = "mis_dis_p90"
-            elif k == "fouls_committed_neg":
-                feat = "fouls_p90"
-            elif k == "tackles_interceptions_p90":
-                feat = "tkl_int_p90"
-            elif k == "clearances_p90":
-                feat = "clr_p90"
-            elif k == "npxg_p90":
-                feat = "Per_90_Minutes_npxG"
-            else:
-                feat = k
-
-            pct_col = f"pct_{feat}"
-            if pct_col not in out.columns:
-                # If a feature is missing, skip it (v1 robustness)
-                continue
-
-            val = out[pct_col]
-            if k in negatives:
-                val = 100 - val
-
-            score += w * val
-            wsum += w
-
-        out[f"score_{role_id}"] = (score / wsum).where(elig, pd.NA)
+    out = df.copy()
+    n = len(out)
+
+    present = np.array([f"pct_{f}" in out.columns for f in model.features], dtype=bool)
+    P = np.zeros((n, len(model.features)))
+    for j in np.flatnonzero(present):
+        P[:, j] = pd.to_numeric(out[f"pct_{model.features[j]}"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    w_pos = model.w_pos * present
+    w_neg = model.w_neg * present
+    used = model.uses & present
+
+    nan = np.isnan(P)
+    P0 = np.where(nan, 0.0, P)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = P0 @ w_pos.T + (100.0 - P0) @ w_neg.T
+        score[(nan.astype(np.int64) @ used.T.astype(np.int64)) > 0] = np.nan
+        score = score / (w_pos + w_neg).sum(axis=1)
+
+    for r, role in enumerate(model.roles):
+        # eligibility by bucket + must-haves
+        elig = out["position_bucket"].eq(role["position_bucket"])
+        elig &= apply_must_haves(out, role)
+        out[f"score_{role['role_id']}"] = pd.Series(score[:, r], index=out.index).where(elig, pd.NA)
 
     return out
+
@@ -1,98 +1,231 @@
 from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import yaml
+import numpy as np
 import pandas as pd
 
-SUBSCORES = {
-    "BPCB": {
-        "progression": ["pct_prog_passes_p90", "pct_passes_final_third_p90", "pct_prog_carries_p90"],
-        "defending": ["pct_tkl_int_p90", "pct_clr_p90", "pct_aerial_win_pct"],
-        "security": ["pct_pass_cmp_pct", "pct_errors_p90"],
-        "creation": [],  # not primary
-    },
-    "DLP": {
-        "progression": ["pct_prog_passes_p90", "pct_passes_final_third_p90", "pct_prog_carries_p90"],
-        "creation": ["pct_key_passes_p90", "pct_xa_p90", "pct_sca_p90"],
-        "defending": ["pct_tkl_int_p90"],
-        "security": ["pct_pass_cmp_pct", "pct_fouls_p90"],
-    },
-    "WCR": {
-        "progression": ["pct_prog_carries_p90", "pct_carries_pa_p90", "pct_succ_takeons_p90"],
-        "creation": ["pct_xa_p90", "pct_key_passes_p90", "pct_sca_p90", "pct_crosses_pa_p90"],
-        "finishing": ["pct_Per_90_Minutes_npxG"],
-        "security": ["pct_takeon_succ_pct", "pct_mis_dis_p90"],
-    },
-}
+from rsfbref.analytics.roles import MustHave, parse_must_have
 
-def _mean_pct(df: pd.DataFrame, cols: list[str], invert: list[str] | None = None) -> pd.Series:
-    cols = [c for c in cols if c in df.columns]
-    if not cols:
-        return pd.Series(pd.NA, index=df.index)
-    X = df[cols].astype(float).copy()
-    if invert:
-        for c in invert:
-            if c in X.columns:
-                X[c] = 100 - X[c]
-    return X.mean(axis=1)
+DEFAULT_ROLES_PATH = "configs/roles_v1.yaml"
 
-def _evidence_strings(df: pd.DataFrame, role_id: str, top_k: int = 5) -> pd.DataFrame:
-    # choose evidence KPIs per role (raw + pct)
-    role_kpis = {
-        "BPCB": ["prog_passes_p90", "passes_final_third_p90", "pass_cmp_pct", "tkl_int_p90", "aerial_win_pct"],
-        "DLP": ["passes_att_p90", "prog_passes_p90", "pass_cmp_pct", "xa_p90", "sca_p90"],
-        "WCR": ["prog_carries_p90", "succ_takeons_p90", "xa_p90", "sca_p90", "Per_90_Minutes_npxG"],
-    }[role_id]
+# sub_* output order; extra YAML subscores follow in YAML order
+SUBSCORE_ORDER = ["progression", "defending", "creation", "finishing", "security"]
+
+@dataclass(frozen=True)
+class RiskRule:
+    flag: str
+    conditions: tuple[MustHave, ...]
+
+
+@dataclass(frozen=True)
+class ShortlistRules:
+    """
+    Shortlist rules from the role YAML: global risk_flags (bit b = flags[b])
+    and per-role subscores {name: [pct cols]} with subscore_invert columns
+    scored as 100 - pct.
+    """
+    flags: list[RiskRule]
+    subscores: dict[str, dict[str, list[str]]]
+    invert: dict[str, set[str]]
+
+
+def load_shortlist_rules(path: str | Path = DEFAULT_ROLES_PATH) -> ShortlistRules:
+    doc = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
+    flags = [
+        RiskRule(flag=f["flag"], conditions=tuple(parse_must_have(k, v) for k, v in f["when"].items()))
+        for f in doc.get("risk_flags", [])
+    ]
+    if len({f.flag for f in flags}) != len(flags):
+        raise ValueError(f"Duplicate risk flag names in {path}")
+    return ShortlistRules(
+        flags=flags,
+        subscores={r["role_id"]: dict(r.get("subscores") or {}) for r in doc["roles"]},
+        invert={r["role_id"]: set(r.get("subscore_invert") or []) for r in doc["roles"]},
+    )
+
+
+def risk_mask(df: pd.DataFrame, rules: ShortlistRules) -> np.ndarray:
+    """
+    int64 bitmask per row. Every condition is one vectorized compare into a
+    (rows x conditions) block; a flag fires when all its conditions hold,
+    evaluated for all flags with one matmul.
+    """
+    active = [
+        (b, f) for b, f in enumerate(rules.flags)
+        if all(c.column in df.columns for c in f.conditions)  # skip-on-missing
+    ]
+    conds = [c for _, f in active for c in f.conditions]
+    if not conds:
+        return np.zeros(len(df), dtype=np.int64)
 
+    C = np.column_stack([c.mask(df) for c in conds]).astype(np.int64)
+    M = np.zeros((len(conds), len(active)), dtype=np.int64)
+    need = np.zeros(len(active), dtype=np.int64)
+    k = 0
+    for a, (_, f) in enumerate(active):
+        M[k:k + len(f.conditions), a] = 1
+        need[a] = len(f.conditions)
+        k += len(f.conditions)
+    fired = (C @ M) == need
+    bits = np.array([1 << b for b, _ in active], dtype=np.int64)
+    return fired.astype(np.int64) @ bits
+
+
+def render_risk_flags(mask: np.ndarray, rules: ShortlistRules) -> tuple[np.ndarray, np.ndarray]:
+    """("A|B" labels, flag counts) per row; each distinct mask is rendered once."""
+    uniq, inv = np.unique(mask, return_inverse=True)
+    labels = np.empty(len(uniq), dtype=object)
+    labels[:] = ["|".join(f.flag for b, f in enumerate(rules.flags) if m >> b & 1) for m in uniq.tolist()]
+    counts = np.array([bin(m).count("1") for m in uniq.tolist()], dtype=np.int64)
+    return labels[inv], counts[inv]
+
+
+def subscore_block(df: pd.DataFrame, rules: ShortlistRules, role_ids: list[str]) -> dict[tuple[str, str], np.ndarray | None]:
+    """
+    NaN-skipping mean pct of every (role, subscore) in one matmul over the
+    oriented pct block. None = none of the subscore's columns are present.
+    """
+    feats: dict[tuple[str, bool], int] = {}
+    pairs: list[tuple[str, str, list[int]]] = []
+    for role_id in role_ids:
+        inv = rules.invert.get(role_id, set())
+        for sub, cols in rules.subscores.get(role_id, {}).items():
+            idx = [feats.setdefault((c, c in inv), len(feats)) for c in cols if c in df.columns]
+            pairs.append((role_id, sub, idx))
+
+    X = np.empty((len(df), len(feats)))
+    for (c, inverted), j in feats.items():
+        v = df[c].astype(float).to_numpy(dtype=float, na_value=np.nan)
+        X[:, j] = 100 - v if inverted else v
+    A = np.zeros((len(feats), len(pairs)))
+    for k, (_, _, idx) in enumerate(pairs):
+        A[idx, k] = 1.0
+
+    valid = ~np.isnan(X)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (np.where(valid, X, 0.0) @ A) / (valid.astype(float) @ A)
+    return {(r, sub): (means[:, k] if idx else None) for k, (r, sub, idx) in enumerate(pairs)}
+
+
+EVIDENCE_KPIS = {
+    "BPCB": ["prog_passes_p90", "passes_final_third_p90", "pass_cmp_pct", "tkl_int_p90", "aerial_win_pct"],
+    "DLP": ["passes_att_p90", "prog_passes_p90", "pass_cmp_pct", "xa_p90", "sca_p90"],
+    "WCR": ["prog_carries_p90", "succ_takeons_p90", "xa_p90", "sca_p90", "Per_90_Minutes_npxG"],
+}
+
+def _evidence_strings(df: pd.DataFrame, role_id: str, top_k: int = 5) -> pd.DataFrame:
+    # choose evidence KPIs per role (raw + pct); formatted column-wise
     out = df.copy()
-    for i, k in enumerate(role_kpis[:top_k], start=1):
+    for i, k in enumerate(EVIDENCE_KPIS[role_id][:top_k], start=1):
         pct = f"pct_{k}"
         if k in out.columns and pct in out.columns:
-            out[f"evidence_{i}"] = out.apply(lambda r: f"{k}={r[k]:.2f} (p{r[pct]:.0f})" if pd.notna(r[k]) and pd.notna(r[pct]) else None, axis=1)
+            v = pd.to_numeric(out[k], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            p = pd.to_numeric(out[pct], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            s = np.char.add(np.char.add(f"{k}=", np.char.mod("%.2f", v)), np.char.add(" (p", np.char.mod("%.0f", p)))
+            s = np.char.add(s, ")").astype(object)
+            s[np.isnan(v) | np.isnan(p)] = None
+            out[f"evidence_{i}"] = pd.Series(s, index=out.index)
         else:
             out[f"evidence_{i}"] = None
     return out
 
-def build_shortlist(df: pd.DataFrame, role_id: str, top_n: int = 50) -> pd.DataFrame:
-    score_col = f"score_{role_id}"
-    pool = df[df[score_col].notna()].copy()
-    if pool.empty:
-        return pd.DataFrame()
+AGE_BAND_EDGES = [21, 24, 28, 32]
+AGE_BAND_LABELS = ["U21", "21-23", "24-27", "28-31", "32+"]
+
+
+def add_age_band(df: pd.DataFrame, age_col: str = "age", edges: list[float] = AGE_BAND_EDGES, labels: list[str] = AGE_BAND_LABELS) -> pd.DataFrame:
+    """age_band column for grouped shortlists (missing age -> missing band)."""
+    if len(labels) != len(edges) + 1:
+        raise ValueError("age band labels must have one more entry than edges")
+    age = pd.to_numeric(df[age_col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    band = np.asarray(labels, dtype=object)[np.searchsorted(edges, np.nan_to_num(age), side="right")]
+    band[np.isnan(age)] = None
+    out = df.copy()
+    out["age_band"] = band
+    return out
 
-    # Subscores (with transparent inversions where relevant)
-    if role_id == "BPCB":
-        pool["sub_security"] = _mean_pct(pool, ["pct_pass_cmp_pct", "pct_errors_p90"], invert=["pct_errors_p90"])
-    elif role_id == "DLP":
-        pool["sub_security"] = _mean_pct(pool, ["pct_pass_cmp_pct", "pct_fouls_p90"], invert=["pct_fouls_p90"])
+
+def _grouped_top(score: np.ndarray, minutes: np.ndarray, codes: np.ndarray, top_n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Positions and 1-based ranks of each group's top_n by (score desc,
+    minutes desc), ordered by group code then rank. argpartition finds each
+    large group's top_n-th score; only rows at or above it (ties included)
+    are sorted, so the cost is near-linear in the pool size.
+    """
+    if top_n <= 0 or len(score) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    neg = -score
+    counts = np.bincount(codes)
+    keep = np.ones(len(score), dtype=bool)
+    big = np.flatnonzero(counts > top_n)
+    if len(big):
+        order = np.argsort(codes, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        for g in big:
+            seg = order[bounds[g]:bounds[g + 1]]
+            v = neg[seg]
+            kth = v[np.argpartition(v, top_n - 1)[top_n - 1]]
+            keep[seg[v > kth]] = False
+
+    # stable lexsort over the survivors: equal (score, minutes) keep row order
+    cand = np.flatnonzero(keep)
+    cand = cand[np.lexsort((-minutes[cand], neg[cand], codes[cand]))]
+    c = codes[cand]
+    rank = np.arange(len(cand)) - np.searchsorted(c, c, side="left") + 1
+    sel = rank <= top_n
+    return cand[sel], rank[sel]
+
+
+def _select_top(df: pd.DataFrame, role_id: str, top_n: int, group_cols: list[str] | None = None) -> tuple[pd.DataFrame, np.ndarray]:
+    # eligible pool (score not NaN) ranked by score desc, minutes desc; top_n per group
+    score_col = f"score_{role_id}"
+    pool = df[df[score_col].notna()]
+    if group_cols:
+        codes = pool.groupby(group_cols, dropna=False, sort=True).ngroup().to_numpy(dtype=np.int64)
     else:
-        pool["sub_security"] = _mean_pct(pool, ["pct_takeon_succ_pct", "pct_mis_dis_p90"], invert=["pct_mis_dis_p90"])
+        codes = np.zeros(len(pool), dtype=np.int64)
+    pos, rank = _grouped_top(
+        pool[score_col].to_numpy(dtype=float, na_value=np.nan),
+        pd.to_numeric(pool["minutes"], errors="coerce").to_numpy(dtype=float, na_value=np.nan),
+        codes,
+        top_n,
+    )
+    return pool.iloc[pos], rank
 
-    for sub, cols in SUBSCORES[role_id].items():
-        if sub == "security":
-            continue
-        pool[f"sub_{sub}"] = _mean_pct(pool, cols)
 
-    pool["total_score"] = pool[score_col]
+def _assemble(
+    top: pd.DataFrame,
+    rank: np.ndarray,
+    role_id: str,
+    subs: dict,
+    rules: ShortlistRules,
+    mask: np.ndarray,
+    group_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    pool = top.copy()
+    names = list(rules.subscores.get(role_id, {}))
+    for sub in names:
+        vals = subs[(role_id, sub)]
+        pool[f"sub_{sub}"] = pd.Series(pd.NA, index=pool.index) if vals is None else vals
 
-    # Risk flags (v1, rule-based)
-    flags = []
-    flags.append(pool["minutes"].between(900, 1200).map(lambda x: "LOW_MINUTES" if x else None))
-    if "pct_errors_p90" in pool.columns:
-        flags.append((pool["pct_errors_p90"] >= 90).map(lambda x: "HIGH_ERRORS" if x else None))
-    if "pct_mis_dis_p90" in pool.columns:
-        flags.append((pool["pct_mis_dis_p90"] >= 90).map(lambda x: "HIGH_TURNOVERS" if x else None))
-    flags.append((pool["age"] <= 19).map(lambda x: "VERY_YOUNG" if x else None))
-    flags.append((pool["age"] >= 32).map(lambda x: "OLDER_PROFILE" if x else None))
+    pool["total_score"] = pool[f"score_{role_id}"]
 
-    flags_df = pd.concat(flags, axis=1)
-    pool["risk_flags"] = flags_df.apply(lambda r: "|".join([x for x in r.tolist() if isinstance(x, str)]) if any(isinstance(x, str) for x in r.tolist()) else "", axis=1)
-    pool["risk_count"] = pool["risk_flags"].apply(lambda s: 0 if s == "" else len(s.split("|")))
+    labels, counts = render_risk_flags(mask, rules)
+    pool["risk_flags"] = pd.Series(labels, index=pool.index)
+    pool["risk_count"] = counts
 
     # Evidence
     pool = _evidence_strings(pool, role_id=role_id, top_k=5)
 
     # Final output columns (Tableau-friendly)
+    sub_cols = [f"sub_{s}" for s in SUBSCORE_ORDER] + [f"sub_{s}" for s in names if s not in SUBSCORE_ORDER]
+    id_cols = ["player_id", "team_id", "league", "season", "position_bucket", "minutes"]
     out_cols = [
-        "player_id", "team_id", "league", "season", "position_bucket", "minutes",
+        *id_cols,
+        *[c for c in group_cols or [] if c not in id_cols],
         "total_score",
-        "sub_progression", "sub_defending", "sub_creation", "sub_finishing", "sub_security",
+        *sub_cols,
         "risk_flags", "risk_count",
         "evidence_1", "evidence_2", "evidence_3", "evidence_4", "evidence_5",
     ]
@@ -100,7 +233,61 @@ def build_shortlist(df: pd.DataFrame, role_id: str, top_n: int = 50) -> pd.DataF
 
     out = pool[out_cols].copy()
     out["role_id"] = role_id
-
-    out = out.sort_values(["total_score", "minutes"], ascending=[False, False]).head(top_n)
-    out["rank"] = range(1, len(out) + 1)
+    out["rank"] = rank
     return out
+
+
+def build_shortlist(
+    df: pd.DataFrame,
+    role_id: str,
+    top_n: int = 50,
+    roles_yaml_path: str | Path = DEFAULT_ROLES_PATH,
+    rules: ShortlistRules | None = None,
+    group_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Top-N shortlist for one role; subscores and risk flags come from the role
+    YAML. With group_cols (e.g. ["league"], ["season", "age_band"]) every
+    group gets its own top_n and rank restarts at 1 per group.
+    """
+    return build_shortlists(df, [role_id], top_n=top_n, roles_yaml_path=roles_yaml_path, rules=rules, group_cols=group_cols)
+
+
+def build_shortlists(
+    df: pd.DataFrame,
+    role_ids: list[str],
+    top_n: int = 50,
+    roles_yaml_path: str | Path = DEFAULT_ROLES_PATH,
+    rules: ShortlistRules | None = None,
+    group_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Shortlists for several roles (optionally top_n per group_cols group).
+    Each role's top rows are selected first; risk masks and all roles'
+    subscores are then evaluated once over the union of selected rows.
+    """
+    rules = rules or load_shortlist_rules(roles_yaml_path)
+    tops = [(r, *_select_top(df, r, top_n, group_cols)) for r in role_ids]
+    tops = [(r, t, rank) for r, t, rank in tops if len(t)]
+    if not tops:
+        return pd.DataFrame()
+
+    # evaluate once on the distinct selected rows (positions into union)
+    pos = np.concatenate([df.index.get_indexer(t.index) for _, t, _ in tops]) if df.index.is_unique else None
+    if pos is not None:
+        uniq, inv = np.unique(pos, return_inverse=True)
+        union = df.iloc[uniq]
+    else:
+        union = pd.concat([t for _, t, _ in tops])
+        inv = np.arange(len(union))
+
+    mask = risk_mask(union, rules)
+    subs = subscore_block(union, rules, [r for r, _, _ in tops])
+
+    parts, k = [], 0
+    for r, t, rank in tops:
+        rows = inv[k:k + len(t)]
+        k += len(t)
+        role_subs = {key: (v[rows] if v is not None else None) for key, v in subs.items() if key[0] == r}
+        parts.append(_assemble(t, rank, r, role_subs, rules, mask[rows], group_cols))
+    return parts[0] if len(parts) == 1 else pd.concat(parts)
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import RobustScaler, normalize
+
+from rsfbref.analytics.comparables import N_REASONS, ROLE_FEATURES, reason_codes, role_feature_matrix
+
+INDEX_NAME = "index.json"
+SCALED_NAME = "scaled.npy"
+NORMALIZED_NAME = "normalized.npy"
+IDS_NAME = "ids.parquet"
+
+# pool columns kept next to the vectors (for output and filters)
+INDEX_ID_COLS = ["player_team_season_id", "player_id", "team_id", "league", "season", "minutes", "age"]
+
+QUERY_COLUMNS = [
+    "role_id", "pct_scope", "anchor_pts_id",
+    "comp_pts_id", "comp_player_id", "comp_team_id", "comp_league", "comp_season", "comp_age",
+    "different_league", "different_season",
+    "distance", "rank", "reason_feature_1", "reason_feature_2", "reason_feature_3", "reason_higher_mask",
+]
+
+
+class SimilarityIndex:
+    """
+    Persisted comparables search space for one role x pct scope.
+
+    Stores the fitted RobustScaler (center / scale), the pool medians used to
+    fill missing percentiles, the scaled matrix (for reason codes), the
+    L2-normalized matrix and a KDTree over it (not persisted: rebuilt from
+    the normalized matrix on load). On unit vectors Euclidean
+    distance is monotone in cosine distance (cos = d**2 / 2), so the tree
+    answers exact cosine k-NN; distances are then recomputed with the same
+    arithmetic as build_fact_comparables and ordered by (distance, pool
+    position).
+    """
+
+    def __init__(
+        self,
+        role_id: str,
+        scope: str,
+        feats: list[str],
+        center: np.ndarray,
+        scale: np.ndarray,
+        medians: np.ndarray,
+        scaled: np.ndarray,
+        normalized: np.ndarray,
+        ids: pd.DataFrame,
+        tree: KDTree,
+    ):
+        self.role_id = role_id
+        self.scope = scope
+        self.feats = list(feats)
+        self.center = np.asarray(center, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.medians = np.asarray(medians, dtype=float)
+        self.scaled = scaled
+        self.normalized = normalized
+        self.ids = ids.reset_index(drop=True)
+        self.tree = tree
+        self._pos = pd.Index(self.ids["player_team_season_id"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, role_id: str, scope: str) -> SimilarityIndex:
+        """Index the eligible pool (score_{role_id} not NaN) of df, as build_fact_comparables sees it."""
+        feats = [f for f in ROLE_FEATURES.get(role_id, []) if f in df.columns]
+        if not feats:
+            raise ValueError(f"No {role_id} similarity features in df")
+        pool = df[df[f"score_{role_id}"].notna()]
+
+        X, medians = role_feature_matrix(pool, feats)
+        scaler = RobustScaler().fit(X)
+        scaled = scaler.transform(X)
+        normalized = normalize(scaled)
+        ids = pool[[c for c in INDEX_ID_COLS if c in pool.columns]]
+        return cls(
+            role_id, scope, feats,
+            center=scaler.center_, scale=scaler.scale_, medians=medians.reindex(feats).to_numpy(dtype=float),
+            scaled=scaled, normalized=normalized, ids=ids, tree=KDTree(normalized),
+        )
+
+    def save(self, root: str | Path) -> None:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        np.save(root / SCALED_NAME, self.scaled)
+        np.save(root / NORMALIZED_NAME, self.normalized)
+        self.ids.to_parquet(root / IDS_NAME, index=False)
+        meta = {
+            "role_id": self.role_id,
+            "scope": self.scope,
+            "feats": self.feats,
+            "center": self.center.tolist(),
+            "scale": self.scale.tolist(),
+            "medians": self.medians.tolist(),
+        }
+        (root / INDEX_NAME).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, root: str | Path) -> SimilarityIndex:
+        root = Path(root)
+        meta = json.loads((root / INDEX_NAME).read_text(encoding="utf-8"))
+        normalized = np.load(root / NORMALIZED_NAME, mmap_mode="r")
+        return cls(
+            role_id=meta["role_id"],
+            scope=meta["scope"],
+            feats=meta["feats"],
+            center=np.array(meta["center"]),
+            scale=np.array(meta["scale"]),
+            medians=np.array(meta["medians"]),
+            scaled=np.load(root / SCALED_NAME, mmap_mode="r"),
+            normalized=normalized,
+            ids=pd.read_parquet(root / IDS_NAME),
+            tree=KDTree(np.asarray(normalized)),
+        )
+
+    def transform(self, profiles: pd.DataFrame) -> np.ndarray:
+        """
+        Scaled vectors for arbitrary profiles (pct_* columns, e.g. an ideal
+        template); missing features take the pool median.
+        """
+        prof = profiles.reindex(columns=self.feats)
+        X, _ = role_feature_matrix(prof, self.feats, medians=pd.Series(self.medians, index=self.feats))
+        return (X.to_numpy(dtype=float) - self.center) / self.scale
+
+    def _ages(self, ids: pd.DataFrame) -> np.ndarray:
+        # FBref ages may be strings ("24-123"); unparseable values become NaN
+        return pd.to_numeric(ids["age"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    def _allowed(
+        self,
+        anchor: pd.Series | None,
+        different_league: bool,
+        different_season: bool,
+        max_age: float | None,
+        leagues: list[str] | None,
+    ) -> np.ndarray:
+        ok = np.ones(len(self), dtype=bool)
+        if different_league and anchor is not None:
+            ok &= (self.ids["league"] != anchor["league"]).to_numpy(dtype=bool)
+        if different_season and anchor is not None:
+            ok &= (self.ids["season"] != anchor["season"]).to_numpy(dtype=bool)
+        if max_age is not None:
+            if "age" not in self.ids.columns:
+                raise ValueError("Index has no age column; rebuild it from a pool with age")
+            ok &= self._ages(self.ids) <= max_age
+        if leagues:
+            ok &= self.ids["league"].isin(leagues).to_numpy(dtype=bool)
+        return ok
+
+    def _search(self, q: np.ndarray, k: int, ok: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # widen the tree query until k allowed rows are found, then pull in every
+        # row tied with the k-th so (distance, position) ordering is exact
+        n_ok = int(ok.sum())
+        k = min(k, n_ok)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        m = min(len(self), max(2 * k, k + 16))
+        while True:
+            d, ind = self.tree.query(q[None, :], k=m)
+            hit = ok[ind[0]]
+            if hit.sum() >= k or m == len(self):
+                break
+            m = min(len(self), m * 4)
+        radius = d[0][hit][k - 1] * (1 + 1e-9) + 1e-12
+        cand = np.sort(self.tree.query_radius(q[None, :], r=radius)[0])
+        cand = cand[ok[cand]]
+
+        dist = 1 - np.asarray(self.normalized)[cand] @ q
+        np.clip(dist, 0, 2, out=dist)
+        order = np.lexsort((cand, dist))[:k]
+        return cand[order], dist[order]
+
+    def query(
+        self,
+        anchor_pts_id: str | None = None,
+        profile: pd.Series | dict | None = None,
+        k: int = 10,
+        different_league: bool = False,
+        different_season: bool = False,
+        max_age: float | None = None,
+        leagues: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Top-k comparables with distances and reason codes for one anchor
+        (player_team_season_id in the index; itself excluded) or for an
+        arbitrary profile of pct_* values (e.g. an ideal template).
+
+        Filters: different_league / different_season (anchor queries),
+        max_age, leagues. Reason codes are ids (render_reason_codes for text).
+        """
+        if (anchor_pts_id is None) == (profile is None):
+            raise ValueError("Pass exactly one of anchor_pts_id or profile")
+
+        if anchor_pts_id is not None:
+            pos = self._pos.get_indexer([anchor_pts_id])[0]
+            if pos < 0:
+                raise KeyError(f"{anchor_pts_id} is not in the {self.role_id}/{self.scope} index")
+            anchor = self.ids.iloc[pos]
+            xs = np.asarray(self.scaled[pos], dtype=float)
+            q = np.asarray(self.normalized[pos], dtype=float)
+        else:
+            pos, anchor = -1, None
+            xs = self.transform(pd.DataFrame([dict(profile)]))[0]
+            q = normalize(xs[None, :])[0]
+
+        ok = self._allowed(anchor, different_league, different_season, max_age, leagues)
+        if pos >= 0:
+            ok[pos] = False
+        comp, dist = self._search(q, k, ok)
+
+        ids = self.ids.iloc[comp]
+        reason_ids, higher = reason_codes(np.asarray(self.scaled)[comp] - xs, self.feats)
+        out = pd.DataFrame({
+            "role_id": self.role_id,
+            "pct_scope": self.scope,
+            "anchor_pts_id": anchor_pts_id,
+            "comp_pts_id": ids["player_team_season_id"].to_numpy(),
+            "comp_player_id": ids["player_id"].to_numpy(),
+            "comp_team_id": ids["team_id"].to_numpy(),
+            "comp_league": ids["league"].to_numpy(),
+            "comp_season": ids["season"].to_numpy(),
+            "comp_age": self._ages(ids) if "age" in ids.columns else np.nan,
+            "different_league": (ids["league"] != anchor["league"]).to_numpy() if anchor is not None else None,
+            "different_season": (ids["season"] != anchor["season"]).to_numpy() if anchor is not None else None,
+            "distance": dist,
+            "rank": np.arange(1, len(comp) + 1, dtype=np.int64),
+            **{f"reason_feature_{r + 1}": reason_ids[:, r] for r in range(N_REASONS)},
+            "reason_higher_mask": higher,
+        }, columns=QUERY_COLUMNS)
+        return out
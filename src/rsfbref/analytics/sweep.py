@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.analytics.roles import apply_must_haves, resolve_feature
+
+ID_COLS = ["player_team_season_id", "player_id", "team_id", "league", "season", "position_bucket", "minutes"]
+
+
+def role_feature_block(df: pd.DataFrame, role: dict) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """
+    (rows x role features) block of oriented percentiles (negative_metrics as
+    100 - pct) and the configured weight vector, same feature resolution as
+    score_roles: keys whose pct_* column is missing are dropped.
+    """
+    negatives = set(role.get("negative_metrics", []))
+    keys, cols, weights = [], [], []
+    for k, w in role["weights"].items():
+        col = f"pct_{resolve_feature(k)}"
+        if col in df.columns:
+            keys.append(k)
+            cols.append(col)
+            weights.append(float(w))
+
+    Z = np.empty((len(df), len(cols)))
+    for j, (k, col) in enumerate(zip(keys, cols)):
+        v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        Z[:, j] = 100 - v if k in negatives else v
+    return Z, np.array(weights), keys
+
+
+def dirichlet_weights(base: np.ndarray, n_samples: int, concentration: float = 50.0, seed: int = 0) -> np.ndarray:
+    """
+    (n_samples x k) weight vectors drawn from a Dirichlet centred on the
+    configured weights; higher concentration = smaller perturbations.
+    Rows keep the configured weight sum.
+    """
+    rng = np.random.default_rng(seed)
+    p = base / base.sum()
+    return rng.dirichlet(p * concentration, size=n_samples) * base.sum()
+
+
+def grid_weights(base: np.ndarray, deltas: tuple[float, ...] = (-0.5, -0.25, 0.25, 0.5)) -> np.ndarray:
+    """
+    One-at-a-time grid: the configured weights plus every single weight
+    scaled by (1 + delta). Row 0 is the configured vector.
+    """
+    rows = [base]
+    for j in range(len(base)):
+        for d in deltas:
+            w = base.copy()
+            w[j] = max(w[j] * (1 + d), 0.0)
+            rows.append(w)
+    return np.vstack(rows)
+
+
+def sweep_role_weights(
+    df: pd.DataFrame,
+    role: dict,
+    weights: np.ndarray,
+    top_n: int = 50,
+    batch_size: int = 512,
+) -> pd.DataFrame:
+    """
+    Rank stability of a role shortlist under many weight vectors.
+
+    The shortlist pool (bucket + must-haves, score not NaN) is scored for a
+    batch of weight vectors at once with a matmul; ranks follow
+    build_shortlist ordering (score desc, minutes desc). Only an int32
+    (players x samples) rank matrix is kept - no per-sample frames.
+
+    Returns one row per pool player: base_rank (configured weights),
+    topn_freq, median / p10 / p90 / best / worst rank, n_samples.
+    """
+    role_id = role["role_id"]
+    elig = df["position_bucket"].eq(role["position_bucket"]) & apply_must_haves(df, role)
+    pool = df[elig]
+
+    Z, base, _ = role_feature_block(pool, role)
+    keep = ~np.isnan(Z).any(axis=1) if Z.shape[1] else np.zeros(len(pool), dtype=bool)
+    pool, Z = pool[keep], Z[keep]
+
+    # pre-sort by minutes desc: a stable sort on -score then breaks ties like build_shortlist
+    by_minutes = np.argsort(-pool["minutes"].to_numpy(dtype=float), kind="stable")
+    pool, Z = pool.iloc[by_minutes], Z[by_minutes]
+    n, S = len(pool), len(weights)
+
+    def ranks_for(W: np.ndarray) -> np.ndarray:
+        scores = Z @ W.T / W.sum(axis=1)
+        order = np.argsort(-scores, axis=0, kind="stable")
+        r = np.empty_like(order, dtype=np.int32)
+        np.put_along_axis(r, order, np.arange(1, n + 1, dtype=np.int32)[:, None], axis=0)
+        return r
+
+    ranks = np.empty((n, S), dtype=np.int32)
+    for lo in range(0, S, batch_size):
+        ranks[:, lo:lo + batch_size] = ranks_for(weights[lo:lo + batch_size])
+
+    id_cols = [c for c in ID_COLS if c in pool.columns]
+    out = pool[id_cols].reset_index(drop=True)
+    out["role_id"] = role_id
+    out["base_rank"] = ranks_for(base[None, :])[:, 0] if n else np.zeros(0, dtype=np.int32)
+    out["topn_freq"] = (ranks <= top_n).mean(axis=1) if S else np.nan
+    if n and S:
+        q = np.percentile(ranks, [50, 10, 90], axis=1)
+        out["median_rank"], out["p10_rank"], out["p90_rank"] = q[0], q[1], q[2]
+        out["best_rank"] = ranks.min(axis=1)
+        out["worst_rank"] = ranks.max(axis=1)
+    else:
+        for c in ["median_rank", "p10_rank", "p90_rank", "best_rank", "worst_rank"]:
+            out[c] = np.nan
+    out["n_samples"] = S
+    return out.sort_values("base_rank", kind="stable").reset_index(drop=True)
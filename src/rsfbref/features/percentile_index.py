@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.analytics.roles import score_roles
+from rsfbref.features.percentiles import _group_codes, _metric_block
+from rsfbref.features.scopes import get_scope_spec
+
+INDEX_NAME = "index.json"
+VALUES_NAME = "values.npy"
+OFFSETS_NAME = "offsets.npy"
+
+
+class PercentileIndex:
+    """
+    Persisted, query-only view of one percentile scope.
+
+    For every scope group x metric the non-NaN pool values are stored sorted
+    in one flat array (values.npy); offsets.npy holds the slice bounds of
+    segment (metric j, group g) at j * n_groups + g. A percentile query is
+    two searchsorted calls (O(log n)) with method="average" tie semantics, so
+    new or hypothetical players can be scored without rerunning the pipeline.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        group_cols: list[str],
+        metric_cols: list[str],
+        groups: pd.DataFrame,
+        values: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.scope = scope
+        self.group_cols = list(group_cols)
+        self.metric_cols = list(metric_cols)
+        self.groups = groups.reset_index(drop=True)
+        self.values = values
+        self.offsets = offsets
+        self._group_index = pd.MultiIndex.from_frame(self.groups[self.group_cols])
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.groups)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, metric_cols: list[str], scope: str) -> PercentileIndex:
+        group_cols = get_scope_spec(scope).group_cols
+        codes = _group_codes(df, group_cols)
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
+        groups = (
+            df[group_cols].assign(_code=codes)
+            .drop_duplicates("_code").sort_values("_code")
+            .drop(columns="_code")
+        )
+
+        X = _metric_block(df, metric_cols)
+        parts, counts = [], []
+        for j in range(len(metric_cols)):
+            x = X[:, j]
+            order = np.argsort(x)
+            order = order[np.argsort(codes[order], kind="stable")]  # by group, then value
+            keep = ~np.isnan(x[order])
+            parts.append(x[order][keep])
+            counts.append(np.bincount(codes[order][keep], minlength=n_groups))
+
+        sizes = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        values = np.concatenate(parts) if parts else np.zeros(0)
+        return cls(scope, group_cols, metric_cols, groups, values, offsets)
+
+    def save(self, root: str | Path) -> None:
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        np.save(root / VALUES_NAME, self.values)
+        np.save(root / OFFSETS_NAME, self.offsets)
+        meta = {
+            "scope": self.scope,
+            "group_cols": self.group_cols,
+            "metric_cols": self.metric_cols,
+            "groups": self.groups[self.group_cols].astype(object).values.tolist(),
+        }
+        (root / INDEX_NAME).write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+
+    @classmethod
+    def load(cls, root: str | Path) -> PercentileIndex:
+        root = Path(root)
+        meta = json.loads((root / INDEX_NAME).read_text(encoding="utf-8"))
+        groups = pd.DataFrame(meta["groups"], columns=meta["group_cols"])
+        return cls(
+            scope=meta["scope"],
+            group_cols=meta["group_cols"],
+            metric_cols=meta["metric_cols"],
+            groups=groups,
+            values=np.load(root / VALUES_NAME, mmap_mode="r"),
+            offsets=np.load(root / OFFSETS_NAME),
+        )
+
+    def segment(self, metric: str, group: int) -> np.ndarray:
+        """Sorted pool values of one metric within one scope group."""
+        k = self.metric_cols.index(metric) * self.n_groups + group
+        return self.values[self.offsets[k]:self.offsets[k + 1]]
+
+    def group_codes(self, df: pd.DataFrame) -> np.ndarray:
+        """Index group code per row of df (-1 = group not in the index)."""
+        keys = pd.MultiIndex.from_frame(df[self.group_cols].astype(object))
+        return self._group_index.get_indexer(keys)
+
+    def pct_values(
+        self,
+        metric: str,
+        codes: np.ndarray,
+        x: np.ndarray,
+        as_member: bool = False,
+        observed: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Array form of pct() for one metric: codes from group_codes(), x the
+        values to look up (any shape whose last axis matches codes).
+
+        observed: the rows' own pool values; x then *replaces* them in the
+        pool (pool size unchanged), so x == observed gives the exact batch
+        percentile. Used to rank resampled values.
+        """
+        x = np.asarray(x, dtype=float)
+        res = np.full(x.shape, np.nan)
+        known = np.flatnonzero(codes >= 0)
+        by_group = known[np.argsort(codes[known], kind="stable")]
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[known], minlength=self.n_groups))])
+
+        for g in np.flatnonzero(np.diff(bounds)):
+            rows = by_group[bounds[g]:bounds[g + 1]]
+            seg = self.segment(metric, g)
+            n = len(seg)
+            if n == 0:
+                continue
+            xv = x[..., rows]
+            lt = np.searchsorted(seg, xv, side="left").astype(float)
+            le = np.searchsorted(seg, xv, side="right").astype(float)
+            if observed is not None:
+                obs = observed[rows]
+                lt -= obs < xv
+                le -= obs <= xv
+                le += 1
+                r = (lt + le + 1) / 2 / n * 100
+                r = np.where(np.isnan(obs), np.nan, r)
+            elif as_member:
+                r = (lt + le + 1) / 2 / n * 100
+            else:
+                r = (lt + le + 2) / 2 / (n + 1) * 100
+            res[..., rows] = np.where(np.isnan(xv), np.nan, r)
+        return res
+
+    def pct(self, df: pd.DataFrame, as_member: bool = False) -> pd.DataFrame:
+        """
+        pct_{metric} (0..100, method="average") for each row of df, looked up
+        against its scope group's pool.
+
+        as_member=True: the row is already part of the pool (reproduces
+        add_percentiles_wide). as_member=False: the row is scored as if it
+        joined the pool (n + 1 values, its own value counted once).
+        Unknown groups, missing metric columns and NaN values give NaN.
+        """
+        codes = self.group_codes(df)
+        out = pd.DataFrame(index=df.index)
+        for metric in self.metric_cols:
+            if metric in df.columns:
+                x = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                out[f"pct_{metric}"] = self.pct_values(metric, codes, x, as_member=as_member)
+            else:
+                out[f"pct_{metric}"] = np.nan
+        return out
+
+
+def score_profiles(
+    index: PercentileIndex,
+    profiles: pd.DataFrame,
+    roles_yaml_path: str,
+    as_member: bool = False,
+) -> pd.DataFrame:
+    """
+    Raw metric profiles (scope group cols, minutes, metrics) -> profiles with
+    pct_* columns from the index and score_{role} columns from score_roles.
+    """
+    pct = index.pct(profiles, as_member=as_member)
+    out = profiles.drop(columns=[c for c in pct.columns if c in profiles.columns])
+    out = pd.concat([out, pct], axis=1)
+    return score_roles(out, roles_yaml_path=roles_yaml_path)
@@ -1,19 +1,240 @@
 from __future__ import annotations
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
 
+from rsfbref.features.scopes import SCOPE_GROUPS, get_scope_spec
+from rsfbref.features.sketches import QuantileSketch, build_sketch, merge_sketches, sketch_pct
+
+PERCENTILE_MODES = {"exact", "approx"}
+# finest grain sketches are built on; every scope must be a coarsening of it
+APPROX_PARTITION_COLS = SCOPE_GROUPS["league_season"]
+
+
+def _group_codes(df: pd.DataFrame, group_cols: list[str]) -> np.ndarray:
+    # factorize group keys once (missing keys form their own group, like dropna=False)
+    if not group_cols:
+        return np.zeros(len(df), dtype=np.int64)
+    return df.groupby(group_cols, dropna=False, sort=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def _key_codes(df: pd.DataFrame, cols: list[str]) -> dict[str, np.ndarray]:
+    # factorize each key column once; NaN gets its own code (dropna=False semantics)
+    return {c: pd.factorize(df[c], use_na_sentinel=False)[0].astype(np.int64) for c in cols}
+
+
+def _combine_codes(key_codes: dict[str, np.ndarray], group_cols: list[str], n: int) -> np.ndarray:
+    # dense group codes for any subset of pre-factorized key columns
+    if not group_cols:
+        return np.zeros(n, dtype=np.int64)
+    flat = np.zeros(n, dtype=np.int64)
+    for c in group_cols:
+        k = key_codes[c]
+        flat = flat * (int(k.max()) + 1 if n else 1) + k
+    return np.unique(flat, return_inverse=True)[1].astype(np.int64)
+
+
+def _metric_block(df: pd.DataFrame, metric_cols: list[str]) -> np.ndarray:
+    block = np.empty((len(df), len(metric_cols)), dtype=float)
+    for j, c in enumerate(metric_cols):
+        block[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return block
+
+
+def _value_order(X: np.ndarray) -> np.ndarray:
+    # per-column ascending order, NaN last; order among equal values is
+    # irrelevant since ties are averaged per run
+    return np.argsort(X, axis=0)
+
+
+def _grouped_rank_pct(X: np.ndarray, codes: np.ndarray, order: np.ndarray | None = None) -> np.ndarray:
+    """
+    Grouped percentile rank of every column of X in one vectorized pass.
+
+    Same numbers as groupby(codes)[col].rank(pct=True, method="average") * 100:
+    average rank of ties / non-NaN group count * 100, NaN stays NaN.
+    order: optional precomputed _value_order(X), reusable across groupings.
+    """
+    n, m = X.shape
+    out = np.full((n, m), np.nan)
+    if n == 0 or m == 0:
+        return out
+
+    if order is None:
+        order = _value_order(X)
+
+    # stable re-sort by group keeps value order inside each group;
+    # 16-bit codes let numpy use a linear-time radix sort
+    n_groups = int(codes.max()) + 1
+    g = codes[order]
+    if n_groups <= np.iinfo(np.int16).max:
+        g = g.astype(np.int16)
+    order = np.take_along_axis(order, np.argsort(g, axis=0, kind="stable"), axis=0)
+
+    S = np.take_along_axis(X, order, axis=0).T.ravel()  # column-major, sorted
+    G = codes[order].T.ravel()
+
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+    pos = np.tile(np.arange(n), m)
+    r = (pos - starts[G] + 1).astype(float)  # 1-based position inside the group
+
+    # tie runs: new run at each column start, group change or value change
+    new_run = np.ones(n * m, dtype=bool)
+    new_run[1:] = (G[1:] != G[:-1]) | (S[1:] != S[:-1])
+    new_run[::n] = True
+    run_end = np.empty(n * m, dtype=bool)
+    run_end[:-1] = new_run[1:]
+    run_end[-1] = True
+
+    run_id = np.cumsum(new_run) - 1
+    avg = (r[new_run][run_id] + r[run_end][run_id]) / 2.0
+
+    valid = ~np.isnan(X)
+    counts = np.column_stack([np.bincount(codes, weights=valid[:, j], minlength=n_groups) for j in range(m)])
+    col = np.repeat(np.arange(m), n)
+    with np.errstate(divide="ignore", invalid="ignore"):  # all-NaN groups
+        pct = avg / counts[G, col] * 100
+
+    pct[np.isnan(S)] = np.nan
+    pct = pct.reshape(m, n).T
+    np.put_along_axis(out, order, pct, axis=0)
+    return out
+
+
 def add_percentiles_wide(
     df: pd.DataFrame,
     metric_cols: list[str],
     group_cols: list[str],
     prefix: str = "pct_",
 ) -> pd.DataFrame:
+    """
+    Add {prefix}{metric} percentile columns (0..100, method="average") ranked
+    within group_cols. Group keys are factorized once and all metrics are
+    ranked together as one 2-D block.
+    """
     out = df.copy()
-    for col in metric_cols:
-        out[f"{prefix}{col}"] = out.groupby(group_cols, dropna=False)[col].transform(
-            lambda s: s.rank(pct=True, method="average") * 100
+    pct = _grouped_rank_pct(_metric_block(out, metric_cols), _group_codes(out, group_cols))
+    for j, col in enumerate(metric_cols):
+        out[f"{prefix}{col}"] = pct[:, j]
+    return out
+
+
+def _partition_sketches(X: np.ndarray, part_codes: np.ndarray, eps: float) -> list[list[QuantileSketch]]:
+    # one sketch per partition x metric; rows are visited exactly once
+    n_parts = int(part_codes.max()) + 1 if len(part_codes) else 0
+    rows = np.argsort(part_codes, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(part_codes, minlength=n_parts))])
+    return [
+        [build_sketch(X[rows[bounds[p]:bounds[p + 1]], j], eps) for j in range(X.shape[1])]
+        for p in range(n_parts)
+    ]
+
+
+def _approx_rank_pct(
+    X: np.ndarray,
+    part_codes: np.ndarray,
+    codes: np.ndarray,
+    sketches: list[list[QuantileSketch]],
+) -> np.ndarray:
+    """
+    Approximate _grouped_rank_pct: partition sketches are merged per scope
+    group (no row access) and each row is scored by a sketch lookup.
+    codes must be constant within every partition.
+    """
+    n, m = X.shape
+    out = np.full((n, m), np.nan)
+    if n == 0:
+        return out
+
+    n_parts = len(sketches)
+    first_row = np.full(n_parts, -1, dtype=np.int64)
+    first_row[part_codes[::-1]] = np.arange(n)[::-1]
+    part_group = codes[first_row]
+
+    for g in np.unique(part_group):
+        parts = np.flatnonzero(part_group == g)
+        rows = np.flatnonzero(np.isin(part_codes, parts))
+        for j in range(m):
+            merged = merge_sketches([sketches[p][j] for p in parts])
+            out[rows, j] = sketch_pct(merged, X[rows, j])
+    return out
+
+
+def _check_partition_cols(group_cols: list[str], partition_cols: list[str]) -> None:
+    missing = [c for c in group_cols if c not in partition_cols]
+    if missing:
+        raise ValueError(
+            f"Approximate percentiles need group_cols within partition_cols={partition_cols}; missing {missing}"
         )
+
+
+def add_percentiles_wide_approx(
+    df: pd.DataFrame,
+    metric_cols: list[str],
+    group_cols: list[str],
+    eps: float = 0.01,
+    prefix: str = "pct_",
+    partition_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Sketch-based add_percentiles_wide for very large pools. Quantile sketches
+    are built per partition (league x season x bucket by default) and merged
+    up to group_cols; every pct is within eps * 100 points of the exact
+    method="average" value.
+    """
+    partition_cols = list(partition_cols or APPROX_PARTITION_COLS)
+    _check_partition_cols(group_cols, partition_cols)
+
+    out = df.copy()
+    X = _metric_block(out, metric_cols)
+    keys = _key_codes(out, partition_cols)
+    part_codes = _combine_codes(keys, partition_cols, len(out))
+    sketches = _partition_sketches(X, part_codes, eps)
+    pct = _approx_rank_pct(X, part_codes, _combine_codes(keys, group_cols, len(out)), sketches)
+    for j, col in enumerate(metric_cols):
+        out[f"{prefix}{col}"] = pct[:, j]
     return out
 
+
+def percentile_accuracy_report(
+    df: pd.DataFrame,
+    metric_cols: list[str],
+    group_cols: list[str],
+    eps: float = 0.01,
+    partition_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Per-metric absolute error (pct points) of the approximate mode against
+    exact ranks: n, mean/p99/max error, the eps * 100 bound and whether it holds.
+    """
+    exact = add_percentiles_wide(df[metric_cols + group_cols], metric_cols, group_cols, prefix="pct_")
+    approx = add_percentiles_wide_approx(
+        df[list(dict.fromkeys(metric_cols + group_cols + list(partition_cols or APPROX_PARTITION_COLS)))],
+        metric_cols, group_cols, eps=eps, prefix="pct_", partition_cols=partition_cols,
+    )
+
+    rows = []
+    for col in metric_cols:
+        e = exact[f"pct_{col}"].to_numpy(dtype=float)
+        a = approx[f"pct_{col}"].to_numpy(dtype=float)
+        ok = ~np.isnan(e)
+        err = np.abs(a[ok] - e[ok])
+        rows.append({
+            "kpi_name": col,
+            "n": int(ok.sum()),
+            "mean_abs_err": float(err.mean()) if len(err) else 0.0,
+            "p99_abs_err": float(np.quantile(err, 0.99)) if len(err) else 0.0,
+            "max_abs_err": float(err.max()) if len(err) else 0.0,
+            "bound": eps * 100,
+        })
+    report = pd.DataFrame(rows)
+    report["within_bound"] = report["max_abs_err"] <= report["bound"]
+    return report
+
+
 def build_percentiles_long(
     df: pd.DataFrame,
     metric_cols: list[str],
@@ -24,28 +245,163 @@ def build_percentiles_long(
     """
     Returns long-form percentiles:
       id cols + kpi_name + kpi_value + kpi_pct + pct_scope
+
+    Rows are metric-major (all rows for metric 0, then metric 1, ...), the
+    same order a melt over metric_cols gives. Built straight from the
+    (rows x metrics) block: id cols are repeated per metric, kpi_name is a
+    categorical over metric_cols, no intermediate wide frame or join.
     """
-    tmp = df[id_cols + metric_cols].copy()
+    n, m = len(df), len(metric_cols)
+    X = _metric_block(df, metric_cols)
+    pct = _grouped_rank_pct(X, _group_codes(df, group_cols))
 
-    # compute pct columns in a temp wide frame
-    tmp2 = add_percentiles_wide(tmp, metric_cols=metric_cols, group_cols=group_cols, prefix="pct_")
+    out = df[id_cols].iloc[np.tile(np.arange(n), m)].reset_index(drop=True)
+    out["kpi_name"] = pd.Categorical.from_codes(np.repeat(np.arange(m), n), categories=metric_cols)
+    out["kpi_value"] = X.T.ravel()  # column-major = metric-major rows
+    out["kpi_pct"] = pct.T.ravel()
+    out["pct_scope"] = pct_scope
+    return out
 
-    # melt into long
-    val_long = tmp2.melt(
-        id_vars=id_cols,
-        value_vars=metric_cols,
-        var_name="kpi_name",
-        value_name="kpi_value",
-    )
-    pct_long = tmp2.melt(
-        id_vars=id_cols,
-        value_vars=[f"pct_{m}" for m in metric_cols],
-        var_name="kpi_name_pct",
-        value_name="kpi_pct",
+
+def iter_percentiles_cube(
+    df: pd.DataFrame,
+    metric_cols: list[str],
+    scopes: list[str],
+    id_cols: list[str],
+    mode: str = "exact",
+    eps: float = 0.01,
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """
+    Yield (scope, long frame) for every scope, same rows/columns as
+    build_percentiles_long(..., pct_scope=scope) but computed as one cube:
+    group key columns are factorized once, each metric is value-sorted once,
+    and the repeated id/kpi_name/kpi_value columns are built once. Per scope
+    only a cheap integer regroup and the tie-run pass remain, so adding a
+    lens (a new SCOPE_GROUPS entry) costs far less than a full re-rank.
+
+    mode="approx": partition sketches (APPROX_PARTITION_COLS) are built once
+    and merged per scope instead; kpi_pct is then within eps * 100 points.
+    """
+    if mode not in PERCENTILE_MODES:
+        raise ValueError(f"Unknown percentile mode={mode}. Supported: {sorted(PERCENTILE_MODES)}")
+    specs = [get_scope_spec(s) for s in scopes]
+    n, m = len(df), len(metric_cols)
+
+    key_cols = list(dict.fromkeys(c for spec in specs for c in spec.group_cols))
+    X = _metric_block(df, metric_cols)
+    if mode == "approx":
+        for spec in specs:
+            _check_partition_cols(spec.group_cols, APPROX_PARTITION_COLS)
+        keys = _key_codes(df, APPROX_PARTITION_COLS)
+        part_codes = _combine_codes(keys, APPROX_PARTITION_COLS, n)
+        sketches = _partition_sketches(X, part_codes, eps)
+    else:
+        keys = _key_codes(df, key_cols)
+        order = _value_order(X)
+
+    base = df[id_cols].iloc[np.tile(np.arange(n), m)].reset_index(drop=True)
+    base["kpi_name"] = pd.Categorical.from_codes(np.repeat(np.arange(m), n), categories=metric_cols)
+    base["kpi_value"] = X.T.ravel()
+
+    for spec in specs:
+        codes = _combine_codes(keys, spec.group_cols, n)
+        if mode == "approx":
+            pct = _approx_rank_pct(X, part_codes, codes, sketches)
+        else:
+            pct = _grouped_rank_pct(X, codes, order=order)
+        part = base.copy(deep=False)
+        part["kpi_pct"] = pct.T.ravel()
+        part["pct_scope"] = spec.name
+        yield spec.name, part
+
+
+def build_percentiles_cube(
+    df: pd.DataFrame,
+    metric_cols: list[str],
+    scopes: list[str],
+    id_cols: list[str],
+    mode: str = "exact",
+    eps: float = 0.01,
+) -> pd.DataFrame:
+    """All scopes stacked scope-major (same as concatenating build_percentiles_long per scope)."""
+    parts = [part for _, part in iter_percentiles_cube(df, metric_cols, scopes, id_cols, mode=mode, eps=eps)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_percentiles_cube(
+    df: pd.DataFrame,
+    metric_cols: list[str],
+    scopes: list[str],
+    id_cols: list[str],
+    path: str | Path,
+    mode: str = "exact",
+    eps: float = 0.01,
+    csv_path: str | Path | None = None,
+) -> int:
+    """
+    Stream the cube to one Parquet file, one row group per scope, so readers
+    can pull a single lens with filters=[("pct_scope", "==", scope)].
+    csv_path optionally gets the same rows (Tableau export), appended per
+    scope as it is produced, so only one lens is ever held in memory.
+    Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if csv_path is not None:
+        csv_path = Path(csv_path)
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+
+    writer = None
+    rows = 0
+    try:
+        for _, part in iter_percentiles_cube(df, metric_cols, scopes, id_cols, mode=mode, eps=eps):
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=max(len(part), 1))
+            if csv_path is not None:
+                part.to_csv(csv_path, mode="a" if rows else "w", header=not rows, index=False)
+            rows += len(part)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+
+def attach_pct_scope(
+    df_fact: pd.DataFrame,
+    pct_scope: str,
+    path: str | Path = "data/marts/fact_percentiles.parquet",
+) -> pd.DataFrame:
+    """
+    Ensure df_fact has pct_* columns for the chosen pct_scope.
+    If pct_scope == df_fact['pct_scope_default'], we already have them.
+    Otherwise, read that lens from the long percentiles file and pivot.
+    """
+    default_scope = df_fact["pct_scope_default"].iloc[0] if "pct_scope_default" in df_fact.columns and len(df_fact) else None
+    if pct_scope == default_scope:
+        return df_fact
+
+    # one row group per scope: the filter only reads the requested lens
+    pct = pd.read_parquet(
+        path,
+        columns=["player_team_season_id", "kpi_name", "kpi_pct", "pct_scope"],
+        filters=[("pct_scope", "==", pct_scope)],
     )
-    pct_long["kpi_name"] = pct_long["kpi_name_pct"].str.replace("^pct_", "", regex=True)
-    pct_long = pct_long.drop(columns=["kpi_name_pct"])
 
-    out = val_long.merge(pct_long, on=id_cols + ["kpi_name"], how="left", validate="1:1")
-    out["pct_scope"] = pct_scope
+    wide = pct.pivot_table(
+        index="player_team_season_id",
+        columns="kpi_name",
+        values="kpi_pct",
+        aggfunc="first",
+    ).reset_index()
+    wide.columns = ["player_team_season_id"] + [f"pct_{c}" for c in wide.columns[1:]]
+
+    out = df_fact.drop(columns=[c for c in df_fact.columns if c.startswith("pct_")], errors="ignore").merge(
+        wide, on="player_team_season_id", how="left", validate="1:1"
+    )
     return out
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class QuantileSketch:
+    """
+    Mergeable rank summary of one metric over one pool of players.
+
+    Stores a sorted subset of the pool's values together with the exact
+    (at build time) number of pool values strictly below (lt) and at or
+    below (le) each stored point. Points are kept so that fewer than
+    eps / 2 * n values fall strictly between neighbours, which bounds the
+    rank error of an interpolated lookup by eps * n, also after merging.
+    """
+    values: np.ndarray
+    lt: np.ndarray
+    le: np.ndarray
+    n: int
+    eps: float
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def build_sketch(x: np.ndarray, eps: float) -> QuantileSketch:
+    """Sketch of the non-NaN values of x with rank error <= eps * n."""
+    if not 0 < eps < 1:
+        raise ValueError(f"eps must be in (0, 1), got {eps}")
+    x = np.asarray(x, dtype=float)
+    x = np.sort(x[~np.isnan(x)])
+    n = len(x)
+
+    values, counts = np.unique(x, return_counts=True)
+    le = np.cumsum(counts)
+    lt = le - counts
+
+    step = eps * n / 2
+    if step >= 1 and len(values) > 2 / eps:
+        # keep first and last point of every lt-bucket of width step:
+        # fewer than step values lie strictly between kept neighbours
+        bucket = np.floor(lt / step).astype(np.int64)
+        keep = np.zeros(len(values), dtype=bool)
+        keep[0] = keep[-1] = True
+        change = bucket[1:] != bucket[:-1]
+        keep[1:] |= change
+        keep[:-1] |= change
+        values, lt, le = values[keep], lt[keep], le[keep]
+
+    return QuantileSketch(values=values, lt=lt.astype(float), le=le.astype(float), n=n, eps=eps)
+
+
+def _counts_at(sk: QuantileSketch, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # (lt, le) estimates at x: exact at stored points, linear in between
+    lt = np.zeros(len(x))
+    le = np.zeros(len(x))
+    k = len(sk.values)
+    if k == 0:
+        return lt, le
+
+    i = np.searchsorted(sk.values, x, side="left")
+    ic = np.minimum(i, k - 1)
+    hit = sk.values[ic] == x
+    lt[hit] = sk.lt[ic[hit]]
+    le[hit] = sk.le[ic[hit]]
+
+    miss = ~hit
+    a = i[miss] - 1
+    b = i[miss]
+    lo = np.where(a >= 0, sk.le[np.maximum(a, 0)], 0.0)
+    hi = np.where(b < k, sk.lt[np.minimum(b, k - 1)], float(sk.n))
+    va = sk.values[np.maximum(a, 0)]
+    vb = sk.values[np.minimum(b, k - 1)]
+    inner = (a >= 0) & (b < k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(inner, (x[miss] - va) / (vb - va), np.where(a < 0, 0.0, 1.0))
+    est = lo + np.clip(frac, 0.0, 1.0) * (hi - lo)
+    lt[miss] = est
+    le[miss] = est
+    return lt, le
+
+
+def merge_sketches(sketches: list[QuantileSketch]) -> QuantileSketch:
+    """
+    Merge sketches of disjoint pools without revisiting rows. Every stored
+    point keeps its exact counts from its own sketch and takes interpolated
+    counts from the others, so the eps bound carries over to the union.
+    """
+    sketches = [s for s in sketches if s.n > 0] or sketches[:1]
+    if not sketches:
+        raise ValueError("merge_sketches needs at least one sketch")
+    if len(sketches) == 1:
+        return sketches[0]
+
+    values = np.unique(np.concatenate([s.values for s in sketches]))
+    lt = np.zeros(len(values))
+    le = np.zeros(len(values))
+    for s in sketches:
+        a, b = _counts_at(s, values)
+        lt += a
+        le += b
+    return QuantileSketch(
+        values=values,
+        lt=lt,
+        le=le,
+        n=sum(s.n for s in sketches),
+        eps=max(s.eps for s in sketches),
+    )
+
+
+def sketch_pct(sk: QuantileSketch, x: np.ndarray) -> np.ndarray:
+    """
+    Approximate percentile (0..100, method="average") of each x within the
+    sketched pool; NaN stays NaN. Error is at most eps * 100 points.
+    """
+    x = np.asarray(x, dtype=float)
+    out = np.full(len(x), np.nan)
+    ok = ~np.isnan(x)
+    if sk.n == 0 or not ok.any():
+        return out
+    lt, le = _counts_at(sk, x[ok])
+    # average rank of x's tie run = lt + (eq + 1) / 2, clipped to the pool
+    avg = np.clip((lt + le + 1) / 2, 1.0, float(sk.n))
+    out[ok] = avg / sk.n * 100
+    return out
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from rsfbref.io.snapshot import SnapshotStore, collapse_leagues, split_partitions
+from rsfbref.transform.flatten import flatten_columns
+from rsfbref.transform.player_season import PLAYER_STAT_TYPES_V1
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+@dataclass(frozen=True)
+class IngestTask:
+    league: str
+    season: str
+    stat_type: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.stat_type}|{self.league}|{self.season}"
+
+
+@dataclass
+class IngestReport:
+    done: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+
+
+class Checkpoint:
+    """
+    Per-task status manifest (checkpoint.json next to the snapshot manifest).
+    Rewritten atomically after every task so an interruption loses at most
+    the tasks that were in flight.
+    """
+
+    def __init__(self, root: str | Path):
+        self.path = Path(root) / CHECKPOINT_NAME
+        self._lock = threading.Lock()
+        self.tasks: dict[str, dict] = {}
+        if self.path.exists():
+            self.tasks = json.loads(self.path.read_text(encoding="utf-8"))["tasks"]
+
+    def is_done(self, key: str) -> bool:
+        with self._lock:
+            return self.tasks.get(key, {}).get("status") == "done"
+
+    def partitions(self, key: str) -> list[tuple[str, str]]:
+        # store partitions (row league, season) written by a done task;
+        # checkpoints from before row-level keys only know the task's own key
+        with self._lock:
+            info = self.tasks.get(key, {})
+        if "partitions" not in info:
+            _, league, season = key.split("|")
+            return [(league, season)]
+        return [tuple(p) for p in info["partitions"]]
+
+    def record(self, key: str, **info) -> None:
+        with self._lock:
+            self.tasks[key] = info
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"tasks": self.tasks}, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def plan_tasks(leagues, seasons, stat_types=PLAYER_STAT_TYPES_V1) -> list[IngestTask]:
+    # a league group and its members would write the same partitions: keep the group
+    return [IngestTask(lg, str(s), st) for lg in collapse_leagues(leagues) for s in seasons for st in stat_types]
+
+
+def run_ingestion(
+    reader_factory: Callable[[str, str], object],
+    leagues,
+    seasons,
+    snapshot_dir: str | Path,
+    stat_types=PLAYER_STAT_TYPES_V1,
+    max_workers: int = 1,
+    max_retries: int = 3,
+    backoff_s: float = 2.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> IngestReport:
+    """
+    Resumable league x season x stat_type ingestion into a SnapshotStore.
+
+    reader_factory(league, season) returns an FBref-like object (anything with
+    read_player_season_stats(stat_type=...)); one reader is built per
+    league x season and shared by its stat_type tasks.
+
+    Fetched frames are split with split_partitions, the same row-level
+    league x season scheme as write_snapshot, so both writers can share one
+    snapshot_dir (a "Big 5 European Leagues Combined" task writes one
+    partition per member league). Members of a requested group are not
+    scheduled on their own (collapse_leagues), so no two tasks write the same
+    partition and the manifest does not depend on completion order.
+
+    Tasks already marked done in checkpoint.json (and whose partitions are
+    present in the store) are skipped. Each remaining task is retried up to max_retries times with
+    exponential backoff (backoff_s * 2**attempt). A task that still fails is
+    recorded as failed and the remaining tasks keep running; rerunning resumes
+    only missing/failed tasks.
+    """
+    t_start = time.perf_counter()
+    store = SnapshotStore(snapshot_dir)
+    ckpt = Checkpoint(snapshot_dir)
+    report = IngestReport()
+
+    tasks = plan_tasks(leagues, seasons, stat_types)
+    todo = []
+    for t in tasks:
+        if ckpt.is_done(t.key) and all(store.has(t.stat_type, lg, s) for lg, s in ckpt.partitions(t.key)):
+            report.skipped.append(t.key)
+        else:
+            todo.append(t)
+    print(f"[ingest] {len(tasks)} tasks: {len(report.skipped)} already done, {len(todo)} to run")
+
+    readers: dict[tuple[str, str], object] = {}
+    readers_lock = threading.Lock()
+
+    def reader_for(t: IngestTask):
+        with readers_lock:
+            k = (t.league, t.season)
+            if k not in readers:
+                readers[k] = reader_factory(t.league, t.season)
+            return readers[k]
+
+    def run_one(t: IngestTask) -> tuple[IngestTask, str | None]:
+        t0 = time.perf_counter()
+        last_err: str | None = None
+        for attempt in range(max_retries + 1):
+            if attempt:
+                delay = backoff_s * 2 ** (attempt - 1)
+                print(f"[ingest] {t.key}: retry {attempt}/{max_retries} in {delay:.1f}s ({last_err})")
+                sleep(delay)
+            try:
+                df = reader_for(t).read_player_season_stats(stat_type=t.stat_type)
+                df = flatten_columns(df.reset_index())
+                entries = [store.put(t.stat_type, lg, s, part) for lg, s, part in split_partitions(df)]
+            except Exception as exc:
+                last_err = f"{type(exc).__name__}: {exc}"
+                continue
+            ckpt.record(
+                t.key, status="done", attempts=attempt + 1,
+                rows=sum(e["rows"] for e in entries),
+                partitions=[[e["league"], e["season"]] for e in entries],
+                elapsed_s=round(time.perf_counter() - t0, 3),
+            )
+            return t, None
+
+        ckpt.record(
+            t.key, status="failed", attempts=max_retries + 1,
+            error=last_err, elapsed_s=round(time.perf_counter() - t0, 3),
+        )
+        print(f"[ingest] {t.key}: failed after {max_retries + 1} attempts ({last_err})")
+        return t, last_err
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="ingest") as pool:
+        for t, err in pool.map(run_one, todo):
+            if err is None:
+                report.done.append(t.key)
+            else:
+                report.failed[t.key] = err
+
+    report.elapsed_s = time.perf_counter() - t_start
+    print(
+        f"[ingest] done={len(report.done)} skipped={len(report.skipped)} "
+        f"failed={len(report.failed)} in {report.elapsed_s:.2f}s"
+    )
+    return report
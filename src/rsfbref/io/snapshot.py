@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# soccerdata FBref player-season frames are indexed by these columns;
+# flattened bundle frames carry them as the leading columns (after reset_index).
+INDEX_COLS = ["league", "season", "team", "player"]
+
+MANIFEST_NAME = "manifest.json"
+
+# FBref request leagues whose rows carry the member leagues' ids; snapshot
+# partitions are always keyed by the row values, so filters expand these.
+LEAGUE_GROUPS = {
+    "Big 5 European Leagues Combined": [
+        "ENG-Premier League",
+        "ESP-La Liga",
+        "FRA-Ligue 1",
+        "GER-Bundesliga",
+        "ITA-Serie A",
+    ],
+}
+
+
+def expand_leagues(leagues) -> set[str]:
+    """Requested (config) leagues -> the row-level league ids they cover."""
+    out: set[str] = set()
+    for lg in leagues:
+        out.add(str(lg))
+        out.update(LEAGUE_GROUPS.get(str(lg), []))
+    return out
+
+
+def collapse_leagues(leagues) -> list[str]:
+    """
+    Requested leagues without the members of a group that is also requested
+    (order kept). A group fetch already returns its members' rows, so
+    scheduling both would write the same partitions twice; the group wins.
+    """
+    leagues = [str(lg) for lg in leagues]
+    covered = {m for lg in leagues for m in LEAGUE_GROUPS.get(lg, [])}
+    return list(dict.fromkeys(lg for lg in leagues if lg not in covered))
+
+
+def split_partitions(df: pd.DataFrame):
+    """
+    (league, season, part) per league x season present in the rows - the
+    only partitioning scheme of the store, shared by every writer.
+    """
+    for (league, season), part in df.groupby(["league", "season"], sort=False, dropna=False):
+        yield league, season, part.reset_index(drop=True)
+
+
+def _slug(s: object) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(s)).strip("_")
+
+
+class SnapshotStore:
+    """
+    Content-addressed Parquet store for flattened FBref frames.
+
+    One file per stat_type x league x season, named by the SHA-1 of its Parquet
+    bytes, so unchanged partitions are never rewritten. league / season are the
+    values in the rows (split_partitions), whichever writer produced them. manifest.json maps
+    (stat_type, league, season) -> file and is replaced atomically on every write.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str, str], dict] = {}
+
+        manifest = self.root / MANIFEST_NAME
+        if manifest.exists():
+            for e in json.loads(manifest.read_text(encoding="utf-8"))["entries"]:
+                self._entries[(e["stat_type"], e["league"], e["season"])] = e
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def has(self, stat_type: str, league: str, season: str) -> bool:
+        with self._lock:
+            e = self._entries.get((stat_type, str(league), str(season)))
+        return e is not None and (self.root / e["file"]).exists()
+
+    def put(self, stat_type: str, league: str, season: str, df: pd.DataFrame) -> dict:
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        payload = buf.getvalue()
+        digest = hashlib.sha1(payload).hexdigest()
+
+        fname = f"{_slug(stat_type)}__{_slug(league)}__{_slug(season)}__{digest[:16]}.parquet"
+        path = self.root / fname
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            # unique temp name: concurrent puts of the same partition never share one
+            with tempfile.NamedTemporaryFile(dir=self.root, prefix=f".{fname}.", suffix=".tmp", delete=False) as fh:
+                fh.write(payload)
+            os.replace(fh.name, path)
+
+        entry = {
+            "stat_type": stat_type,
+            "league": str(league),
+            "season": str(season),
+            "file": fname,
+            "sha1": digest,
+            "rows": int(len(df)),
+        }
+        with self._lock:
+            old = self._entries.get((stat_type, str(league), str(season)))
+            self._entries[(stat_type, str(league), str(season))] = entry
+            self._write_manifest()
+            referenced = {e["file"] for e in self._entries.values()}
+        if old is not None and old["file"] not in referenced:
+            (self.root / old["file"]).unlink(missing_ok=True)
+        return entry
+
+    def get(self, stat_type: str, league: str, season: str) -> pd.DataFrame:
+        with self._lock:
+            e = self._entries[(stat_type, str(league), str(season))]
+        return pd.read_parquet(self.root / e["file"])
+
+    def _write_manifest(self) -> None:
+        manifest = self.root / MANIFEST_NAME
+        tmp = manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"entries": list(self._entries.values())}, indent=2), encoding="utf-8")
+        os.replace(tmp, manifest)
+
+
+def write_snapshot(bundle: dict[str, pd.DataFrame], snapshot_dir: str | Path) -> SnapshotStore:
+    """
+    Persist a flattened bundle (output of read_player_season_bundle),
+    split into one Parquet file per stat_type x league x season.
+    """
+    store = SnapshotStore(snapshot_dir)
+    for st, df in bundle.items():
+        for league, season, part in split_partitions(df):
+            store.put(st, league, season, part)
+    return store
+
+
+class SnapshotFBref:
+    """
+    Replay reader with the soccerdata FBref read_player_season_stats interface.
+    Serves frames from a SnapshotStore, so reruns/CI never touch soccerdata.
+
+    leagues/seasons filter the snapshot partitions (None = everything stored);
+    league groups such as "Big 5 European Leagues Combined" match their
+    member leagues.
+    Returned frames are indexed by INDEX_COLS, so reset_index + flatten_columns
+    reproduce the bundle frames that were snapshotted.
+    """
+
+    def __init__(self, snapshot_dir: str | Path, leagues=None, seasons=None):
+        self.store = SnapshotStore(snapshot_dir)
+        self.leagues = None if leagues is None else expand_leagues(leagues)
+        self.seasons = None if seasons is None else {str(x) for x in seasons}
+
+    def read_player_season_stats(self, stat_type: str) -> pd.DataFrame:
+        parts = [
+            self.store.get(e["stat_type"], e["league"], e["season"])
+            for e in self.store.entries()
+            if e["stat_type"] == stat_type
+            and (self.leagues is None or e["league"] in self.leagues)
+            and (self.seasons is None or e["season"] in self.seasons)
+        ]
+        if not parts:
+            raise FileNotFoundError(f"No snapshot for stat_type={stat_type} under {self.store.root}")
+
+        df = pd.concat(parts, ignore_index=True)
+        return df.set_index([c for c in INDEX_COLS if c in df.columns])
+
+
+def config_snapshot_reader(fbref_cfg: dict) -> SnapshotFBref:
+    """
+    Replay reader limited to the config's fbref leagues x seasons. A
+    snapshot_dir can be shared by several configs, so replaying everything
+    stored would not be a faithful re-run of this config.
+    """
+    return SnapshotFBref(
+        fbref_cfg.get("snapshot_dir", "data/snapshots/fbref"),
+        leagues=fbref_cfg["leagues"],
+        seasons=fbref_cfg["seasons"],
+    )
@@ -1,42 +1,141 @@
 from __future__ import annotations
 import hashlib
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from .identity import PlayerRegistry
+
+PLAYER_ID_COLS = ["player", "nation", "born"]
+TEAM_ID_COLS = ["team", "league", "season"]
+
+
 def _sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
-def add_ids(df: pd.DataFrame) -> pd.DataFrame:
+
+def _string_codes(df: pd.DataFrame, col: str, normalize: bool) -> tuple[np.ndarray, list[str]]:
+    """
+    Per-row codes into a list of distinct key strings for one identity column.
+    str()/strip/lower runs once per distinct value, not once per row.
+    Missing column -> "" (same as row.get(col, "")).
+    """
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=np.int64), [""]
+
+    values = df[col]
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    strings = [str(u) for u in uniques]
+
+    # missing values keep their own str() form ("nan", "None", "<NA>")
+    na = codes < 0
+    if na.any():
+        na_codes, na_uniques = pd.factorize(pd.Series([str(v) for v in values.to_numpy(dtype=object)[na]], dtype=object))
+        codes = codes.copy()
+        codes[na] = na_codes + len(strings)
+        strings += list(na_uniques)
+
+    if normalize:
+        strings = [x.strip().lower() for x in strings]
+
+    # collapse values that normalize to the same string
+    remap, norm_uniques = pd.factorize(pd.Series(strings, dtype=object))
+    return remap[codes].astype(np.int64), list(norm_uniques)
+
+
+def _bulk_sha1(
+    df: pd.DataFrame,
+    cols: list[str],
+    normalize: bool = True,
+    cache: dict[str, str] | None = None,
+    return_keys: bool = False,
+):
+    """
+    sha1("|".join(parts)) per row, hashing each distinct key tuple once.
+    cache (key -> id) is consulted first and receives newly hashed keys.
+    return_keys=True also returns the per-row key strings.
+    """
+    n = len(df)
+    tuple_codes = np.zeros(n, dtype=np.int64)
+    col_strings: list[list[str]] = []
+    col_codes: list[np.ndarray] = []
+    for c in cols:
+        codes, strings = _string_codes(df, c, normalize)
+        col_codes.append(codes)
+        col_strings.append(strings)
+        tuple_codes, _ = pd.factorize(tuple_codes * len(strings) + codes)
+
+    n_keys = int(tuple_codes.max()) + 1 if n else 0
+    first = np.zeros(n_keys, dtype=np.int64)
+    first[tuple_codes] = np.arange(n)  # one representative row per key tuple
+
+    ids = np.empty(n_keys, dtype=object)
+    keys = np.empty(n_keys, dtype=object)
+    for k, row in enumerate(first):
+        key = "|".join(strings[codes[row]] for strings, codes in zip(col_strings, col_codes))
+        hit = cache.get(key) if cache is not None else None
+        if hit is None:
+            hit = _sha1(key)
+            if cache is not None:
+                cache[key] = hit
+        ids[k] = hit
+        keys[k] = key
+    if return_keys:
+        return ids[tuple_codes], keys[tuple_codes]
+    return ids[tuple_codes]
+
+
+def load_id_cache(path: str | Path) -> dict[str, str]:
+    p = Path(path)
+    if not p.exists():
+        return {}
+    cached = pd.read_parquet(p)
+    return dict(zip(cached["key"], cached["id"]))
+
+
+def save_id_cache(cache: dict[str, str], path: str | Path) -> None:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"key": list(cache.keys()), "id": list(cache.values())}).to_parquet(p, index=False)
+
+
+def add_ids(
+    df: pd.DataFrame,
+    id_cache_path: str | Path | None = None,
+    registry: PlayerRegistry | None = None,
+) -> pd.DataFrame:
+    """
+    Add player_id, team_id and the strict grain key player_team_season_id
+    (SHA-1 hex of the normalized identity columns; stable across runs).
+
+    Hashing is done once per distinct key tuple. With id_cache_path, a persistent
+    key -> id table lets reruns skip hashing for keys seen before.
+    With registry, known players reuse their registered id and unseen
+    players/appearances are appended to it (caller saves the registry).
+    """
     out = df.copy()
 
-    def mk_player_id(r) -> str:
-        parts = [
-            str(r.get("player", "")).strip().lower(),
-            str(r.get("nation", "")).strip().lower(),
-            str(r.get("born", "")).strip().lower(),
-        ]
-        return _sha1("|".join(parts))
-
-    def mk_team_id(r) -> str:
-        parts = [
-            str(r.get("team", "")).strip().lower(),
-            str(r.get("league", "")).strip().lower(),
-            str(r.get("season", "")).strip().lower(),
-        ]
-        return _sha1("|".join(parts))
-
-    out["player_id"] = out.apply(mk_player_id, axis=1)
-    out["team_id"] = out.apply(mk_team_id, axis=1)
+    cache = load_id_cache(id_cache_path) if id_cache_path is not None else None
+    n_cached = len(cache) if cache is not None else 0
+
+    player_cache = dict(cache) if cache is not None else {}
+    if registry is not None:
+        player_cache.update(registry.key_to_id())
+    out["player_id"], player_keys = _bulk_sha1(out, PLAYER_ID_COLS, cache=player_cache, return_keys=True)
+    if cache is not None:
+        cache.update(player_cache)
+    out["team_id"] = _bulk_sha1(out, TEAM_ID_COLS, cache=cache)
 
     # strict grain key for v2
-    out["player_team_season_id"] = (
-        out["player_id"].astype(str)
-        + "|"
-        + out["team_id"].astype(str)
-        + "|"
-        + out["league"].astype(str)
-        + "|"
-        + out["season"].astype(str)
-    ).map(_sha1)
+    out["player_team_season_id"] = _bulk_sha1(
+        out, ["player_id", "team_id", "league", "season"], normalize=False, cache=cache
+    )
+
+    if cache is not None and len(cache) > n_cached:
+        save_id_cache(cache, id_cache_path)
+
+    if registry is not None:
+        registry.append(out, player_keys)
 
     return out
 
@@ -56,3 +155,24 @@ def build_dim_team(df: pd.DataFrame) -> pd.DataFrame:
     out = df[cols].drop_duplicates(subset=["team_id"]).copy()
     out = out.rename(columns={"team": "team_name"})
     return out
+
+
+def build_dim_player_from_registry(
+    registry: PlayerRegistry,
+    player_ids=None,
+) -> pd.DataFrame:
+    """
+    dim_player read from the identity registry (no scan of the scored table).
+    player_ids optionally restricts to the players present in the current marts.
+
+    Unlike build_dim_player (first row of the current scored table), age, pos
+    and position_bucket here are the values from the season the player was
+    first registered in; they are not refreshed by later seasons.
+    """
+    players = registry.players
+    if player_ids is not None:
+        players = players[players["player_id"].isin(player_ids)]
+    out = players[["player_id", "player", "nation", "age", "born", "pos", "position_bucket"]].copy()
+    out = out.rename(columns={"player": "player_name", "pos": "position_raw"})
+    out["primary_pos_bucket"] = out["position_bucket"]
+    return out.reset_index(drop=True)
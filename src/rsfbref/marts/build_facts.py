@@ -1,6 +1,10 @@
 from __future__ import annotations
 import pandas as pd
 
+from rsfbref.analytics.role_uncertainty import uncertainty_columns
+from rsfbref.transform.clean_player_season import DEFAULT_METRICS_PATH
+from rsfbref.transform.metrics import load_metric_specs, metric_names
+
 
 def _unique_preserve_order(items: list[str]) -> list[str]:
     """
@@ -33,19 +37,26 @@ def _dedupe_columns(df: pd.DataFrame, context: str = "") -> pd.DataFrame:
 KEY_FACT = ["player_team_season_id"]
 
 
-def build_fact_player_season(df: pd.DataFrame) -> pd.DataFrame:
+def build_fact_player_season(
+    df: pd.DataFrame,
+    metric_cols: list[str] | None = None,
+    metrics_path: str = DEFAULT_METRICS_PATH,
+) -> pd.DataFrame:
     """
     v2 fact table at strict grain: one row per player_team_season_id.
 
     Includes:
       - identifiers
       - minutes + position bucket
-      - canonical engineered metrics
+      - canonical engineered metrics (metric_cols; defaults to the names in metrics_path)
       - default-scope percentiles (pct_*)
       - role scores (score_*)
     """
     df = _dedupe_columns(df, context="input:build_fact_player_season")
 
+    if metric_cols is None:
+        metric_cols = metric_names(load_metric_specs(metrics_path))
+
     keep_prefixes = ("pct_", "score_")
 
     base_cols = [
@@ -53,13 +64,7 @@ def build_fact_player_season(df: pd.DataFrame) -> pd.DataFrame:
         "player_id", "team_id", "league", "season",
         "minutes", "nineties", "position_bucket",
         "pct_scope_default",
-        # canonical metrics
-        "pass_cmp_pct", "passes_att_p90", "prog_passes_p90", "passes_final_third_p90",
-        "long_pass_cmp_pct", "key_passes_p90", "xa_p90", "crosses_pa_p90",
-        "tkl_int_p90", "clr_p90", "errors_p90", "aerial_win_pct",
-        "prog_carries_p90", "carries_pa_p90", "succ_takeons_p90", "takeon_succ_pct",
-        "sca_p90", "mis_dis_p90", "fouls_p90", "Per_90_Minutes_npxG",
-    ]
+    ] + list(metric_cols)
 
     # keep any existing pct_*, score_* columns (default scoring lens)
     extra = [c for c in df.columns if isinstance(c, str) and c.startswith(keep_prefixes)]
@@ -92,8 +97,10 @@ def build_fact_role_profile_card_v2(
     scored_df = _dedupe_columns(scored_df, context="input:build_fact_role_profile_card_v2:scored")
     percentiles_long = _dedupe_columns(percentiles_long, context="input:build_fact_role_profile_card_v2:pct_long")
 
-    roles = [c for c in scored_df.columns if isinstance(c, str) and c.startswith("score_")]
-    role_ids = [c.replace("score_", "") for c in roles]
+    score_cols = [c for c in scored_df.columns if isinstance(c, str) and c.startswith("score_")]
+    # drop the interval / rank columns bootstrap_role_scores adds next to each score
+    derived = set(uncertainty_columns(c.removeprefix("score_") for c in score_cols))
+    role_ids = [c.removeprefix("score_") for c in score_cols if c not in derived]
 
     id_cols = [
         "player_team_season_id", "player_id", "team_id", "league", "season",
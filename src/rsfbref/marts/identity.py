@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# players.parquet: one row per player_id, attributes as first seen
+PLAYER_COLS = [
+    "player_id", "player_key", "player", "nation", "age", "born", "pos", "position_bucket",
+    "first_season", "last_season",
+]
+# appearances.parquet: one row per player_team_season_id, sorted by player_id
+APPEARANCE_COLS = ["player_team_season_id", "player_id", "team_id", "league", "season"]
+
+
+class PlayerRegistry:
+    """
+    Durable player identity registry (two Parquet files under root).
+
+    - players: player_id <-> normalized "player|nation|born" key + attributes,
+      so add_ids can reuse known ids instead of re-hashing.
+    - appearances: every player_team_season_id ever seen, kept sorted by
+      player_id; history(player_id) is an O(1) offset lookup.
+
+    append() only adds unseen player_ids / player_team_season_ids, so the
+    registry grows with new seasons, never with reruns.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        players_path = self.root / "players.parquet"
+        apps_path = self.root / "appearances.parquet"
+
+        self.players = (
+            pd.read_parquet(players_path) if players_path.exists()
+            else pd.DataFrame({c: pd.Series(dtype=object) for c in PLAYER_COLS})
+        )
+        self.appearances = (
+            pd.read_parquet(apps_path) if apps_path.exists()
+            else pd.DataFrame({c: pd.Series(dtype=object) for c in APPEARANCE_COLS})
+        )
+        self._offsets: dict[str, tuple[int, int]] | None = None
+
+    def key_to_id(self) -> dict[str, str]:
+        return dict(zip(self.players["player_key"], self.players["player_id"]))
+
+    def append(self, df: pd.DataFrame, player_keys: np.ndarray) -> tuple[int, int]:
+        """
+        Add unseen players / appearances from an id'd frame (output of add_ids).
+        player_keys: per-row normalized identity keys aligned with df.
+        Returns (new_players, new_appearances).
+        """
+        rows = df.assign(player_key=player_keys)
+
+        seasons = rows.groupby("player_id", sort=False)["season"].agg(["min", "max"]).astype(str)
+
+        known = self.players["player_id"].isin(seasons.index)
+        if known.any():
+            # extend season span of returning players (both ends: backfills
+            # of older seasons move first_season earlier)
+            known_ids = self.players.loc[known, "player_id"]
+            cur = self.players.loc[known, "last_season"].astype(str)
+            seen = known_ids.map(seasons["max"]).astype(str)
+            self.players.loc[known, "last_season"] = cur.where(cur >= seen, seen)
+            cur = self.players.loc[known, "first_season"].astype(str)
+            seen = known_ids.map(seasons["min"]).astype(str)
+            self.players.loc[known, "first_season"] = cur.where(cur <= seen, seen)
+
+        new_players = rows[~rows["player_id"].isin(self.players["player_id"])]
+        new_players = new_players.drop_duplicates(subset=["player_id"], keep="first")
+        new_players = new_players.assign(
+            first_season=new_players["player_id"].map(seasons["min"]),
+            last_season=new_players["player_id"].map(seasons["max"]),
+        )
+        new_players = new_players.reindex(columns=PLAYER_COLS)
+
+        new_apps = rows[~rows["player_team_season_id"].isin(self.appearances["player_team_season_id"])]
+        new_apps = new_apps.drop_duplicates(subset=["player_team_season_id"], keep="first")[APPEARANCE_COLS]
+
+        if len(new_players):
+            self.players = pd.concat([self.players, new_players], ignore_index=True)
+        if len(new_apps):
+            self.appearances = (
+                pd.concat([self.appearances, new_apps], ignore_index=True)
+                .sort_values(["player_id", "season"], kind="stable")
+                .reset_index(drop=True)
+            )
+            self._offsets = None
+        return len(new_players), len(new_apps)
+
+    def history(self, player_id: str) -> pd.DataFrame:
+        """All appearances (player_team_season_id rows) of one player."""
+        if self._offsets is None:
+            ids = self.appearances["player_id"].to_numpy()
+            uniq, start, counts = np.unique(ids, return_index=True, return_counts=True)
+            self._offsets = {u: (s, s + c) for u, s, c in zip(uniq, start, counts)}
+        lo, hi = self._offsets.get(player_id, (0, 0))
+        return self.appearances.iloc[lo:hi]
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.players.to_parquet(self.root / "players.parquet", index=False)
+        self.appearances.to_parquet(self.root / "appearances.parquet", index=False)
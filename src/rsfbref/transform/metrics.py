@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+TRANSFORMS = {"value", "per90", "sum_per90", "ratio"}
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    transform: str
+    source: tuple[str, ...]
+    scale: float = 1.0
+
+
+def load_metric_specs(path: str | Path) -> list[MetricSpec]:
+    raw = yaml.safe_load(Path(path).read_text(encoding="utf-8"))["metrics"]
+
+    specs: list[MetricSpec] = []
+    for m in raw:
+        src = m["source"]
+        src = (src,) if isinstance(src, str) else tuple(src)
+        spec = MetricSpec(name=m["name"], transform=m["transform"], source=src, scale=float(m.get("scale", 1.0)))
+
+        if spec.transform not in TRANSFORMS:
+            raise ValueError(f"Metric {spec.name}: unknown transform={spec.transform}. Supported: {sorted(TRANSFORMS)}")
+        if spec.transform in {"value", "per90"} and len(spec.source) != 1:
+            raise ValueError(f"Metric {spec.name}: transform={spec.transform} takes exactly one source column")
+        if spec.transform == "ratio" and len(spec.source) != 2:
+            raise ValueError(f"Metric {spec.name}: transform=ratio takes [numerator, denominator]")
+        specs.append(spec)
+
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate metric names in {path}")
+    return specs
+
+
+def metric_names(specs: list[MetricSpec]) -> list[str]:
+    return [s.name for s in specs]
+
+
+def source_columns(specs: list[MetricSpec]) -> list[str]:
+    seen: dict[str, None] = {}
+    for s in specs:
+        for c in s.source:
+            seen.setdefault(c)
+    return list(seen)
+
+
+def compute_metrics(df: pd.DataFrame, specs: list[MetricSpec], nineties_col: str = "nineties") -> pd.DataFrame:
+    """
+    Compute every spec in one NumPy pass over a (rows x source columns) block.
+    Missing source columns yield NaN metrics.
+    """
+    sources = source_columns(specs)
+    pos = {c: j for j, c in enumerate(sources)}
+
+    n = len(df)
+    block = np.full((n, len(sources)), np.nan)
+    for c, j in pos.items():
+        if c in df.columns:
+            block[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    nineties = pd.to_numeric(df[nineties_col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    out: dict[str, np.ndarray] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for s in specs:
+            cols = [block[:, pos[c]] for c in s.source]
+            if s.transform == "value":
+                out[s.name] = cols[0]
+            elif s.transform == "per90":
+                out[s.name] = cols[0] / nineties
+            elif s.transform == "sum_per90":
+                acc = cols[0] / nineties
+                for c in cols[1:]:
+                    acc = acc + c / nineties
+                out[s.name] = acc
+            else:  # ratio
+                out[s.name] = cols[0] / cols[1] * s.scale
+
+    return pd.DataFrame(out, index=df.index)
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 from .flatten import flatten_columns
 
@@ -23,13 +27,63 @@ KEY = ["league", "season", "team", "player", "nation", "born"]
 ENTITY_COLS = {"nation", "pos", "age", "born", "90s"}
 
 
-def read_player_season_bundle(fbref) -> dict[str, pd.DataFrame]:
-    bundle: dict[str, pd.DataFrame] = {}
-    for st in PLAYER_STAT_TYPES_V1:
+def _read_stat_type(fbref, st: str) -> pd.DataFrame:
+    """
+    Fetch + flatten one stat_type, reporting rows and wall time.
+    Errors are reported with the stat_type and re-raised to the caller.
+    """
+    t0 = time.perf_counter()
+    try:
         df = fbref.read_player_season_stats(stat_type=st)
         df = df.reset_index()
         df = flatten_columns(df)
-        bundle[st] = df
+    except Exception as exc:
+        print(f"[bundle] {st}: failed after {time.perf_counter() - t0:.2f}s ({type(exc).__name__}: {exc})")
+        raise
+    print(f"[bundle] {st}: {len(df):,} rows in {time.perf_counter() - t0:.2f}s")
+    return df
+
+
+def read_player_season_bundle(fbref, max_workers: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    Read + flatten every stat_type in PLAYER_STAT_TYPES_V1.
+
+    max_workers > 1 fetches stat types on a bounded thread pool (I/O bound:
+    HTTP/cache reads + HTML parsing). The returned bundle is identical to the
+    sequential path: same keys, same order, same frames.
+
+    Only use max_workers > 1 with readers that are safe to share across
+    threads (snapshot replay, warm soccerdata cache): a live soccerdata
+    FBref session is one rate-limited client and is not documented as
+    thread-safe.
+
+    If any stat_type fails, every stat type is still attempted, all failures
+    are listed and a RuntimeError is raised from the first one - the same
+    contract for every max_workers.
+    """
+    bundle: dict[str, pd.DataFrame] = {}
+    errors: dict[str, BaseException] = {}
+
+    if max_workers <= 1:
+        for st in PLAYER_STAT_TYPES_V1:
+            try:
+                bundle[st] = _read_stat_type(fbref, st)
+            except Exception as exc:
+                errors[st] = exc
+    else:
+        workers = min(int(max_workers), len(PLAYER_STAT_TYPES_V1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fbref") as pool:
+            futures = {st: pool.submit(_read_stat_type, fbref, st) for st in PLAYER_STAT_TYPES_V1}
+            for st, fut in futures.items():
+                exc = fut.exception()
+                if exc is not None:
+                    errors[st] = exc
+                else:
+                    bundle[st] = fut.result()
+
+    if errors:
+        first = next(iter(errors.values()))
+        raise RuntimeError(f"Failed to read stat types: {list(errors)}") from first
     return bundle
 
 
@@ -53,11 +107,64 @@ def _dedupe_on_key(df: pd.DataFrame, st: str) -> pd.DataFrame:
     return df2
 
 
-def build_player_season_base(bundle: dict[str, pd.DataFrame]) -> pd.DataFrame:
+def _encode_key(frames: list[pd.DataFrame]) -> list[np.ndarray]:
+    """
+    Encode KEY once into an int64 surrogate shared by all frames.
+    Missing values compare equal (same as merge / drop_duplicates on KEY).
+    """
+    sizes = [len(f) for f in frames]
+    codes = np.zeros(sum(sizes), dtype=np.int64)
+    for c in KEY:
+        col = pd.concat([f[c] for f in frames], ignore_index=True)
+        cc, uniq = pd.factorize(col, use_na_sentinel=False)
+        # re-factorize after each column so codes stay < number of rows (no overflow)
+        codes, _ = pd.factorize(codes * len(uniq) + cc)
+    return np.split(codes.astype(np.int64), np.cumsum(sizes)[:-1])
+
+
+def _dedupe_on_surrogate(df: pd.DataFrame, sk: np.ndarray, st: str) -> tuple[pd.DataFrame, np.ndarray]:
+    # Same semantics + diagnostics as _dedupe_on_key, on the integer surrogate.
+    dup = pd.Index(sk).duplicated(keep="first")
+    if dup.any():
+        print(f"[dedupe] {st}: dropped {int(dup.sum())} duplicate rows on KEY={KEY}")
+        return df[~dup], sk[~dup]
+    return df, sk
+
+
+def _build_player_season_base_keyed(bundle: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    others = [(st, df) for st, df in bundle.items() if st != "standard"]
+    keys = _encode_key([bundle["standard"]] + [df for _, df in others])
+
+    base, base_sk = _dedupe_on_surrogate(bundle["standard"], keys[0], "standard")
+    base = base.reset_index(drop=True)
+
+    parts = [base]
+    for (st, df), sk in zip(others, keys[1:]):
+        df2, sk2 = _dedupe_on_surrogate(df, sk, st)
+
+        keep = [c for c in df2.columns if c not in KEY and c not in ENTITY_COLS]
+        aligned = df2[keep].set_axis(pd.Index(sk2), axis=0).reindex(base_sk)
+        aligned = aligned.set_axis(base.index, axis=0)
+        parts.append(aligned.rename(columns={c: f"{st}__{c}" for c in keep}))
+
+    return pd.concat(parts, axis=1)
+
+
+def build_player_season_base(bundle: dict[str, pd.DataFrame], join: str = "keyed") -> pd.DataFrame:
     """
     Merge all player-season stat tables on v2 KEY.
     Keep entity columns only once (from standard), and prefix other stat columns by stat_type.
+
+    join="keyed" encodes KEY once into an integer surrogate, aligns every
+    prefixed stat table on it and assembles the wide base with a single concat
+    (linear in the number of stat types). join="merge" is the original chain of
+    1:1 merges; both produce the same frame.
     """
+    if join == "keyed":
+        return _build_player_season_base_keyed(bundle)
+    if join != "merge":
+        raise ValueError(f"Unknown join={join}. Supported: ['keyed', 'merge']")
+
     base = bundle["standard"].copy()
 
     # Ensure base is unique on KEY
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 import yaml
+import numpy as np
 import pandas as pd
 
 
@@ -119,3 +120,79 @@ def infer_position_bucket(
     if base:
         return "OTHER", f"POS_{base}"
     return "OTHER", "POS_UNKNOWN"
+
+
+def _base_class(pos: str, pos_exact: dict, pos_combo: dict) -> str:
+    return pos_exact.get(pos) or pos_combo.get(pos) or ""
+
+
+def infer_position_buckets(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """
+    Vectorized infer_position_bucket over a whole frame.
+
+    Expects columns: pos, crosses_pa_p90, xa_p90, aerial_win_pct, clr_p90
+    (missing metric columns behave like None). Returns a frame aligned to
+    df.index with position_bucket + position_bucket_reason, identical to
+    applying infer_position_bucket row by row.
+    """
+    rules = (config or {}).get("rules", {})
+    maps = (config or {}).get("mappings", {})
+    pos_exact = maps.get("pos_exact", {})
+    pos_combo = maps.get("pos_combo", {})
+    df_split = rules.get("df_split", {})
+    dfmf_split = rules.get("df_mf_split", {})
+
+    n = len(df)
+    pos_raw = df["pos"] if "pos" in df.columns else pd.Series(pd.NA, index=df.index)
+
+    # normalize_pos + base class lookup on unique values only
+    pos_norm = pos_raw.astype(object).where(pos_raw.notna(), None)
+    codes, uniques = pd.factorize(pos_norm, use_na_sentinel=False)
+    uniq_pos = [normalize_pos(u) for u in uniques]
+    uniq_base = np.array([_base_class(p, pos_exact, pos_combo) for p in uniq_pos], dtype=object)
+    uniq_gk = np.array(["GK" in p for p in uniq_pos], dtype=bool)
+
+    base = uniq_base[codes]
+    has_gk = uniq_gk[codes]
+
+    def num(col: str) -> np.ndarray:
+        if col not in df.columns:
+            return np.full(n, np.nan)
+        return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    x_cross = num("crosses_pa_p90")
+    x_xa = num("xa_p90")
+    x_aer = num("aerial_win_pct")
+    x_clr = num("clr_p90")
+
+    is_df = base == "DF"
+    is_dfmf = base == "DFMF"
+
+    # NaN comparisons are False, matching the scalar "x is not None and x >= t"
+    with np.errstate(invalid="ignore"):
+        rules_table = [
+            (has_gk, "GK", "POS_HAS_GK"),
+            (base == "FW", "CF", "POS_FW_ONLY"),
+            ((base == "MFFW") | (base == "FWMF"), "WIDE", "POS_MF_FW"),
+            (base == "MF", "DMCM", "POS_MF_ONLY"),
+            (base == "MFDF", "DMCM", "POS_MF_DF"),
+            (is_df & (x_aer >= float(df_split.get("cb_if_aerial_win_pct_gte", 55.0))), "CB", "DF_CB_AERIAL"),
+            (is_df & (x_clr >= float(df_split.get("cb_if_clr_p90_gte", 4.0))), "CB", "DF_CB_CLEARANCES"),
+            (is_df & (x_cross >= float(df_split.get("fb_if_crosses_pa_p90_gte", 1.2))), "FB", "DF_FB_CROSSES"),
+            (is_df & (x_xa >= float(df_split.get("fb_if_xa_p90_gte", 0.08))), "FB", "DF_FB_XA"),
+            (is_df, str(df_split.get("default_df_bucket", "CB")), "DF_DEFAULT"),
+            (is_dfmf & (x_cross >= float(dfmf_split.get("fb_if_crosses_pa_p90_gte", 1.0))), "FB", "DFMF_FB_CROSSES"),
+            (is_dfmf & (x_xa >= float(dfmf_split.get("fb_if_xa_p90_gte", 0.06))), "FB", "DFMF_FB_XA"),
+            (is_dfmf, str(dfmf_split.get("default_bucket", "DMCM")), "DFMF_DEFAULT"),
+        ]
+
+    conds = [c for c, _, _ in rules_table]
+    other_reason = np.where(base != "", np.char.add("POS_", base.astype(str)), "POS_UNKNOWN").astype(object)
+
+    bucket = np.select(conds, [np.array(b, dtype=object) for _, b, _ in rules_table], default="OTHER")
+    reason = np.select(conds, [np.array(r, dtype=object) for _, _, r in rules_table], default=other_reason)
+
+    return pd.DataFrame(
+        {"position_bucket": bucket.astype(object), "position_bucket_reason": reason.astype(object)},
+        index=df.index,
+    )
@@ -0,0 +1,168 @@
+"""Tests for rsfbref.marts.build_dims / identity - surrogate ids and player registry."""
+from __future__ import annotations
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.marts.build_dims import add_ids, build_dim_player, build_dim_player_from_registry, load_id_cache
+from rsfbref.marts.identity import PlayerRegistry
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _sha1(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def _reference_add_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-wise implementation the bulk generator must reproduce."""
+    out = df.copy()
+
+    def mk(r, cols) -> str:
+        return _sha1("|".join(str(r.get(c, "")).strip().lower() for c in cols))
+
+    out["player_id"] = out.apply(lambda r: mk(r, ["player", "nation", "born"]), axis=1)
+    out["team_id"] = out.apply(lambda r: mk(r, ["team", "league", "season"]), axis=1)
+    out["player_team_season_id"] = (
+        out["player_id"].astype(str) + "|" + out["team_id"].astype(str)
+        + "|" + out["league"].astype(str) + "|" + out["season"].astype(str)
+    ).map(_sha1)
+    return out
+
+
+def _make_df(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    born = rng.integers(1990, 2006, n).astype(float)
+    born[rng.random(n) < 0.1] = np.nan
+    names = np.array(["Bukayo Saka", "bukayo saka ", " Rodri", "Rodri", "Pedri", None], dtype=object)
+    return pd.DataFrame({
+        "league": rng.choice(["ENG-Premier League", "ESP-La Liga"], n),
+        "season": rng.choice(["2324", "2425"], n),
+        "team": rng.choice(["Arsenal", "arsenal", "Man City"], n),
+        "player": names[rng.integers(0, len(names), n)],
+        "nation": rng.choice(["eng ENG", "es ESP"], n),
+        "born": born,
+    })
+
+
+# ---------------------------------------------------------------------------
+# add_ids
+# ---------------------------------------------------------------------------
+
+
+def test_bulk_ids_match_rowwise_sha1():
+    df = _make_df()
+    got = add_ids(df)
+    ref = _reference_add_ids(df)
+    for c in ["player_id", "team_id", "player_team_season_id"]:
+        assert got[c].tolist() == ref[c].tolist()
+
+
+def test_missing_identity_column_hashes_as_empty_string():
+    df = _make_df(n=20).drop(columns=["nation"])
+    got = add_ids(df)
+    expected = [
+        _sha1("|".join([str(p).strip().lower(), "", str(b).strip().lower()]))
+        for p, b in zip(df["player"], df["born"])
+    ]
+    assert got["player_id"].tolist() == expected
+
+
+def test_id_cache_roundtrip(tmp_path):
+    df = _make_df(n=100)
+    cache_path = tmp_path / "id_cache.parquet"
+
+    first = add_ids(df, id_cache_path=cache_path)
+    cache = load_id_cache(cache_path)
+    assert len(cache) == (
+        first["player_id"].nunique() + first["team_id"].nunique() + first["player_team_season_id"].nunique()
+    )
+
+    second = add_ids(df, id_cache_path=cache_path)
+    pd.testing.assert_frame_equal(first, second)
+    assert load_id_cache(cache_path) == cache
+
+
+# ---------------------------------------------------------------------------
+# PlayerRegistry
+# ---------------------------------------------------------------------------
+
+
+def _season_frame(season: str, players: list[str]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "league": "ENG-Premier League",
+        "season": season,
+        "team": "Arsenal",
+        "player": players,
+        "nation": "eng ENG",
+        "born": 2001.0,
+        "age": "23-010",
+        "pos": "MF",
+        "position_bucket": "DMCM",
+    })
+
+
+def test_registry_appends_incrementally(tmp_path):
+    reg = PlayerRegistry(tmp_path)
+    first = add_ids(_season_frame("2324", ["A", "B"]), registry=reg)
+    reg.save()
+
+    reg = PlayerRegistry(tmp_path)
+    second = add_ids(_season_frame("2425", ["B", "C"]), registry=reg)
+    reg.save()
+
+    # rerun of the same season adds nothing
+    reg = PlayerRegistry(tmp_path)
+    add_ids(_season_frame("2425", ["B", "C"]), registry=reg)
+    assert len(reg.players) == 3
+    assert len(reg.appearances) == 4
+
+    b_id = first.loc[first["player"] == "B", "player_id"].iloc[0]
+    assert second.loc[second["player"] == "B", "player_id"].iloc[0] == b_id
+    hist = reg.history(b_id)
+    assert hist["season"].tolist() == ["2324", "2425"]
+    assert set(hist["player_team_season_id"]) == {
+        first.loc[first["player"] == "B", "player_team_season_id"].iloc[0],
+        second.loc[second["player"] == "B", "player_team_season_id"].iloc[0],
+    }
+    b = reg.players.set_index("player_id").loc[b_id]
+    assert (b["first_season"], b["last_season"]) == ("2324", "2425")
+    assert reg.history("unknown").empty
+
+
+def test_registry_backfill_moves_first_season_earlier(tmp_path):
+    reg = PlayerRegistry(tmp_path)
+    later = add_ids(_season_frame("2324", ["A"]), registry=reg)
+    reg.save()
+
+    # backfill an older season for the same player
+    reg = PlayerRegistry(tmp_path)
+    add_ids(_season_frame("2223", ["A"]), registry=reg)
+    a_id = later["player_id"].iloc[0]
+    a = reg.players.set_index("player_id").loc[a_id]
+    assert (a["first_season"], a["last_season"]) == ("2223", "2324")
+    assert reg.history(a_id)["season"].tolist() == ["2223", "2324"]
+
+
+def test_registry_ids_match_plain_add_ids(tmp_path):
+    df = _make_df(n=200)
+    df["age"], df["pos"], df["position_bucket"] = "25-001", "DF", "CB"
+    reg = PlayerRegistry(tmp_path)
+    add_ids(df, registry=reg)
+    reg.save()
+
+    again = add_ids(df, registry=PlayerRegistry(tmp_path))
+    pd.testing.assert_frame_equal(again, add_ids(df))
+
+
+def test_dim_player_from_registry_matches_scan(tmp_path):
+    reg = PlayerRegistry(tmp_path)
+    df = add_ids(_season_frame("2425", ["A", "B", "C"]), registry=reg)
+    from_scan = build_dim_player(df).reset_index(drop=True)
+    from_registry = build_dim_player_from_registry(reg, player_ids=df["player_id"].unique())
+    pd.testing.assert_frame_equal(from_registry, from_scan, check_dtype=False)
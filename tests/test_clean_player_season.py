@@ -0,0 +1,144 @@
+"""Tests for rsfbref.transform.clean_player_season / metrics - metric registry."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from rsfbref.transform.clean_player_season import (
+    build_player_season_clean,
+    read_player_season_base,
+    required_base_columns,
+)
+from rsfbref.transform.metrics import load_metric_specs, metric_names
+
+CONFIGS = Path(__file__).resolve().parents[1] / "configs"
+METRICS_PATH = str(CONFIGS / "metrics_v1.yaml")
+POSITION_MAP = str(CONFIGS / "position_map.yaml")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _make_base(n: int = 50, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "league": "ENG-Premier League",
+        "season": "2425",
+        "team": rng.choice(["A", "B"], n),
+        "player": [f"Player {i}" for i in range(n)],
+        "nation": "ENG",
+        "born": 2000,
+        "pos": rng.choice(["DF", "MF", "FW,MF", "GK"], n),
+        "age": "24-100",
+        "Playing_Time_Min": rng.integers(500, 3400, n),
+        "Playing_Time_90s": 0.0,
+        "Per_90_Minutes_npxG": rng.random(n),
+        "unused__wide_column": rng.random(n),
+    })
+    df["Playing_Time_90s"] = (df["Playing_Time_Min"] / 90).round(1)
+    for spec in load_metric_specs(METRICS_PATH):
+        for c in spec.source:
+            if c not in df.columns:
+                df[c] = rng.random(n) * 50
+    # FBref sometimes serves numbers as strings
+    df["passing__KP"] = df["passing__KP"].astype(str)
+    return df
+
+
+# ---------------------------------------------------------------------------
+# build_player_season_clean
+# ---------------------------------------------------------------------------
+
+
+def test_registry_metrics_match_formulas():
+    base = _make_base()
+    clean = build_player_season_clean(base, min_minutes=900, position_map_path=POSITION_MAP, metrics_path=METRICS_PATH)
+
+    b = base.loc[clean.index]
+    nineties = b["Playing_Time_90s"]
+    np.testing.assert_array_equal(clean["prog_passes_p90"], b["passing__PrgP"] / nineties)
+    np.testing.assert_array_equal(clean["key_passes_p90"], pd.to_numeric(b["passing__KP"]) / nineties)
+    np.testing.assert_array_equal(clean["pass_cmp_pct"], b["passing__Total_Cmppct"])
+    np.testing.assert_array_equal(
+        clean["mis_dis_p90"],
+        b["possession__Carries_Mis"] / nineties + b["possession__Carries_Dis"] / nineties,
+    )
+    assert (clean["minutes"] >= 900).all()
+    assert "GK" not in set(clean["position_bucket"])
+    names = metric_names(load_metric_specs(METRICS_PATH))
+    assert list(clean.columns[-len(names):]) == names
+    assert "unused__wide_column" not in clean.columns
+
+
+def test_new_kpi_is_a_config_change(tmp_path):
+    raw = yaml.safe_load(Path(METRICS_PATH).read_text(encoding="utf-8"))
+    raw["metrics"].append({"name": "kp_per_att", "transform": "ratio", "source": ["passing__KP", "passing__Total_Att"], "scale": 100})
+    path = tmp_path / "metrics.yaml"
+    path.write_text(yaml.dump(raw), encoding="utf-8")
+
+    base = _make_base()
+    clean = build_player_season_clean(base, min_minutes=900, position_map_path=POSITION_MAP, metrics_path=str(path))
+
+    b = base.loc[clean.index]
+    expected = pd.to_numeric(b["passing__KP"]) / b["passing__Total_Att"] * 100
+    np.testing.assert_allclose(clean["kp_per_att"], expected)
+
+
+def test_missing_source_column_yields_nan():
+    base = _make_base().drop(columns=["defense__Err"])
+    clean = build_player_season_clean(base, min_minutes=900, position_map_path=POSITION_MAP, metrics_path=METRICS_PATH)
+    assert clean["errors_p90"].isna().all()
+
+
+def test_unknown_transform_rejected(tmp_path):
+    path = tmp_path / "metrics.yaml"
+    path.write_text(yaml.dump({"metrics": [{"name": "x", "transform": "log", "source": "a"}]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="unknown transform"):
+        load_metric_specs(path)
+
+
+# ---------------------------------------------------------------------------
+# read_player_season_base
+# ---------------------------------------------------------------------------
+
+
+def test_read_base_projects_to_required_columns(tmp_path):
+    base = _make_base()
+    path = tmp_path / "player_season_base.parquet"
+    base.to_parquet(path, index=False)
+
+    projected = read_player_season_base(path, metrics_path=METRICS_PATH)
+    assert "unused__wide_column" not in projected.columns
+    assert set(projected.columns) == set(required_base_columns(load_metric_specs(METRICS_PATH)))
+
+    a = build_player_season_clean(base, position_map_path=POSITION_MAP, metrics_path=METRICS_PATH)
+    b = build_player_season_clean(projected, position_map_path=POSITION_MAP, metrics_path=METRICS_PATH)
+    pd.testing.assert_frame_equal(a, b)
+
+
+# ---------------------------------------------------------------------------
+# build_fact_player_season (metric columns follow the registry)
+# ---------------------------------------------------------------------------
+
+
+def test_fact_default_metrics_come_from_registry(tmp_path):
+    from rsfbref.marts.build_facts import build_fact_player_season
+
+    raw = yaml.safe_load(Path(METRICS_PATH).read_text(encoding="utf-8"))
+    raw["metrics"].append({"name": "kp_per_att", "transform": "ratio", "source": ["passing__KP", "passing__Total_Att"], "scale": 100})
+    path = tmp_path / "metrics.yaml"
+    path.write_text(yaml.dump(raw), encoding="utf-8")
+
+    clean = build_player_season_clean(_make_base(), min_minutes=900, position_map_path=POSITION_MAP, metrics_path=str(path))
+    clean["player_team_season_id"] = [f"pts{i}" for i in range(len(clean))]
+
+    fact = build_fact_player_season(clean, metrics_path=str(path))
+    names = metric_names(load_metric_specs(path))
+    assert [c for c in fact.columns if c in names] == names
+    assert "kp_per_att" in fact.columns
@@ -0,0 +1,246 @@
+"""Tests for rsfbref.analytics.comparables - vectorized neighbour selection and output."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics.pairwise import cosine_distances
+from sklearn.preprocessing import RobustScaler
+
+from rsfbref.analytics.comparables import (
+    INVERT_PCT_FEATURES,
+    REASON_FEATURES,
+    ROLE_FEATURES,
+    blocked_knn,
+    build_comparables_parallel,
+    build_fact_comparables,
+    dim_reason_feature,
+    reason_codes,
+    render_reason_codes,
+)
+
+
+REASON_ID_COLS = ["reason_feature_1", "reason_feature_2", "reason_feature_3", "reason_higher_mask"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _top_reason_codes_reference(anchor_vec, comp_vec, feat_names, k=3):
+    diffs = comp_vec - anchor_vec
+    idx = np.argsort(np.abs(diffs), kind="stable")[::-1][:k]
+    return [f"{feat_names[i].replace('pct_', '')}:{'higher' if diffs[i] > 0 else 'lower'}" for i in idx]
+
+
+def _build_fact_comparables_reference(df, role_id, top_n=10, comparison_scope="league_season", pct_scope="league_season"):
+    """Previous per-anchor loop (stable argsort so distance ties keep pool order)."""
+    score_col = f"score_{role_id}"
+    feats = [f for f in ROLE_FEATURES.get(role_id, []) if f in df.columns]
+    pool = df[df[score_col].notna()].copy()
+    eff_top_n = min(int(top_n), len(pool) - 1)
+
+    X = pool[feats].apply(pd.to_numeric, errors="coerce")
+    X = X.fillna(X.median(numeric_only=True))
+    for f in feats:
+        if f in INVERT_PCT_FEATURES:
+            X[f] = 100.0 - X[f]
+    Xs = RobustScaler().fit_transform(X)
+    D = cosine_distances(Xs, Xs)
+
+    rows = []
+    for i in range(len(pool)):
+        anchor = pool.iloc[i]
+        order = np.argsort(D[i], kind="stable")
+        order = order[order != i][:eff_top_n]
+        for rank, j in enumerate(order, start=1):
+            comp = pool.iloc[j]
+            reasons = _top_reason_codes_reference(Xs[i], Xs[j], feats, k=3)
+            rows.append({
+                "comparison_scope": comparison_scope,
+                "pct_scope": pct_scope,
+                "role_id": role_id,
+                "anchor_pts_id": anchor["player_team_season_id"],
+                "anchor_player_id": anchor["player_id"],
+                "anchor_team_id": anchor["team_id"],
+                "anchor_league": anchor["league"],
+                "anchor_season": anchor["season"],
+                "comp_pts_id": comp["player_team_season_id"],
+                "comp_player_id": comp["player_id"],
+                "comp_team_id": comp["team_id"],
+                "comp_league": comp["league"],
+                "comp_season": comp["season"],
+                "different_league": bool(anchor["league"] != comp["league"]),
+                "different_season": bool(anchor["season"] != comp["season"]),
+                "distance": float(D[i, j]),
+                "rank": int(rank),
+                "reason_1": reasons[0] if len(reasons) > 0 else None,
+                "reason_2": reasons[1] if len(reasons) > 1 else None,
+                "reason_3": reasons[2] if len(reasons) > 2 else None,
+            })
+    return pd.DataFrame(rows)
+
+
+def _make_df(n: int = 200, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_team_season_id": [f"pts{i}" for i in range(n)],
+        "player_id": [f"p{i}" for i in range(n)],
+        "team_id": rng.choice(["t1", "t2", "t3"], n),
+        "league": rng.choice(["ENG", "ESP"], n),
+        "season": rng.choice(["2324", "2425"], n),
+    })
+    feats = sorted({f for fs in ROLE_FEATURES.values() for f in fs})
+    for f in feats:
+        p = np.round(rng.uniform(0, 100, n), 0)
+        p[rng.random(n) < 0.05] = np.nan
+        df[f] = p
+    # duplicated profiles -> exact distance ties
+    df.loc[df.index[1::25], feats] = df.loc[df.index[0::25][: len(df.index[1::25])], feats].to_numpy()
+    for role in ROLE_FEATURES:
+        s = rng.uniform(0, 100, n)
+        s[rng.random(n) < 0.3] = np.nan
+        df[f"score_{role}"] = s
+    return df
+
+
+# ---------------------------------------------------------------------------
+# build_fact_comparables
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("role_id", ["BPCB", "DLP", "WCR"])
+@pytest.mark.parametrize("top_n", [1, 10, 400])
+def test_comparables_identical_to_reference(role_id, top_n):
+    df = _make_df()
+    got = render_reason_codes(build_fact_comparables(df, role_id, top_n=top_n, comparison_scope="multi", pct_scope="league_season"))
+    got = got.drop(columns=REASON_ID_COLS)
+    ref = _build_fact_comparables_reference(df, role_id, top_n=top_n, comparison_scope="multi", pct_scope="league_season")
+    pd.testing.assert_frame_equal(got, ref)
+
+
+def test_comparables_with_missing_features_and_tiny_pool():
+    df = _make_df(seed=1).drop(columns=["pct_xa_p90", "pct_sca_p90"])
+    got = render_reason_codes(build_fact_comparables(df, "WCR", top_n=5)).drop(columns=REASON_ID_COLS)
+    pd.testing.assert_frame_equal(got, _build_fact_comparables_reference(df, "WCR", top_n=5))
+
+    tiny = df[df["score_DLP"].notna()].head(1)
+    assert build_fact_comparables(tiny, "DLP").empty
+
+
+# ---------------------------------------------------------------------------
+# blocked_knn
+# ---------------------------------------------------------------------------
+
+
+def test_block_size_does_not_change_result():
+    df = _make_df(n=400, seed=2)
+    full = build_fact_comparables(df, "BPCB", top_n=8, block_size=10_000)
+    for kwargs in [{"block_size": 1}, {"block_size": 37}, {"memory_budget_mb": 0.01}]:
+        pd.testing.assert_frame_equal(build_fact_comparables(df, "BPCB", top_n=8, **kwargs), full)
+
+
+def test_blocked_knn_matches_full_distance_matrix():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(250, 6))
+    X[10] = X[20]  # tie
+    a, c, d = blocked_knn(X, 5, block_size=16)
+
+    D = cosine_distances(X, X)
+    np.fill_diagonal(D, np.inf)
+    ref = np.array([np.argsort(row, kind="stable")[:5] for row in D])
+    np.testing.assert_array_equal(a, np.repeat(np.arange(250), 5))
+    np.testing.assert_array_equal(c, ref.ravel())
+    np.testing.assert_allclose(d, D[a, c])
+
+
+# ---------------------------------------------------------------------------
+# reason codes
+# ---------------------------------------------------------------------------
+
+
+def test_reason_codes_match_per_pair_reference_with_ties():
+    rng = np.random.default_rng(4)
+    feats = ROLE_FEATURES["DLP"]
+    diffs = rng.integers(-3, 4, size=(2000, len(feats))).astype(float)  # many |delta| ties
+    ids, higher = reason_codes(diffs, feats)
+
+    assert ids.dtype == np.int16 and higher.dtype == np.uint8
+    names = np.array(REASON_FEATURES)
+    for i in range(len(diffs)):
+        ref = _top_reason_codes_reference(np.zeros(len(feats)), diffs[i], feats, k=3)
+        got = [f"{names[ids[i, r]].replace('pct_', '')}:{'higher' if higher[i] >> r & 1 else 'lower'}" for r in range(3)]
+        assert got == ref
+
+
+def test_reason_ids_join_dim_reason_feature():
+    df = _make_df(seed=5)
+    out = build_fact_comparables(df, "WCR", top_n=3)
+    dim = dim_reason_feature()
+    joined = out.merge(dim, left_on="reason_feature_1", right_on="reason_feature_id", how="left", validate="m:1")
+    assert joined["feature"].isin(ROLE_FEATURES["WCR"]).all()
+    rendered = render_reason_codes(out)
+    assert (rendered["reason_1"].str.split(":").str[0] == joined["kpi_name"]).all()
+
+    # fewer features than reason slots -> missing slots render as None
+    ids, higher = reason_codes(np.array([[1.0, -2.0]]), ["pct_xa_p90", "pct_sca_p90"])
+    assert ids[0, 2] == -1
+    r = render_reason_codes(pd.DataFrame({
+        "reason_feature_1": ids[:, 0], "reason_feature_2": ids[:, 1], "reason_feature_3": ids[:, 2], "reason_higher_mask": higher,
+    }))
+    assert r[["reason_1", "reason_2", "reason_3"]].iloc[0].tolist() == ["sca_p90:lower", "xa_p90:higher", None]
+
+
+def test_rendered_export_keeps_reason_ids():
+    out = build_fact_comparables(_make_df(seed=9), "DLP", top_n=4)
+    rendered = render_reason_codes(out)
+
+    # ids + mask survive unchanged next to the labels
+    pd.testing.assert_frame_equal(rendered[REASON_ID_COLS], out[REASON_ID_COLS])
+    assert {"reason_1", "reason_2", "reason_3"} <= set(rendered.columns)
+
+    dim = dim_reason_feature()
+    for r in range(1, 4):
+        joined = rendered.merge(dim, left_on=f"reason_feature_{r}", right_on="reason_feature_id", how="left", validate="m:1")
+        assert (joined[f"reason_{r}"].str.split(":").str[0] == joined["kpi_name"]).all()
+
+
+# ---------------------------------------------------------------------------
+# build_comparables_parallel
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parallel_runner_matches_sequential(tmp_path, workers):
+    scopes = {"league_season": _make_df(seed=6), "multi_league_season": _make_df(seed=7)}
+    jobs = [(r, s, df) for r in ["BPCB", "DLP", "WCR"] for s, df in scopes.items()]
+    jobs.append(("DLP", "empty", _make_df(seed=8).assign(score_DLP=np.nan)))
+
+    got = build_comparables_parallel(jobs, top_n=6, comparison_scope="multi", workers=workers, block_size=50, tmp_dir=tmp_path)
+    ref = pd.concat(
+        [build_fact_comparables(df, r, top_n=6, comparison_scope="multi", pct_scope=s) for r, s, df in jobs[:-1]],
+        ignore_index=True,
+    )
+    pd.testing.assert_frame_equal(got, ref)
+    assert list(tmp_path.iterdir()) == []  # shared block removed
+
+
+def test_in_process_runner_keeps_blas_threads(monkeypatch):
+    # only pool workers are capped to one BLAS thread; workers <= 1 runs unthrottled
+    from threadpoolctl import threadpool_info, threadpool_limits
+
+    import rsfbref.analytics.comparables as comparables
+
+    seen = []
+    inner = comparables._neighbour_arrays
+
+    def spy(*args, **kwargs):
+        seen.append([p["num_threads"] for p in threadpool_info()])
+        return inner(*args, **kwargs)
+
+    monkeypatch.setattr(comparables, "_neighbour_arrays", spy)
+    with threadpool_limits(limits=2):
+        before = [p["num_threads"] for p in threadpool_info()]
+        build_comparables_parallel([("DLP", "league_season", _make_df(seed=10))], top_n=3, workers=1)
+    assert before and seen == [before]
@@ -0,0 +1,136 @@
+"""Tests for rsfbref.io.ingest - checkpointed ingestion scheduler."""
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.io.ingest import CHECKPOINT_NAME, plan_tasks, run_ingestion
+from rsfbref.io.snapshot import SnapshotFBref, SnapshotStore, write_snapshot
+from rsfbref.transform.player_season import PLAYER_STAT_TYPES_V1, read_player_season_bundle
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+LEAGUES = ["ENG-Premier League", "ESP-La Liga"]
+SEASONS = ["2324", "2425"]
+BIG5 = "Big 5 European Leagues Combined"
+
+
+class FakeReader:
+    """FBref-like reader for one league x season; fails the first N calls per stat_type."""
+
+    def __init__(self, league: str, season: str, failures: dict[str, int], calls: list[str]):
+        # a league group request returns rows keyed by its member leagues, like soccerdata
+        self.row_leagues = LEAGUES if league == BIG5 else [league]
+        self.league = league
+        self.season = season
+        self.failures = failures
+        self.calls = calls
+
+    def read_player_season_stats(self, stat_type: str) -> pd.DataFrame:
+        key = f"{stat_type}|{self.league}|{self.season}"
+        self.calls.append(key)
+        if self.failures.get(key, 0) > 0:
+            self.failures[key] -= 1
+            raise ConnectionError(f"rate limited: {key}")
+        idx = pd.MultiIndex.from_tuples(
+            [(lg, self.season, "Team", f"Player {i}") for lg in self.row_leagues for i in range(3)],
+            names=["league", "season", "team", "player"],
+        )
+        return pd.DataFrame({("Total", "Att"): np.arange(len(idx), dtype=float) + 1}, index=idx)
+
+
+def _factory(failures: dict[str, int], calls: list[str]):
+    return lambda league, season: FakeReader(league, season, failures, calls)
+
+
+def _no_sleep(delays: list[float]):
+    return delays.append
+
+
+# ---------------------------------------------------------------------------
+# run_ingestion
+# ---------------------------------------------------------------------------
+
+
+def test_plan_covers_league_season_stat_type():
+    tasks = plan_tasks(LEAGUES, SEASONS)
+    assert len(tasks) == len(LEAGUES) * len(SEASONS) * len(PLAYER_STAT_TYPES_V1)
+    assert len({t.key for t in tasks}) == len(tasks)
+
+
+def test_plan_drops_members_of_a_requested_group():
+    tasks = plan_tasks([BIG5, "ESP-La Liga", "NED-Eredivisie"], SEASONS, stat_types=["passing"])
+    assert [t.league for t in tasks] == [BIG5, BIG5, "NED-Eredivisie", "NED-Eredivisie"]
+
+
+def test_retry_with_backoff_then_success(tmp_path):
+    calls: list[str] = []
+    delays: list[float] = []
+    failures = {"passing|ESP-La Liga|2425": 2}
+
+    report = run_ingestion(
+        _factory(failures, calls), LEAGUES, SEASONS, tmp_path,
+        max_workers=4, max_retries=3, backoff_s=0.5, sleep=_no_sleep(delays),
+    )
+
+    assert not report.failed
+    assert len(report.done) == 32
+    assert delays == [0.5, 1.0]
+    ckpt = json.loads((tmp_path / CHECKPOINT_NAME).read_text())["tasks"]
+    assert ckpt["passing|ESP-La Liga|2425"]["attempts"] == 3
+
+
+def test_resume_runs_only_failed_tasks(tmp_path):
+    calls: list[str] = []
+    failures = {"misc|ENG-Premier League|2324": 10, "defense|ESP-La Liga|2425": 10}
+
+    first = run_ingestion(
+        _factory(failures, calls), LEAGUES, SEASONS, tmp_path,
+        max_retries=1, backoff_s=0.0, sleep=_no_sleep([]),
+    )
+    assert set(first.failed) == {"misc|ENG-Premier League|2324", "defense|ESP-La Liga|2425"}
+    assert len(first.done) == 30
+
+    # "network recovers": rerun only touches the two failed tasks
+    calls.clear()
+    second = run_ingestion(_factory({}, calls), LEAGUES, SEASONS, tmp_path, sleep=_no_sleep([]))
+    assert sorted(calls) == sorted(first.failed)
+    assert len(second.skipped) == 30
+    assert set(second.done) == set(first.failed)
+
+
+def test_ingested_snapshot_replays_as_bundle(tmp_path):
+    run_ingestion(_factory({}, []), LEAGUES, SEASONS, tmp_path, max_workers=8)
+
+    bundle = read_player_season_bundle(SnapshotFBref(tmp_path, leagues=LEAGUES, seasons=SEASONS))
+    assert list(bundle) == PLAYER_STAT_TYPES_V1
+    assert len(bundle["passing"]) == len(LEAGUES) * len(SEASONS) * 3
+    assert list(bundle["passing"].columns) == ["league", "season", "team", "player", "Total_Att"]
+
+
+def test_scheduled_and_live_writers_share_partition_keys(tmp_path):
+    # scheduled run of a league group, then a live write_snapshot of the same rows
+    run_ingestion(_factory({}, []), [BIG5], SEASONS, tmp_path)
+    n_entries = len(SnapshotStore(tmp_path).entries())
+    assert n_entries == len(PLAYER_STAT_TYPES_V1) * len(LEAGUES) * len(SEASONS)
+    assert {e["league"] for e in SnapshotStore(tmp_path).entries()} == set(LEAGUES)
+
+    live = read_player_season_bundle(SnapshotFBref(tmp_path))
+    write_snapshot(live, tmp_path)
+    assert len(SnapshotStore(tmp_path).entries()) == n_entries  # same keys, no duplicates
+
+    # an unfiltered replay has no duplicate rows; the config filter sees live-written partitions
+    again = read_player_season_bundle(SnapshotFBref(tmp_path))
+    assert not again["passing"].duplicated(["league", "season", "team", "player"]).any()
+    scoped = read_player_season_bundle(SnapshotFBref(tmp_path, leagues=[BIG5], seasons=SEASONS))
+    pd.testing.assert_frame_equal(scoped["passing"], again["passing"])
+
+    # the resume check follows the recorded row-level partitions
+    calls: list[str] = []
+    report = run_ingestion(_factory({}, calls), [BIG5], SEASONS, tmp_path)
+    assert not calls and len(report.skipped) == len(PLAYER_STAT_TYPES_V1) * len(SEASONS)
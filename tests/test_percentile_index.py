@@ -0,0 +1,94 @@
+"""Tests for rsfbref.features.percentile_index - persisted percentile lookups."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from rsfbref.features.percentile_index import PercentileIndex, score_profiles
+from rsfbref.features.percentiles import add_percentiles_wide
+from rsfbref.features.scopes import get_scope_spec
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+METRICS = ["xa_p90", "Per_90_Minutes_npxG"]
+
+
+def _make_df(n: int = 1500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "league": rng.choice(["ENG", "ESP"], n),
+        "season": rng.choice(["2324", "2425"], n),
+        "position_bucket": rng.choice(["WIDE", "CF"], n),
+        "minutes": rng.integers(900, 3400, n),
+        "xa_p90": rng.integers(0, 8, n) / 20,  # ties
+        "Per_90_Minutes_npxG": rng.gamma(2.0, 0.1, n),
+    })
+    df.loc[df.index[::17], "Per_90_Minutes_npxG"] = np.nan
+    return df
+
+
+def _roles_yaml(tmp_path: Path) -> str:
+    path = tmp_path / "roles.yaml"
+    path.write_text(yaml.dump({"roles": [{
+        "role_id": "WCR",
+        "role_name": "Winger Creator",
+        "position_bucket": "WIDE",
+        "must_have": {"min_minutes": 900},
+        "weights": {"xa_p90": 0.5, "npxg_p90": 0.5},
+        "negative_metrics": [],
+    }]}), encoding="utf-8")
+    return str(path)
+
+
+# ---------------------------------------------------------------------------
+# PercentileIndex
+# ---------------------------------------------------------------------------
+
+
+def test_member_lookup_reproduces_batch_percentiles(tmp_path):
+    df = _make_df()
+    PercentileIndex.build(df, METRICS, scope="league_season").save(tmp_path / "idx")
+    index = PercentileIndex.load(tmp_path / "idx")
+
+    got = index.pct(df, as_member=True)
+    ref = add_percentiles_wide(df, METRICS, get_scope_spec("league_season").group_cols)
+    for m in METRICS:
+        np.testing.assert_array_equal(got[f"pct_{m}"].to_numpy(), ref[f"pct_{m}"].to_numpy())
+
+
+def test_new_player_is_ranked_as_if_added_to_pool():
+    df = _make_df()
+    index = PercentileIndex.build(df, METRICS, scope="multi_league_multi_season")
+
+    new = pd.DataFrame({"position_bucket": ["WIDE", "CF", "GK"], "xa_p90": [0.15, 10.0, 0.1]})
+    got = index.pct(new)
+
+    pool = df.loc[df["position_bucket"] == "WIDE", "xa_p90"]
+    expected = pd.concat([pool, pd.Series([0.15])]).rank(pct=True).iloc[-1] * 100
+    assert got["pct_xa_p90"].iloc[0] == expected
+    assert got["pct_xa_p90"].iloc[1] == 100.0
+    assert np.isnan(got["pct_xa_p90"].iloc[2])  # unknown group
+    assert got["pct_Per_90_Minutes_npxG"].isna().all()  # metric not supplied
+
+
+# ---------------------------------------------------------------------------
+# score_profiles
+# ---------------------------------------------------------------------------
+
+
+def test_what_if_profile_scores_higher(tmp_path):
+    df = _make_df()
+    index = PercentileIndex.build(df, METRICS, scope="league_season")
+
+    base = df[(df["position_bucket"] == "WIDE") & df["Per_90_Minutes_npxG"].notna()].head(1).reset_index(drop=True)
+    improved = base.assign(xa_p90=base["xa_p90"] * 1.10 + 0.05)
+    out = score_profiles(index, pd.concat([base, improved], ignore_index=True), roles_yaml_path=_roles_yaml(tmp_path))
+
+    assert {"pct_xa_p90", "pct_Per_90_Minutes_npxG", "score_WCR"} <= set(out.columns)
+    assert out["score_WCR"].iloc[1] > out["score_WCR"].iloc[0]
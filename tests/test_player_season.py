@@ -0,0 +1,131 @@
+"""Tests for rsfbref.transform.player_season - bundle reading and base join."""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rsfbref.transform.player_season import (
+    PLAYER_STAT_TYPES_V1,
+    build_player_season_base,
+    read_player_season_bundle,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+class FakeFBref:
+    """Minimal stand-in for soccerdata.FBref with artificial latency."""
+
+    def __init__(self, latency: float = 0.0, fail: set[str] | None = None):
+        self.latency = latency
+        self.fail = fail or set()
+
+    def read_player_season_stats(self, stat_type: str) -> pd.DataFrame:
+        time.sleep(self.latency)
+        if stat_type in self.fail:
+            raise ConnectionError(f"boom: {stat_type}")
+        rng = np.random.default_rng(len(stat_type))
+        idx = pd.MultiIndex.from_tuples(
+            [("ENG-Premier League", "2425", "Arsenal", f"Player {i}") for i in range(5)],
+            names=["league", "season", "team", "player"],
+        )
+        cols = pd.MultiIndex.from_tuples(
+            [("nation", ""), ("born", ""), ("Total", "Cmp%"), (stat_type, "Att")]
+        )
+        data = {
+            cols[0]: ["ENG"] * 5,
+            cols[1]: [2000 + i for i in range(5)],
+            cols[2]: rng.random(5),
+            cols[3]: rng.random(5),
+        }
+        return pd.DataFrame(data, index=idx)
+
+
+# ---------------------------------------------------------------------------
+# read_player_season_bundle
+# ---------------------------------------------------------------------------
+
+
+def test_concurrent_bundle_matches_sequential():
+    fbref = FakeFBref()
+    seq = read_player_season_bundle(fbref, max_workers=1)
+    par = read_player_season_bundle(fbref, max_workers=4)
+
+    assert list(par) == list(seq) == PLAYER_STAT_TYPES_V1
+    for st in seq:
+        pd.testing.assert_frame_equal(par[st], seq[st])
+    assert "Total_Cmppct" in seq["passing"].columns
+
+
+def test_concurrent_bundle_overlaps_latency():
+    fbref = FakeFBref(latency=0.05)
+
+    t0 = time.perf_counter()
+    read_player_season_bundle(fbref, max_workers=8)
+    elapsed = time.perf_counter() - t0
+
+    # sequential would take >= 8 * 0.05s
+    assert elapsed < 0.05 * len(PLAYER_STAT_TYPES_V1) * 0.75
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_bundle_reports_all_failures(capsys, max_workers):
+    fbref = FakeFBref(fail={"defense", "misc"})
+
+    with pytest.raises(RuntimeError, match="defense") as excinfo:
+        read_player_season_bundle(fbref, max_workers=max_workers)
+
+    assert "misc" in str(excinfo.value)
+    assert isinstance(excinfo.value.__cause__, ConnectionError)
+    out = capsys.readouterr().out
+    assert "[bundle] defense: failed" in out
+    assert "[bundle] passing: 5 rows" in out
+
+
+# ---------------------------------------------------------------------------
+# build_player_season_base
+# ---------------------------------------------------------------------------
+
+
+def _stat_table(rng: np.random.Generator, n: int, extra: str) -> pd.DataFrame:
+    players = rng.integers(0, 40, n)
+    born = rng.integers(1990, 2005, n).astype(float)
+    born[rng.random(n) < 0.1] = np.nan  # missing keys must still match each other
+    return pd.DataFrame({
+        "league": rng.choice(["ENG-Premier League", "ESP-La Liga"], n),
+        "season": rng.choice(["2324", "2425"], n),
+        "team": rng.choice(["A", "B", "C"], n),
+        "player": [f"Player {p}" for p in players],
+        "nation": "ENG",
+        "born": born,
+        "pos": "DF",
+        "age": "25-001",
+        f"{extra}_total": rng.integers(0, 100, n),
+        f"{extra}_rate": rng.random(n),
+        f"{extra}_flag": rng.random(n) > 0.5,
+    })
+
+
+def test_keyed_join_matches_merge_chain(capsys):
+    rng = np.random.default_rng(7)
+    bundle = {st: _stat_table(rng, 300, st) for st in PLAYER_STAT_TYPES_V1}
+
+    merged = build_player_season_base(bundle, join="merge")
+    merge_log = capsys.readouterr().out
+    keyed = build_player_season_base(bundle, join="keyed")
+    keyed_log = capsys.readouterr().out
+
+    pd.testing.assert_frame_equal(keyed, merged)
+    assert keyed_log == merge_log
+    assert "[dedupe] standard: dropped" in keyed_log
+
+
+def test_unknown_join_mode_raises():
+    with pytest.raises(ValueError, match="join"):
+        build_player_season_base({"standard": pd.DataFrame()}, join="hash")
@@ -0,0 +1,74 @@
+"""Tests for rsfbref.transform.position_bucket - vectorized vs scalar inference."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rsfbref.transform.position_bucket import (
+    infer_position_bucket,
+    infer_position_buckets,
+    load_position_map,
+)
+
+POSITION_MAP = Path(__file__).resolve().parents[1] / "configs" / "position_map.yaml"
+
+POS_VALUES = [
+    "DF", "MF", "FW", "GK", "DF,MF", "MF,DF", "MF,FW", "FW,MF", "DF,FW", "FW,DF",
+    " DF, MF ", "GK,DF", "df", "XX", "", None, np.nan, pd.NA,
+]
+
+
+def _random_frame(seed: int, n: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def metric(scale: float, threshold: float) -> np.ndarray:
+        x = rng.random(n) * scale
+        x[rng.random(n) < 0.05] = threshold  # exact threshold hits (>=)
+        x[rng.random(n) < 0.10] = np.nan
+        x[rng.random(n) < 0.01] = np.inf
+        return x
+
+    return pd.DataFrame({
+        "pos": pd.Series([POS_VALUES[i] for i in rng.integers(0, len(POS_VALUES), n)], dtype=object),
+        "crosses_pa_p90": metric(2.5, 1.2),
+        "xa_p90": metric(0.2, 0.06),
+        "aerial_win_pct": metric(100.0, 55.0),
+        "clr_p90": metric(8.0, 4.0),
+    }, index=rng.permutation(n) + 10)
+
+
+def _scalar(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+    rows = [
+        infer_position_bucket(
+            r["pos"],
+            crosses_pa_p90=r["crosses_pa_p90"],
+            xa_p90=r["xa_p90"],
+            aerial_win_pct=r["aerial_win_pct"],
+            clr_p90=r["clr_p90"],
+            config=config,
+        )
+        for _, r in df.iterrows()
+    ]
+    return pd.DataFrame(rows, columns=["position_bucket", "position_bucket_reason"], index=df.index)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_matches_scalar_randomized(seed):
+    config = load_position_map(POSITION_MAP)
+    df = _random_frame(seed)
+    pd.testing.assert_frame_equal(infer_position_buckets(df, config=config), _scalar(df, config))
+
+
+def test_vectorized_matches_scalar_with_empty_config():
+    df = _random_frame(3, n=300)
+    pd.testing.assert_frame_equal(infer_position_buckets(df, config={}), _scalar(df, {}))
+
+
+def test_vectorized_handles_empty_frame():
+    config = load_position_map(POSITION_MAP)
+    out = infer_position_buckets(_random_frame(0).iloc[:0], config=config)
+    assert list(out.columns) == ["position_bucket", "position_bucket_reason"]
+    assert len(out) == 0
@@ -0,0 +1,107 @@
+"""Tests for rsfbref.analytics.role_uncertainty - bootstrap role score intervals."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.analytics.role_uncertainty import UNCERTAINTY_SUFFIXES, bootstrap_role_scores, uncertainty_columns
+from rsfbref.analytics.roles import compile_roles, load_roles, score_roles
+from rsfbref.features.percentiles import add_percentiles_wide
+from rsfbref.marts.build_facts import build_fact_role_profile_card_v2
+
+ROLES_V1 = str(Path(__file__).resolve().parents[1] / "configs" / "roles_v1.yaml")
+GROUP_COLS = ["league", "season", "position_bucket"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _make_scored(n: int = 800, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    features = compile_roles(load_roles(ROLES_V1)).features
+    df = pd.DataFrame({
+        "player_team_season_id": [f"pts{i}" for i in range(n)],
+        "league": rng.choice(["ENG", "ESP"], n),
+        "season": "2425",
+        "position_bucket": rng.choice(["CB", "DMCM", "WIDE"], n),
+        "minutes": rng.integers(900, 3400, n),
+    })
+    df["nineties"] = df["minutes"] / 90
+    for f in features:
+        df[f] = rng.gamma(4.0, 1.0, n)
+    df["pass_cmp_pct"] = rng.uniform(86, 95, n)
+    df["passes_att_p90"] = rng.uniform(40, 90, n)
+    df["prog_passes_p90"] = rng.uniform(5, 10, n)
+    df["aerial_win_pct"] = rng.uniform(55, 80, n)
+    df["prog_carries_p90"] = rng.uniform(4, 8, n)
+    df["succ_takeons_p90"] = rng.uniform(1, 5, n)
+    df["xa_p90"] = rng.uniform(0.1, 0.5, n)
+    df = add_percentiles_wide(df, features, GROUP_COLS)
+    return score_roles(df, roles_yaml_path=ROLES_V1)
+
+
+# ---------------------------------------------------------------------------
+# bootstrap_role_scores
+# ---------------------------------------------------------------------------
+
+
+def test_without_resampled_metrics_interval_collapses_to_score():
+    df = _make_scored()
+    out = bootstrap_role_scores(df, roles_yaml_path=ROLES_V1, n_replicates=20)
+
+    for role_id in ["BPCB", "DLP", "WCR"]:
+        c = f"score_{role_id}"
+        elig = out[c].notna()
+        assert elig.any()
+        np.testing.assert_allclose(out.loc[elig, f"{c}_lo"], out.loc[elig, c], rtol=1e-5)
+        np.testing.assert_allclose(out.loc[elig, f"{c}_hi"], out.loc[elig, c], rtol=1e-5)
+        np.testing.assert_array_equal(out.loc[elig, f"{c}_rank_lo"], out.loc[elig, f"{c}_rank"])
+        for suffix in UNCERTAINTY_SUFFIXES:
+            assert out.loc[~elig, f"{c}{suffix}"].isna().all()
+
+
+def test_short_careers_get_wider_intervals():
+    df = _make_scored(seed=1)
+    # same profile, 10 vs 38 nineties
+    dlp = df.index[df["score_DLP"].notna()][:2]
+    df.loc[dlp[1], df.columns] = df.loc[dlp[0], df.columns].to_numpy()
+    df.loc[dlp[0], "nineties"] = 10.0
+    df.loc[dlp[1], "nineties"] = 38.0
+
+    per90 = [c for c in compile_roles(load_roles(ROLES_V1)).features if c.endswith("_p90")]
+    out = bootstrap_role_scores(
+        df, roles_yaml_path=ROLES_V1, n_replicates=400, seed=3, batch_size=64,
+        poisson_metrics=per90, attempts_p90={"pass_cmp_pct": "passes_att_p90"},
+    )
+    width = out["score_DLP_hi"] - out["score_DLP_lo"]
+    assert width.loc[dlp[0]] > width.loc[dlp[1]] > 0
+    elig = out["score_DLP"].notna()
+    assert (out.loc[elig, "score_DLP_rank_lo"] <= out.loc[elig, "score_DLP_rank_hi"]).all()
+
+
+def test_profile_card_ignores_uncertainty_columns():
+    df = bootstrap_role_scores(_make_scored(n=200), roles_yaml_path=ROLES_V1, n_replicates=5)
+    df["player_id"] = df["player_team_season_id"]
+    df["team_id"] = "t"
+    long = df[["player_team_season_id", "player_id", "team_id", "league", "season", "position_bucket", "minutes"]].assign(
+        kpi_name="xa_p90", kpi_value=0.1, kpi_pct=50.0, pct_scope="league_season"
+    )
+    card = build_fact_role_profile_card_v2(df, long)
+    assert set(card["role_id"]) == {"BPCB", "DLP", "WCR"}
+
+
+def test_profile_card_keeps_roles_with_uncertainty_like_suffix():
+    # a role id ending in _hi is not an interval column unless its base score exists
+    df = bootstrap_role_scores(_make_scored(n=200), roles_yaml_path=ROLES_V1, n_replicates=5)
+    df = df.drop(columns=uncertainty_columns(["WCR"])).rename(columns={"score_WCR": "score_press_hi"})
+    df["player_id"] = df["player_team_season_id"]
+    df["team_id"] = "t"
+    long = df[["player_team_season_id", "player_id", "team_id", "league", "season", "position_bucket", "minutes"]].assign(
+        kpi_name="xa_p90", kpi_value=0.1, kpi_pct=50.0, pct_scope="league_season"
+    )
+    card = build_fact_role_profile_card_v2(df, long)
+    assert set(card["role_id"]) == {"BPCB", "DLP", "press_hi"}
@@ -8,7 +8,15 @@ import pandas as pd
 import pytest
 import yaml
 
-from rsfbref.analytics.roles import apply_must_haves, load_roles, score_roles
+from rsfbref.analytics.roles import (
+    apply_must_haves,
+    compile_must_haves,
+    compile_roles,
+    load_roles,
+    read_role_pool,
+    resolve_feature,
+    score_roles,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -212,3 +220,135 @@ def test_ineligible_player_gets_na(tmp_path):
     df = _make_df(position_bucket="WIDE")  # not CB
     scored = score_roles(df, roles_yaml_path=path)
     assert pd.isna(scored["score_BPCB"].iloc[0])
+
+
+# ---------------------------------------------------------------------------
+# compiled role model
+# ---------------------------------------------------------------------------
+
+ROLES_V1 = Path(__file__).resolve().parents[1] / "configs" / "roles_v1.yaml"
+
+
+def _score_roles_loop(df: pd.DataFrame, roles_yaml_path: str) -> pd.DataFrame:
+    """Previous per-role / per-feature Series implementation."""
+    out = df.copy()
+    for role in load_roles(roles_yaml_path):
+        negatives = set(role.get("negative_metrics", []))
+        elig = out["position_bucket"].eq(role["position_bucket"]) & apply_must_haves(out, role)
+        score = pd.Series(0.0, index=out.index)
+        wsum = 0.0
+        for k, w in role["weights"].items():
+            pct_col = f"pct_{resolve_feature(k)}"
+            if pct_col not in out.columns:
+                continue
+            val = out[pct_col]
+            if k in negatives:
+                val = 100 - val
+            score += w * val
+            wsum += w
+        out[f"score_{role['role_id']}"] = (score / wsum).where(elig, pd.NA)
+    return out
+
+
+def _random_scored_frame(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    model = compile_roles(load_roles(str(ROLES_V1)))
+    df = pd.DataFrame({
+        "position_bucket": rng.choice(["CB", "DMCM", "WIDE", "CF", "FB"], n),
+        "minutes": rng.integers(500, 3400, n),
+        "pass_cmp_pct": rng.uniform(70, 95, n),
+        "prog_passes_p90": rng.uniform(0, 10, n),
+        "aerial_win_pct": rng.uniform(30, 80, n),
+        "passes_att_p90": rng.uniform(20, 90, n),
+        "prog_carries_p90": rng.uniform(0, 8, n),
+        "succ_takeons_p90": rng.uniform(0, 5, n),
+        "xa_p90": rng.uniform(0, 0.5, n),
+    })
+    for f in model.features[:-2]:  # last features missing entirely
+        pct = rng.uniform(0, 100, n)
+        pct[rng.random(n) < 0.03] = np.nan
+        df[f"pct_{f}"] = pct
+    return df
+
+
+def test_compiled_scores_match_per_role_loop():
+    df = _random_scored_frame()
+    got = score_roles(df, roles_yaml_path=str(ROLES_V1))
+    ref = _score_roles_loop(df, str(ROLES_V1))
+    for role_id in compile_roles(load_roles(str(ROLES_V1))).role_ids:
+        col = f"score_{role_id}"
+        np.testing.assert_allclose(got[col].to_numpy(dtype=float), ref[col].to_numpy(dtype=float), rtol=1e-12)
+
+
+def test_compile_roles_weight_matrix():
+    model = compile_roles(ROLES_YAML_CONTENT["roles"])
+    assert model.role_ids == ["BPCB", "DLP", "WCR"]
+    assert "tkl_int_p90" in model.features and "tackles_interceptions_p90" not in model.features
+    bpcb, err = 0, model.features.index("errors_p90")
+    assert model.w_neg[bpcb, err] == 0.10 and model.w_pos[bpcb, err] == 0.0
+    np.testing.assert_allclose((model.w_pos + model.w_neg).sum(axis=1), [1.0, 1.0, 1.0])
+
+
+# ---------------------------------------------------------------------------
+# must-have rule language
+# ---------------------------------------------------------------------------
+
+
+def test_must_have_ops_and_legacy_alias():
+    df = pd.DataFrame({
+        "minutes": [500, 1000, 2000, 3000],
+        "xa_p90": [0.1, 0.2, np.nan, 0.4],
+        "league": ["ENG", "ESP", "ENG", "ITA"],
+    })
+    role = {"role_id": "X", "must_have": {
+        "min_minutes": 900,
+        "minutes_max": 2500,
+        "league_in": ["ENG", "ESP"],
+        "xa_p90_between": [0.15, 0.5],
+    }}
+    assert apply_must_haves(df, role).tolist() == [False, True, False, False]
+
+
+def test_must_have_unknown_column_and_operator_raise():
+    df = pd.DataFrame({"minutes": [1000]})
+    with pytest.raises(ValueError, match="unknown columns"):
+        apply_must_haves(df, {"role_id": "X", "must_have": {"xg_chain_min": 1}})
+    with pytest.raises(ValueError, match="unknown operator"):
+        compile_must_haves({"role_id": "X", "must_have": {"minutes_atleast": 1}})
+
+
+def test_optional_must_have_skipped_in_scoring_but_strict_in_pushdown(tmp_path):
+    from rsfbref.analytics.roles import role_filter
+
+    # BPCB in roles_v1 has aerial_win_pct_min; frames without the column still score
+    df = _random_scored_frame().drop(columns=["aerial_win_pct"])
+    bpcb = next(r for r in load_roles(str(ROLES_V1)) if r["role_id"] == "BPCB")
+    assert "aerial_win_pct_min" in bpcb["must_have"]
+
+    scored = score_roles(df, roles_yaml_path=str(ROLES_V1))
+    mh = bpcb["must_have"]
+    expected = (
+        df["position_bucket"].eq("CB")
+        & (df["minutes"] >= mh["min_minutes"])
+        & (df["pass_cmp_pct"] >= mh["pass_cmp_pct_min"])
+        & (df["prog_passes_p90"] >= mh["prog_passes_p90_min"])
+    )
+    assert expected.any()
+    assert (scored["score_BPCB"].notna() <= expected).all()  # NaN pct can still blank a score
+    assert scored.loc[~expected, "score_BPCB"].isna().all()
+
+    # a typo'd / missing column still fails loudly for Parquet pushdown
+    with pytest.raises(ValueError, match="unknown columns"):
+        role_filter(bpcb, columns=list(df.columns))
+
+
+def test_read_role_pool_pushdown_matches_in_memory(tmp_path):
+    df = score_roles(_random_scored_frame(seed=4), roles_yaml_path=str(ROLES_V1))
+    df["player_id"] = [f"p{i}" for i in range(len(df))]
+    path = tmp_path / "fact_player_season.parquet"
+    df.to_parquet(path, index=False)
+
+    for role in load_roles(str(ROLES_V1)):
+        pool = read_role_pool(path, role)
+        expected = df[df[f"score_{role['role_id']}"].notna()]
+        assert pool["player_id"].tolist() == expected["player_id"].tolist()
@@ -0,0 +1,257 @@
+"""Tests for rsfbref.analytics.shortlist - top-N first, YAML rule engine, vectorized evidence."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from rsfbref.analytics.shortlist import add_age_band, build_shortlist, build_shortlists, load_shortlist_rules
+
+ROLES_V1 = str(Path(__file__).resolve().parents[1] / "configs" / "roles_v1.yaml")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+SUBSCORES = {
+    "BPCB": {
+        "progression": ["pct_prog_passes_p90", "pct_passes_final_third_p90", "pct_prog_carries_p90"],
+        "defending": ["pct_tkl_int_p90", "pct_clr_p90", "pct_aerial_win_pct"],
+        "security": ["pct_pass_cmp_pct", "pct_errors_p90"],
+        "creation": [],  # not primary
+    },
+    "DLP": {
+        "progression": ["pct_prog_passes_p90", "pct_passes_final_third_p90", "pct_prog_carries_p90"],
+        "creation": ["pct_key_passes_p90", "pct_xa_p90", "pct_sca_p90"],
+        "defending": ["pct_tkl_int_p90"],
+        "security": ["pct_pass_cmp_pct", "pct_fouls_p90"],
+    },
+    "WCR": {
+        "progression": ["pct_prog_carries_p90", "pct_carries_pa_p90", "pct_succ_takeons_p90"],
+        "creation": ["pct_xa_p90", "pct_key_passes_p90", "pct_sca_p90", "pct_crosses_pa_p90"],
+        "finishing": ["pct_Per_90_Minutes_npxG"],
+        "security": ["pct_takeon_succ_pct", "pct_mis_dis_p90"],
+    },
+}
+
+
+def _mean_pct(df: pd.DataFrame, cols: list[str], invert: list[str] | None = None) -> pd.Series:
+    cols = [c for c in cols if c in df.columns]
+    if not cols:
+        return pd.Series(pd.NA, index=df.index)
+    X = df[cols].astype(float).copy()
+    if invert:
+        for c in invert:
+            if c in X.columns:
+                X[c] = 100 - X[c]
+    return X.mean(axis=1)
+
+
+def _evidence_strings_reference(df: pd.DataFrame, role_id: str, top_k: int = 5) -> pd.DataFrame:
+    # previous per-row apply formatting
+    role_kpis = {
+        "BPCB": ["prog_passes_p90", "passes_final_third_p90", "pass_cmp_pct", "tkl_int_p90", "aerial_win_pct"],
+        "DLP": ["passes_att_p90", "prog_passes_p90", "pass_cmp_pct", "xa_p90", "sca_p90"],
+        "WCR": ["prog_carries_p90", "succ_takeons_p90", "xa_p90", "sca_p90", "Per_90_Minutes_npxG"],
+    }[role_id]
+
+    out = df.copy()
+    for i, k in enumerate(role_kpis[:top_k], start=1):
+        pct = f"pct_{k}"
+        if k in out.columns and pct in out.columns:
+            out[f"evidence_{i}"] = out.apply(lambda r: f"{k}={r[k]:.2f} (p{r[pct]:.0f})" if pd.notna(r[k]) and pd.notna(r[pct]) else None, axis=1)
+        else:
+            out[f"evidence_{i}"] = None
+    return out
+
+
+def _build_shortlist_reference(df: pd.DataFrame, role_id: str, top_n: int = 50) -> pd.DataFrame:
+    """Hard-coded implementation: row-wise apply over the whole pool, head(top_n) last."""
+    score_col = f"score_{role_id}"
+    pool = df[df[score_col].notna()].copy()
+    if pool.empty:
+        return pd.DataFrame()
+
+    # Subscores (with transparent inversions where relevant)
+    if role_id == "BPCB":
+        pool["sub_security"] = _mean_pct(pool, ["pct_pass_cmp_pct", "pct_errors_p90"], invert=["pct_errors_p90"])
+    elif role_id == "DLP":
+        pool["sub_security"] = _mean_pct(pool, ["pct_pass_cmp_pct", "pct_fouls_p90"], invert=["pct_fouls_p90"])
+    else:
+        pool["sub_security"] = _mean_pct(pool, ["pct_takeon_succ_pct", "pct_mis_dis_p90"], invert=["pct_mis_dis_p90"])
+
+    for sub, cols in SUBSCORES[role_id].items():
+        if sub == "security":
+            continue
+        pool[f"sub_{sub}"] = _mean_pct(pool, cols)
+
+    pool["total_score"] = pool[score_col]
+
+    # Risk flags (v1, rule-based)
+    flags = []
+    flags.append(pool["minutes"].between(900, 1200).map(lambda x: "LOW_MINUTES" if x else None))
+    if "pct_errors_p90" in pool.columns:
+        flags.append((pool["pct_errors_p90"] >= 90).map(lambda x: "HIGH_ERRORS" if x else None))
+    if "pct_mis_dis_p90" in pool.columns:
+        flags.append((pool["pct_mis_dis_p90"] >= 90).map(lambda x: "HIGH_TURNOVERS" if x else None))
+    flags.append((pool["age"] <= 19).map(lambda x: "VERY_YOUNG" if x else None))
+    flags.append((pool["age"] >= 32).map(lambda x: "OLDER_PROFILE" if x else None))
+
+    flags_df = pd.concat(flags, axis=1)
+    pool["risk_flags"] = flags_df.apply(lambda r: "|".join([x for x in r.tolist() if isinstance(x, str)]) if any(isinstance(x, str) for x in r.tolist()) else "", axis=1)
+    pool["risk_count"] = pool["risk_flags"].apply(lambda s: 0 if s == "" else len(s.split("|")))
+
+    # Evidence
+    pool = _evidence_strings_reference(pool, role_id=role_id, top_k=5)
+
+    # Final output columns (Tableau-friendly)
+    out_cols = [
+        "player_id", "team_id", "league", "season", "position_bucket", "minutes",
+        "total_score",
+        "sub_progression", "sub_defending", "sub_creation", "sub_finishing", "sub_security",
+        "risk_flags", "risk_count",
+        "evidence_1", "evidence_2", "evidence_3", "evidence_4", "evidence_5",
+    ]
+    out_cols = [c for c in out_cols if c in pool.columns]
+
+    out = pool[out_cols].copy()
+    out["role_id"] = role_id
+
+    out = out.sort_values(["total_score", "minutes"], ascending=[False, False]).head(top_n)
+    out["rank"] = range(1, len(out) + 1)
+    return out
+
+
+KPIS = [
+    "prog_passes_p90", "passes_final_third_p90", "pass_cmp_pct", "tkl_int_p90", "aerial_win_pct",
+    "passes_att_p90", "xa_p90", "sca_p90", "prog_carries_p90", "succ_takeons_p90", "Per_90_Minutes_npxG",
+]
+PCTS = KPIS + [
+    "errors_p90", "mis_dis_p90", "fouls_p90", "clr_p90", "key_passes_p90", "carries_pa_p90",
+    "crosses_pa_p90", "takeon_succ_pct",
+]
+
+
+def _make_df(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_id": [f"p{i}" for i in range(n)],
+        "team_id": rng.choice(["t1", "t2"], n),
+        "league": "ENG-Premier League",
+        "season": "2425",
+        "position_bucket": rng.choice(["CB", "DMCM", "WIDE"], n),
+        "minutes": rng.choice([900, 1000, 1200, 1500, 2500], n),
+        "age": rng.choice([18.0, 19.0, 25.0, 32.0, 34.0, np.nan], n),
+    })
+    for k in KPIS:
+        x = rng.gamma(2.0, 1.0, n)
+        x[rng.random(n) < 0.05] = np.nan
+        df[k] = x
+    for k in PCTS:
+        p = np.round(rng.uniform(0, 100, n), 1)
+        p[rng.random(n) < 0.05] = np.nan
+        p[rng.random(n) < 0.2] = 95.0  # risk thresholds
+        df[f"pct_{k}"] = p
+    for role in ["BPCB", "DLP", "WCR"]:
+        s = np.round(rng.uniform(0, 100, n), 0)  # ties -> minutes tie-break
+        s[rng.random(n) < 0.3] = np.nan
+        df[f"score_{role}"] = s
+    return df
+
+
+# ---------------------------------------------------------------------------
+# build_shortlist
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("role_id", ["BPCB", "DLP", "WCR"])
+@pytest.mark.parametrize("top_n", [5, 50, 1000])
+def test_shortlist_identical_to_reference(role_id, top_n):
+    df = _make_df()
+    got = build_shortlist(df, role_id, top_n=top_n, roles_yaml_path=ROLES_V1)
+    pd.testing.assert_frame_equal(got, _build_shortlist_reference(df, role_id, top_n=top_n))
+
+
+def test_shortlist_without_optional_pct_columns():
+    df = _make_df(seed=1).drop(columns=["pct_errors_p90", "pct_mis_dis_p90", "pct_xa_p90", "xa_p90"])
+    for role_id in ["BPCB", "DLP", "WCR"]:
+        got = build_shortlist(df, role_id, top_n=30, roles_yaml_path=ROLES_V1)
+        pd.testing.assert_frame_equal(got, _build_shortlist_reference(df, role_id, top_n=30))
+
+
+def test_risk_labels_cover_every_flag_combination():
+    df = _make_df(seed=2)
+    out = build_shortlist(df, "BPCB", top_n=1000, roles_yaml_path=ROLES_V1)
+    flags = out["risk_flags"].str.split("|")
+    assert (out["risk_count"] == flags.map(lambda f: len([x for x in f if x]))).all()
+    assert set(x for f in flags for x in f if x) <= {f.flag for f in load_shortlist_rules(ROLES_V1).flags}
+
+
+# ---------------------------------------------------------------------------
+# grouped shortlists
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("group_cols", [["league"], ["season", "age_band"], ["team_id", "age_band"]])
+@pytest.mark.parametrize("top_n", [1, 7, 1000])
+def test_grouped_shortlist_matches_filtered_reference(group_cols, top_n):
+    df = _make_df(n=900, seed=5)
+    df["league"] = np.random.default_rng(5).choice(["ENG", "ESP", "ITA"], len(df))
+    df["season"] = np.random.default_rng(6).choice(["2324", "2425"], len(df))
+    df = add_age_band(df)
+
+    got = build_shortlist(df, "DLP", top_n=top_n, roles_yaml_path=ROLES_V1, group_cols=group_cols)
+    parts = []
+    for _, g in df.groupby(group_cols, dropna=False, sort=True):
+        ref = _build_shortlist_reference(g, "DLP", top_n=top_n)
+        if len(ref):
+            parts.append(ref.assign(**{c: g.loc[ref.index, c] for c in group_cols}))
+    ref = pd.concat(parts)
+    pd.testing.assert_frame_equal(got[ref.columns], ref)
+
+
+def test_age_band_edges():
+    df = pd.DataFrame({"age": [17.0, 20.9, 21.0, 27.5, 31.0, 32.0, np.nan]})
+    band = add_age_band(df)["age_band"]
+    assert band.iloc[:6].tolist() == ["U21", "U21", "21-23", "24-27", "28-31", "32+"]
+    assert pd.isna(band.iloc[6])
+
+
+# ---------------------------------------------------------------------------
+# YAML rules
+# ---------------------------------------------------------------------------
+
+
+def test_all_roles_in_one_pass_match_per_role():
+    df = _make_df(seed=3)
+    many = build_shortlists(df, ["BPCB", "DLP", "WCR"], top_n=40, roles_yaml_path=ROLES_V1)
+    one = pd.concat([build_shortlist(df, r, top_n=40, roles_yaml_path=ROLES_V1) for r in ["BPCB", "DLP", "WCR"]])
+    pd.testing.assert_frame_equal(many, one)
+
+
+def test_custom_flags_and_subscores_from_yaml(tmp_path):
+    doc = yaml.safe_load(Path(ROLES_V1).read_text(encoding="utf-8"))
+    wcr = next(r for r in doc["roles"] if r["role_id"] == "WCR")
+    wcr["subscores"]["dribbling"] = ["pct_succ_takeons_p90", "pct_takeon_succ_pct"]
+    doc["risk_flags"] = [
+        {"flag": "YOUNG_LOW_MINUTES", "when": {"age_max": 19, "minutes_max": 1000}},
+        {"flag": "NO_SUCH_COLUMN", "when": {"pct_not_a_metric_min": 0}},
+    ]
+    path = tmp_path / "roles.yaml"
+    path.write_text(yaml.dump(doc), encoding="utf-8")
+
+    df = _make_df(seed=4)
+    out = build_shortlist(df, "WCR", top_n=1000, roles_yaml_path=path)
+    src = df.loc[out.index]
+
+    expected = ((src["age"] <= 19) & (src["minutes"] <= 1000)).map({True: "YOUNG_LOW_MINUTES", False: ""})
+    assert (out["risk_flags"] == expected).all()
+    assert out.columns.get_loc("sub_dribbling") == out.columns.get_loc("sub_security") + 1
+    np.testing.assert_allclose(
+        out["sub_dribbling"], src[["pct_succ_takeons_p90", "pct_takeon_succ_pct"]].mean(axis=1)
+    )
@@ -0,0 +1,104 @@
+"""Tests for rsfbref.analytics.similarity_index - persisted comparables queries."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rsfbref.analytics.comparables import ROLE_FEATURES, build_fact_comparables
+from rsfbref.analytics.similarity_index import SimilarityIndex
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _make_df(n: int = 600, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_team_season_id": [f"pts{i}" for i in range(n)],
+        "player_id": [f"p{i}" for i in range(n)],
+        "team_id": rng.choice(["t1", "t2", "t3"], n),
+        "league": rng.choice(["ENG", "ESP", "ITA"], n),
+        "season": rng.choice(["2324", "2425"], n),
+        "minutes": rng.integers(900, 3400, n),
+        "age": rng.choice([18.0, 22.0, 26.0, 30.0, 34.0, np.nan], n),
+    })
+    for f in sorted({f for fs in ROLE_FEATURES.values() for f in fs}):
+        p = rng.uniform(0, 100, n)
+        p[rng.random(n) < 0.05] = np.nan
+        df[f] = p
+    for role in ROLE_FEATURES:
+        s = rng.uniform(0, 100, n)
+        s[rng.random(n) < 0.3] = np.nan
+        df[f"score_{role}"] = s
+    return df
+
+
+# ---------------------------------------------------------------------------
+# SimilarityIndex
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("role_id", ["BPCB", "WCR"])
+def test_anchor_query_matches_batch_comparables(tmp_path, role_id):
+    df = _make_df()
+    SimilarityIndex.build(df, role_id, scope="league_season").save(tmp_path / role_id)
+    assert sorted(p.name for p in (tmp_path / role_id).iterdir()) == [
+        "ids.parquet", "index.json", "normalized.npy", "scaled.npy",
+    ]  # no pickled tree: it is rebuilt on load
+    index = SimilarityIndex.load(tmp_path / role_id)
+
+    batch = build_fact_comparables(df, role_id, top_n=10)
+    for pts in batch["anchor_pts_id"].unique()[:25]:
+        ref = batch[batch["anchor_pts_id"] == pts].reset_index(drop=True)
+        got = index.query(anchor_pts_id=pts, k=10)
+        assert got["comp_pts_id"].tolist() == ref["comp_pts_id"].tolist()
+        np.testing.assert_allclose(got["distance"], ref["distance"], atol=1e-12)
+        for c in ["different_league", "different_season", "rank", "reason_feature_1", "reason_feature_2", "reason_feature_3", "reason_higher_mask"]:
+            assert got[c].tolist() == ref[c].tolist()
+
+
+def test_template_profile_and_filters():
+    df = _make_df(seed=1)
+    index = SimilarityIndex.build(df, "DLP", scope="league_season")
+    pool = df[df["score_DLP"].notna()]
+    target = pool[pool[ROLE_FEATURES["DLP"]].notna().all(axis=1)].iloc[0]
+
+    # a template equal to a pool player finds that player first
+    got = index.query(profile=target[ROLE_FEATURES["DLP"]].to_dict(), k=5)
+    assert got["comp_pts_id"].iloc[0] == target["player_team_season_id"]
+    assert got["distance"].iloc[0] == pytest.approx(0.0, abs=1e-12)
+    assert got["anchor_pts_id"].isna().all()
+
+    anchor = pool["player_team_season_id"].iloc[0]
+    got = index.query(anchor_pts_id=anchor, k=8, different_league=True, max_age=26)
+    assert len(got) == 8
+    assert got["different_league"].all()
+    assert (got["comp_age"] <= 26).all()
+    assert (np.diff(got["distance"]) >= 0).all()
+
+    # the filtered result is the unfiltered ranking restricted to allowed rows
+    full = index.query(anchor_pts_id=anchor, k=len(index))
+    allowed = full[full["different_league"] & (full["comp_age"] <= 26)].head(8)
+    assert got["comp_pts_id"].tolist() == allowed["comp_pts_id"].tolist()
+
+    with pytest.raises(KeyError):
+        index.query(anchor_pts_id="nope")
+
+
+def test_string_ages_are_coerced():
+    # FBref serves ages like "24-123"; they must not break queries
+    df = _make_df(seed=2)
+    df["age"] = np.where(np.arange(len(df)) % 2 == 0, "24-123", "22")
+    index = SimilarityIndex.build(df, "BPCB", scope="league_season")
+    anchor = df.loc[df["score_BPCB"].notna(), "player_team_season_id"].iloc[0]
+
+    got = index.query(anchor_pts_id=anchor, k=len(index))
+    assert got["comp_age"].dtype == float
+    assert set(got["comp_age"].dropna()) == {22.0}
+    assert got["comp_age"].isna().any()
+
+    young = index.query(anchor_pts_id=anchor, k=5, max_age=23)
+    assert (young["comp_age"] == 22.0).all()
@@ -0,0 +1,102 @@
+"""Tests for rsfbref.features.sketches and the approximate percentile mode."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rsfbref.features.percentiles import (
+    add_percentiles_wide,
+    add_percentiles_wide_approx,
+    build_percentiles_cube,
+    percentile_accuracy_report,
+)
+from rsfbref.features.sketches import build_sketch, merge_sketches, sketch_pct
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _make_df(n: int = 20000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    x = rng.gamma(2.0, 1.0, n)
+    x[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "league": rng.choice(["ENG", "ESP", "ITA", "GER"], n),
+        "season": rng.choice(["2223", "2324", "2425"], n),
+        "position_bucket": rng.choice(["CB", "FB", "DMCM", "WIDE"], n),
+        "m_cont": x,
+        "m_ties": rng.integers(0, 6, n).astype(float),
+    })
+
+
+# ---------------------------------------------------------------------------
+# sketches
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("eps", [0.05, 0.01])
+def test_sketch_error_within_bound_after_merge(eps):
+    rng = np.random.default_rng(1)
+    pools = [rng.normal(loc=i, size=3000) for i in range(5)]
+    merged = merge_sketches([build_sketch(p, eps) for p in pools])
+
+    pool = np.concatenate(pools)
+    exact = pd.Series(pool).rank(pct=True, method="average").to_numpy() * 100
+    approx = sketch_pct(merged, pool)
+    assert merged.n == len(pool)
+    assert len(merged) < len(pool) / 5
+    assert np.abs(approx - exact).max() <= eps * 100
+
+
+def test_sketch_is_exact_for_few_distinct_values_and_keeps_nan():
+    x = np.array([1.0, 1.0, 2.0, np.nan, 3.0, 3.0, 3.0])
+    sk = build_sketch(x, eps=0.01)
+    exact = pd.Series(x).rank(pct=True, method="average").to_numpy() * 100
+    np.testing.assert_allclose(sketch_pct(sk, x), exact)
+    assert sk.n == 6
+
+
+def test_sketch_rejects_bad_eps():
+    with pytest.raises(ValueError, match="eps"):
+        build_sketch(np.arange(10.0), eps=0)
+
+
+# ---------------------------------------------------------------------------
+# approximate percentile mode
+# ---------------------------------------------------------------------------
+
+
+def test_approx_wide_close_to_exact_for_global_scope():
+    df = _make_df()
+    metrics = ["m_cont", "m_ties"]
+    exact = add_percentiles_wide(df, metrics, ["position_bucket"])
+    approx = add_percentiles_wide_approx(df, metrics, ["position_bucket"], eps=0.01)
+
+    np.testing.assert_array_equal(approx["pct_m_ties"].to_numpy(), exact["pct_m_ties"].to_numpy())
+    diff = np.abs(approx["pct_m_cont"] - exact["pct_m_cont"]).to_numpy()
+    assert np.nanmax(diff) <= 1.0
+    assert approx["pct_m_cont"].isna().equals(exact["pct_m_cont"].isna())
+
+
+def test_accuracy_report_and_cube_mode():
+    df = _make_df(n=5000)
+    report = percentile_accuracy_report(df, ["m_cont"], ["season", "position_bucket"], eps=0.02)
+    assert list(report.columns) == [
+        "kpi_name", "n", "mean_abs_err", "p99_abs_err", "max_abs_err", "bound", "within_bound",
+    ]
+    assert report["within_bound"].all()
+
+    cube = build_percentiles_cube(
+        df, ["m_cont"], ["league_season", "multi_league_multi_season"], ["league"], mode="approx", eps=0.02
+    )
+    assert len(cube) == 2 * len(df)
+    assert cube["kpi_pct"].max() <= 100
+
+
+def test_approx_rejects_scope_finer_than_partitions():
+    df = _make_df(n=100).assign(team="A")
+    with pytest.raises(ValueError, match="partition_cols"):
+        add_percentiles_wide_approx(df, ["m_cont"], ["team"])
@@ -0,0 +1,125 @@
+"""Tests for rsfbref.io.snapshot - snapshot store and replay reader."""
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rsfbref.io.snapshot import SnapshotFBref, SnapshotStore, config_snapshot_reader, write_snapshot
+from rsfbref.transform.player_season import PLAYER_STAT_TYPES_V1, read_player_season_bundle
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+class FakeFBref:
+    """Two leagues x two seasons, MultiIndex rows and columns like soccerdata."""
+
+    def read_player_season_stats(self, stat_type: str) -> pd.DataFrame:
+        rng = np.random.default_rng(len(stat_type))
+        rows = [
+            (league, season, f"Team {t}", f"Player {league[:3]}{season}{t}{i}")
+            for league in ["ENG-Premier League", "ESP-La Liga"]
+            for season in ["2324", "2425"]
+            for t in range(2)
+            for i in range(3)
+        ]
+        idx = pd.MultiIndex.from_tuples(rows, names=["league", "season", "team", "player"])
+        cols = pd.MultiIndex.from_tuples([("nation", ""), ("Total", "Cmp%"), (stat_type, "Att")])
+        return pd.DataFrame(
+            {cols[0]: ["ENG"] * len(rows), cols[1]: rng.random(len(rows)), cols[2]: rng.random(len(rows))},
+            index=idx,
+        )
+
+
+# ---------------------------------------------------------------------------
+# write_snapshot / SnapshotFBref
+# ---------------------------------------------------------------------------
+
+
+def test_replay_bundle_matches_live(tmp_path):
+    live = read_player_season_bundle(FakeFBref())
+    store = write_snapshot(live, tmp_path)
+
+    # 8 stat types x 2 leagues x 2 seasons
+    assert len(store.entries()) == len(PLAYER_STAT_TYPES_V1) * 4
+
+    replayed = read_player_season_bundle(SnapshotFBref(tmp_path))
+    for st in live:
+        pd.testing.assert_frame_equal(replayed[st], live[st])
+
+
+def test_replay_filters_partitions(tmp_path):
+    write_snapshot(read_player_season_bundle(FakeFBref()), tmp_path)
+
+    df = SnapshotFBref(tmp_path, leagues=["ESP-La Liga"], seasons=["2425"]).read_player_season_stats("passing")
+    assert df.index.names == ["league", "season", "team", "player"]
+    assert set(df.index.get_level_values("league")) == {"ESP-La Liga"}
+    assert len(df) == 6
+
+
+def test_config_replay_ignores_other_configs_partitions(tmp_path):
+    # the shared store also holds ESP-La Liga and 2324 partitions from another config
+    live = read_player_season_bundle(FakeFBref())
+    write_snapshot(live, tmp_path)
+
+    fbref_cfg = {"snapshot_dir": str(tmp_path), "leagues": ["ENG-Premier League"], "seasons": ["2425"]}
+    replayed = read_player_season_bundle(config_snapshot_reader(fbref_cfg))
+    for st in live:
+        expected = live[st][(live[st]["league"] == "ENG-Premier League") & (live[st]["season"] == "2425")]
+        pd.testing.assert_frame_equal(replayed[st], expected.reset_index(drop=True))
+
+
+def test_unchanged_partitions_are_not_rewritten(tmp_path):
+    bundle = read_player_season_bundle(FakeFBref())
+    first = {e["file"] for e in write_snapshot(bundle, tmp_path).entries()}
+    second = {e["file"] for e in write_snapshot(bundle, tmp_path).entries()}
+    assert first == second
+    assert len(list(tmp_path.glob("*.parquet"))) == len(first)
+
+
+def test_changed_partition_replaces_old_file(tmp_path):
+    store = SnapshotStore(tmp_path)
+    df = pd.DataFrame({"league": ["L"], "season": ["2425"], "team": ["T"], "player": ["P"], "x": [1.0]})
+    old = store.put("passing", "L", "2425", df)
+    new = store.put("passing", "L", "2425", df.assign(x=2.0))
+
+    assert old["sha1"] != new["sha1"]
+    assert not (tmp_path / old["file"]).exists()
+    assert SnapshotStore(tmp_path).get("passing", "L", "2425")["x"].tolist() == [2.0]
+
+
+def test_concurrent_puts_of_one_partition(tmp_path):
+    # overlapping scheduled tasks may write the same partition at once
+    store = SnapshotStore(tmp_path)
+    df = pd.DataFrame({"league": ["L"] * 500, "season": ["2425"] * 500, "team": ["T"] * 500, "player": [f"P{i}" for i in range(500)]})
+    barrier = threading.Barrier(8)
+    errors: list[BaseException] = []
+
+    def put():
+        barrier.wait()
+        try:
+            for _ in range(20):
+                store.put("passing", "L", "2425", df)
+        except BaseException as exc:  # surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob(".*.tmp"))
+    pd.testing.assert_frame_equal(SnapshotStore(tmp_path).get("passing", "L", "2425"), df)
+
+
+def test_missing_stat_type_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SnapshotFBref(tmp_path).read_player_season_stats("passing")
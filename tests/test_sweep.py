@@ -0,0 +1,92 @@
+"""Tests for rsfbref.analytics.sweep - batched role-weight sensitivity sweep."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from rsfbref.analytics.roles import compile_roles, load_roles, score_roles
+from rsfbref.analytics.shortlist import build_shortlist
+from rsfbref.analytics.sweep import dirichlet_weights, grid_weights, role_feature_block, sweep_role_weights
+
+ROLES_V1 = str(Path(__file__).resolve().parents[1] / "configs" / "roles_v1.yaml")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _make_df(n: int = 600, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_team_season_id": [f"pts{i}" for i in range(n)],
+        "player_id": [f"p{i}" for i in range(n)],
+        "team_id": rng.choice(["t1", "t2", "t3"], n),
+        "league": "ENG-Premier League",
+        "season": "2425",
+        "position_bucket": rng.choice(["CB", "DMCM", "WIDE"], n),
+        "minutes": rng.integers(600, 3400, n),
+        "age": rng.integers(18, 35, n),
+        "pass_cmp_pct": rng.uniform(80, 95, n),
+        "prog_passes_p90": rng.uniform(2, 10, n),
+        "aerial_win_pct": rng.uniform(50, 80, n),
+        "passes_att_p90": rng.uniform(35, 90, n),
+        "prog_carries_p90": rng.uniform(3, 8, n),
+        "succ_takeons_p90": rng.uniform(1, 5, n),
+        "xa_p90": rng.uniform(0.1, 0.5, n),
+    })
+    for f in compile_roles(load_roles(ROLES_V1)).features:
+        df[f"pct_{f}"] = rng.uniform(0, 100, n)
+    return df
+
+
+# ---------------------------------------------------------------------------
+# weight generators
+# ---------------------------------------------------------------------------
+
+
+def test_weight_generators_keep_shape_and_sum():
+    base = np.array([0.5, 0.3, 0.2])
+    W = dirichlet_weights(base, n_samples=100, seed=1)
+    assert W.shape == (100, 3)
+    np.testing.assert_allclose(W.sum(axis=1), 1.0)
+
+    G = grid_weights(base, deltas=(-0.5, 0.5))
+    assert G.shape == (1 + 3 * 2, 3)
+    np.testing.assert_array_equal(G[0], base)
+    assert G[1, 0] == 0.25 and G[2, 0] == 0.75
+
+
+# ---------------------------------------------------------------------------
+# sweep_role_weights
+# ---------------------------------------------------------------------------
+
+
+def test_base_rank_matches_shortlist_ranking():
+    df = score_roles(_make_df(), roles_yaml_path=ROLES_V1)
+    role = next(r for r in load_roles(ROLES_V1) if r["role_id"] == "DLP")
+    _, base, _ = role_feature_block(df, role)
+
+    res = sweep_role_weights(df, role, base[None, :], top_n=20)
+    shortlist = build_shortlist(df, role_id="DLP", top_n=20)
+
+    assert len(res) == df["score_DLP"].notna().sum()
+    top = res[res["base_rank"] <= 20]
+    assert top["player_id"].tolist() == shortlist["player_id"].tolist()
+    assert (top["topn_freq"] == 1.0).all()
+    assert (res["median_rank"] == res["base_rank"]).all()
+
+
+def test_batching_does_not_change_ranks():
+    df = score_roles(_make_df(seed=2), roles_yaml_path=ROLES_V1)
+    role = next(r for r in load_roles(ROLES_V1) if r["role_id"] == "WCR")
+    _, base, _ = role_feature_block(df, role)
+    W = dirichlet_weights(base, n_samples=300, concentration=20, seed=3)
+
+    a = sweep_role_weights(df, role, W, top_n=10, batch_size=7)
+    b = sweep_role_weights(df, role, W, top_n=10, batch_size=1000)
+    pd.testing.assert_frame_equal(a, b)
+    assert a["topn_freq"].between(0, 1).all()
+    assert (a["best_rank"] <= a["median_rank"]).all() and (a["median_rank"] <= a["worst_rank"]).all()